@@ -78,7 +78,10 @@ data = pd.read_csv("OMNI_data_2015_clean_with_dst.csv")
 
 data.reset_index(inplace=True)
 print(data)
-synthetic = MagneticFieldPredictor.magnetic_field_predictor(data, -105, -104, 40, 41, 0.5)
+# the study compares the Boulder observatory with the lattice point at -104.5, 40.5 in the middle of the box, so the
+# lattice has a 0.5 degree spacing
+synthetic = MagneticFieldPredictor.magnetic_field_predictor(storm_data=data, min_longitude=-105, max_longitude=-104,
+                                                            min_latitude=40, max_latitude=41, resolution_deg=0.5).to_dataframe()
 synthetic.to_csv(synthetic_file)
 print(synthetic)
 print("calculation time = ", time.time() - start)
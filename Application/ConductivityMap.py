@@ -0,0 +1,97 @@
+import os
+import numpy as np
+import pandas as pd
+
+class ConductivityMap():
+    """ This class assigns a 1-D layer Earth model to every point of the lattice the electric field is calculated on.
+        Every region is a polygon of longitude and latitude vertices with the name of the model under it.
+        Points that are not inside any polygon use the default model. When polygons overlap the one listed first is used.
+    """
+    def __init__(self, models:dict, regions:list = None, default:str = None):
+        """ @param: models: dictionary of model name to dataframe of the 1-D layer Earth resistivity
+            @param: regions: list of (model name, array of shape (vertices, 2) with the longitude and latitude of the
+                             polygon corners in degrees)
+            @param: default: name of the model used outside every region. None requires every point to be in a region
+        """
+        self.models = dict(models)
+        self.regions = []
+        for name, polygon in (regions or []):
+            if name not in self.models:
+                raise ValueError(f"Region uses the model {name} that is not in the conductivity map")
+            self.regions.append((name, np.asarray(polygon, dtype=float)))
+        if default is not None and default not in self.models:
+            raise ValueError(f"The default model {default} is not in the conductivity map")
+        self.default = default
+
+    @classmethod
+    def uniform(cls, conductivity_model:pd.DataFrame) -> 'ConductivityMap':
+        """ This method returns a map that uses the same model everywhere
+            @param: conductivity_model: dataframe of the 1-D layer Earth resistivity
+            return: ConductivityMap with a single default model
+        """
+        return cls({"uniform": conductivity_model}, default="uniform")
+
+    @classmethod
+    def from_csv(cls, filename:str) -> 'ConductivityMap':
+        """ This method reads a conductivity map file.
+            The file has the columns region, model, longitude and latitude with one row for every polygon corner, in order.
+            model is the file name of the 1-D model csv relative to the map file. A region with no longitude and latitude
+            is the default.
+            @param: filename: path of the conductivity map csv
+            return: ConductivityMap
+        """
+        table = pd.read_csv(filename)
+        directory = os.path.dirname(filename)
+        models = {}
+        regions = []
+        default = None
+        for region, rows in table.groupby('region', sort=False):
+            model = rows['model'].iloc[0]
+            if model not in models:
+                models[model] = pd.read_csv(os.path.join(directory, model))
+            corners = rows[['longitude', 'latitude']].dropna().to_numpy(dtype=float)
+            if corners.shape[0] == 0:
+                default = model
+            else:
+                regions.append((model, corners))
+        return cls(models, regions, default)
+
+    def assign(self, longitude:np.array, latitude:np.array) -> tuple:
+        """ This method finds the model of every point of a lattice
+            @param: longitude: numpy array of the lattice longitudes (degrees)
+            @param: latitude: numpy array of the lattice latitudes (degrees)
+            return: list of the model names used and an integer array of shape (longitudes, latitudes)
+                    with the position of each point's model in that list
+        """
+        lon, lat = np.meshgrid(np.asarray(longitude, dtype=float), np.asarray(latitude, dtype=float), indexing='ij')
+        names = list(self.models)
+        index = np.full(lon.shape, -1)
+        for name, polygon in self.regions:
+            inside = (index == -1) & points_in_polygon(lon, lat, polygon)
+            index[inside] = names.index(name)
+        if np.any(index == -1):
+            if self.default is None:
+                raise ValueError("Part of the lattice is outside every region of the conductivity map and there is no default model")
+            index[index == -1] = names.index(self.default)
+
+        # only keep the models that are used so callers can loop over them
+        used = np.unique(index)
+        return [names[i] for i in used], np.searchsorted(used, index)
+
+def points_in_polygon(x:np.array, y:np.array, polygon:np.array) -> np.array:
+    """ This function tests which points are inside a polygon by counting the edges a ray from each point crosses
+        @param: x: numpy array of the point longitudes
+        @param: y: numpy array of the point latitudes, the same shape as x
+        @param: polygon: array of shape (vertices, 2) of the polygon corners
+        return: boolean numpy array the same shape as x
+    """
+    inside = np.zeros(np.shape(x), dtype=bool)
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    for i in range(polygon.shape[0]):
+        # the edge crosses the horizontal line through the point to the right of the point
+        crosses = (y1[i] > y) != (y2[i] > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = x1[i] + (y - y1[i]) * (x2[i] - x1[i]) / (y2[i] - y1[i])
+        inside ^= crosses & (x < x_cross)
+    return inside
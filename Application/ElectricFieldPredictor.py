@@ -1,15 +1,20 @@
 
 import numpy as np
-import cmath
 from math import *
 import pandas as pd
-from scipy.fft import fft, ifft, fftfreq
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from scipy.fft import rfft, irfft, rfftfreq, next_fast_len
+from scipy import signal, optimize
+from numpy.lib.stride_tricks import sliding_window_view
 import MagneticFieldPredictor
+from FieldCube import FieldCube
+from ConductivityMap import ConductivityMap
 import insert_fake_Bfield
 
-def k(f:float, sigma:float) -> float:
+def k(f:np.array, sigma:float) -> np.array:
     """ This method calculates the propagation constant for a given layer in the earth.
-        @param: f: frequency of the B field (Hz)
+        @param: f: frequency of the B field (Hz), a scalar or numpy array of frequencies
         @param: sigma: conductivity of that layer (Ohm*meters)^(-1)
         return: kn:    propagation constant of layer n (imaginary number) 
 
@@ -18,13 +23,13 @@ def k(f:float, sigma:float) -> float:
                         in IEEE Access, vol. 7, pp. 147029-147037, 2019, doi: 10.1109/ACCESS.2019.2945530.
     """
     mu0 = 4*np.pi * 10**(-7)
-    kn = cmath.sqrt(2j * np.pi * mu0 * f * sigma)
+    kn = np.sqrt(2j * np.pi * mu0 * np.asarray(f) * sigma)
         
     return kn
 
-def K_final(f:float, sigma:float) -> complex:
+def K_final(f:np.array, sigma:float) -> np.array:
     """ This method calculates the final layer of the earth response transfer function.
-        @param: f: frequency of the B field (Hz)
+        @param: f: frequency of the B field (Hz), a scalar or numpy array of frequencies
         @param: sigma: conductivity of that layer (Ohm*meters)^(-1)
         return: k: Earth response of final layer (imaginary number) 
 
@@ -33,14 +38,15 @@ def K_final(f:float, sigma:float) -> complex:
                         in IEEE Access, vol. 7, pp. 147029-147037, 2019, doi: 10.1109/ACCESS.2019.2945530.
     """
     mu0 = 4*np.pi * 10**(-7)
-    k = cmath.sqrt(2j * np.pi * f / (mu0 * sigma))
+    k = np.sqrt(2j * np.pi * np.asarray(f) / (mu0 * sigma))
     return k
 
-def K_n(K_np1:complex, kn:complex, f:float, d:float) -> complex:
+def K_n(K_np1:np.array, kn:np.array, f:np.array, d:float) -> np.array:
     """ This method calculates the nth layer of the earth response transfer function.
+        All of the arrays must be the same length, one value per frequency
         @param: K_np1: n + 1 layer of the Earth repsonse transfer function
         @param: kn propagation constant of the nth layer
-        @param: f: frequency of the B field (Hz)
+        @param: f: frequency of the B field (Hz), a scalar or numpy array of frequencies
         @param: d: thickness of that layer meters
         return: kn: Earth response of final layer
 
@@ -48,18 +54,19 @@ def K_n(K_np1:complex, kn:complex, f:float, d:float) -> complex:
                         Geoelectric Fields Due to Geomagnetic Disturbances: A Test Case," 
                         in IEEE Access, vol. 7, pp. 147029-147037, 2019, doi: 10.1109/ACCESS.2019.2945530.
     """           
-    eta_n = 2j * np.pi * f / kn
-    numerator = K_np1 * (1 + cmath.exp(-2 * kn * d)) + eta_n * (1 - cmath.exp(-2 * kn * d))
-    denomenator = K_np1 * (1 - cmath.exp(-2 * kn * d)) + eta_n * (1 + cmath.exp(-2 * kn * d))
+    eta_n = 2j * np.pi * np.asarray(f) / kn
+    decay = np.exp(-2 * kn * d)
+    numerator = K_np1 * (1 + decay) + eta_n * (1 - decay)
+    denomenator = K_np1 * (1 - decay) + eta_n * (1 + decay)
     Kn = eta_n * numerator / denomenator
     return Kn
 
-def k_f(impedance_data:pd.DataFrame, f:float) -> complex:
+def k_f(impedance_data:pd.DataFrame, f:np.array) -> np.array:
     """ This function computes the earth response for a given frequency and 1-D layer Earth model
         @param: impedance_data: pandas dataframe with the impedance of the layer and the thickness of each layer
                                 impedance in Ohm*meters, thickness in meters.
-        @param: f: frequency to evaluate the transfer function (Hz)
-        return: ki: Earth response at that frequency
+        @param: f: frequency to evaluate the transfer function (Hz), a scalar or numpy array of frequencies
+        return: ki: Earth response at each frequency
     """
     impedance = impedance_data['sigma'].to_numpy(dtype=float)
     depth = impedance_data['d'].to_numpy(dtype=float)
@@ -72,14 +79,59 @@ def k_f(impedance_data:pd.DataFrame, f:float) -> complex:
     return ki
 
 
-def B_to_E(conductivity_model: pd.DataFrame, B:np.array, time:np.array, sign:int) -> np.array:
+# earth response vectors of recent runs keyed by a checksum of the conductivity model, the number of samples and the time step
+impedance_cache = {}
+IMPEDANCE_CACHE_SIZE = 16
+
+def get_impedance_vector(conductivity_model:pd.DataFrame, samples:int, time_step:float) -> np.array:
+    """ This function returns the earth response at every non-negative FFT frequency of a real time series.
+        The response is reused when the same conductivity model, length and time step were seen before,
+        so it is only computed once per run for every location and both field components.
+        The least recently used response is dropped when the cache is full.
+        @param: conductivity_model: dataframe of the 1-D layer Earth resistivity
+        @param: samples: number of samples in the time series
+        @param: time_step: time between samples (sec)
+        return: read only numpy array of the earth response at each frequency of rfftfreq(samples, time_step)
+    """
+    model_bytes = conductivity_model[['sigma', 'd']].to_numpy(dtype=float).tobytes()
+    key = (hashlib.sha256(model_bytes).hexdigest(), int(samples), float(time_step))
+    if key in impedance_cache:
+        # move the response to the back of the cache as the most recently used
+        impedance_cache[key] = impedance_cache.pop(key)
+        return impedance_cache[key]
+
+    freq = rfftfreq(samples, time_step)
+    # DC is not meaningful, make this frequency very very low
+    freq[0] = 0.000001
+    impedance_vector = k_f(conductivity_model, freq)
+    impedance_vector.setflags(write=False)
+
+    if len(impedance_cache) >= IMPEDANCE_CACHE_SIZE:
+        # drop the least recently used response
+        impedance_cache.pop(next(iter(impedance_cache)))
+    impedance_cache[key] = impedance_vector
+    return impedance_vector
+
+def B_to_E(conductivity_model: pd.DataFrame, B:np.array, time:np.array, sign:np.array, padding:str = 'edge', detrend:str = None, taper:float = 0) -> np.array:
     """ This method performs the convolution in the frequency domain 
         to obtain the electric field from the magnetic field.
+        Several series can be converted at once by stacking them as the columns of B, they then share one FFT call.
+        The series are padded to a fast FFT length at least twice as long, so the end of the storm does not wrap around
+        onto its start and odd or prime storm lengths are not slow to transform, and the result is trimmed back to the
+        length of B. Half of the padding is placed before the storm and half after it.
+        Without padding the series are transformed at their own length and the first and last 60 samples are held at
+        the value next to them to hide the wrap around, the way the field was calculated before.
         @param: conductivity_model: dataframe of the 1-D layer Earth resistivity
-        @param: B:                  array of B field direction
+        @param: B:                  array of B field direction, or 2D array with one B field series per column
         @param: time:               array of corresponding time stamps
-        @param: sign:               The y direction gets a negative sign. This parameter allows this to be done
-        return: E:                  Electric field vector the same length as B
+        @param: sign:               The y direction gets a negative sign. This parameter allows this to be done.
+                                    When B has columns this may be an array with the sign of each column
+        @param: padding:            numpy.pad mode of the padding, or None for no padding. 'edge' holds the first and
+                                    last value, which keeps the field at the ends of the storm closest to the field of
+                                    a longer record
+        @param: detrend:            'linear' or 'constant' trend removed from B before the transform, None keeps B as it is
+        @param: taper:              fraction of B at each end that is tapered to zero with a Tukey window, 0 for no taper
+        return: E:                  Electric field with the same shape as B
     """
     
     
@@ -95,100 +147,322 @@ def B_to_E(conductivity_model: pd.DataFrame, B:np.array, time:np.array, sign:int
     ###########################################
     
     
-    B_fd = fft(B*10**(-9))
+    B = np.asarray(B, dtype=float)
+    if detrend is not None:
+        B = signal.detrend(B, axis=0, type=detrend)
+    if taper > 0:
+        B = B * signal.windows.tukey(B.shape[0], 2 * taper).reshape((-1,) + (1,) * (B.ndim - 1))
+    length = B.shape[0]
+    samples = length
+    if padding is not None:
+        # odd and prime storm lengths are slow to transform, pad to a length with small prime factors
+        samples = next_fast_len(2 * length, real=True)
+        before = (samples - length) // 2
+        B = np.pad(B, [(before, samples - length - before)] + [(0, 0)] * (B.ndim - 1), mode=padding)
+        # the transform is circular so the padding before the storm is moved to the end where it wraps around into its past
+        B = np.roll(B, -before, axis=0)
+    # B is real so only the non-negative frequencies are transformed, the earth response is conjugate symmetric
+    B_fd = rfft(B*10**(-9), axis=0)
     
     
     time_step = 60
     time_step = time[1] - time[0]
-    freq = fftfreq(time.size, time_step)
-    
-    impedance_vector = np.zeros(B.size, dtype=complex)
-    # DC is not meaningful, make this frequency very very low
-    freq[0] = 0.000001
-    for i in range(B.size):
-        impedance_vector[i] = k_f(conductivity_model, freq[i])
+    impedance_vector = get_impedance_vector(conductivity_model, samples, time_step)
     
-    E_fd = np.zeros(B_fd.size, dtype=complex)
-
-    for w in range(freq.size):
-        E_fd[w] = impedance_vector[w] * B_fd[w] 
+    # every column is multiplied by the same earth response
+    E_fd = impedance_vector.reshape((-1,) + (1,) * (B.ndim - 1)) * B_fd
     
-    E = ifft(E_fd)
+    E = irfft(E_fd, n=samples, axis=0)[:length]
 
-    E = np.real(E) * sign * 1000 # multiply by sign and 1000 to get it in V/km in the correct direction
-    
-    # Remove as much aliasing as possible
-    if E.size >= 60:
-        for i in range(60):
-            E[i] = E[60]
-            E[E.size - i- 1] = E[E.size - 1 - 60]
+    E = E * sign * 1000 # multiply by sign and 1000 to get it in V/km in the correct direction
     
+    # Remove as much aliasing as possible without padding
+    if padding is None and length >= 60:
+        E[:60] = E[60]
+        E[length - 60:] = E[length - 61]
     
     return E
 
-def calculate_e_field(conductivity_model:pd.DataFrame, B_field:pd.DataFrame) -> pd.DataFrame:
-    """ This method builds the pandas data frame of E field values.
-        @param: conductivity_model: dataframe of the 1-D Earth conductivity
-        @param: solar_storm:        solar storm data from NOAA
-        return: E_field:            triple indexed pandas dataframe with electric field vector
+def calculate_e_field(conductivity_model:pd.DataFrame, B_field:FieldCube, processes:int = 1, executor:ProcessPoolExecutor = None, out:FieldCube = None) -> FieldCube:
+    """ This method builds the FieldCube of E field values.
+        When a ConductivityMap is given the lattice points are grouped by model and every group is converted at once,
+        so the earth response is only computed once for every model in the map.
+        With more than one process the lattice is split into blocks of locations. The workers read the magnetic field from
+        shared memory and write their block of the electric field straight into a shared memory FieldCube.
+        @param: conductivity_model: dataframe of the 1-D Earth conductivity, or a ConductivityMap with a model for
+                                    every region
+        @param: B_field:            FieldCube of the magnetic field with the components Bx, By and Bz
+        @param: processes:          number of worker processes. 1 calculates the field in this process
+        @param: executor:           optional ProcessPoolExecutor to use instead of starting a new one.
+                                    processes should then be its number of workers
+        @param: out:                optional FieldCube with the components Ex and Ey on the same lattice to write the
+                                    field into, such as one made by shared_e_field
+        return: E_field:            FieldCube with the Ex and Ey electric field on the same lattice, out when it is given
 
         Documentation:  D. H. Boteler, R. J. Pirjola and L. Marti, "Analytic Calculation of 
                         Geoelectric Fields Due to Geomagnetic Disturbances: A Test Case," 
                         in IEEE Access, vol. 7, pp. 147029-147037, 2019, doi: 10.1109/ACCESS.2019.2945530.
     """
-    E_field = B_field.copy(deep=True)
-    E_field.columns = ['Ex', 'Ey', 'Ez']
-    
-    E_field.drop(axis=1,labels='Ez',inplace=True)
-    
-    # extract needed longitude and latitude points from the dataframe.
-    # This is necessary because the B vector needs to contain all time points.
-    time_vector = B_field.index.get_level_values(0).to_numpy(dtype=float)
-    longitude_vector = B_field.index.get_level_values(1).to_numpy()
-    latitude_vector = B_field.index.get_level_values(2).to_numpy()
-    trimmed_time_vector = []
-    trimmed_longitude_vector = []
-    trimmed_latitude_vector = []
-
-    for time in time_vector:
-        if time not in trimmed_time_vector:
-            trimmed_time_vector.append(time)
-    for long in longitude_vector:
-        if long not in trimmed_longitude_vector:
-            trimmed_longitude_vector.append(long)
-    for lat in latitude_vector:
-        if lat not in trimmed_latitude_vector:
-            trimmed_latitude_vector.append(lat)
-    trimmed_time_vector = np.array(trimmed_time_vector)
-
-    # loop through all of the required points and calculate the E field then add it to the dataframe
-    for long in trimmed_longitude_vector:
-        for lat in trimmed_latitude_vector:
-            Bx = B_field.loc[:,long,lat]['Bx'].to_numpy(copy=True)
-            By = B_field.loc[:,long,lat]['By'].to_numpy(copy=True)
-            Ex = B_to_E(conductivity_model, By, trimmed_time_vector, 1)
-            Ey = B_to_E(conductivity_model, Bx, trimmed_time_vector, -1)
-            i = 0
-            # iterate through the E_field dataframe and populate the calculated E field values
-            for time, time_df in E_field.groupby(level=0):
-                E_field.loc[(time, long, lat), 'Ex'] = Ex[i]
-                E_field.loc[(time, long, lat), 'Ey'] = Ey[i]
-                i += 1
+    if processes > 1 or executor is not None:
+        return calculate_e_field_blocks(conductivity_model, B_field, processes, executor, out)
+
+    time_vector = B_field.time.astype(float)
+    lattice_shape = B_field.shape[:3]
+
+    # Ex comes from By and Ey from Bx, so the columns are By then Bx for every location
+    B = B_field.data[..., [B_field.components.index('By'), B_field.components.index('Bx')]].reshape(lattice_shape[0], -1)
+    sign = np.tile([1, -1], lattice_shape[1] * lattice_shape[2])
+    if isinstance(conductivity_model, ConductivityMap):
+        names, region = conductivity_model.assign(B_field.longitude, B_field.latitude)
+        # both columns of a location are in its region
+        region = np.repeat(region.ravel(), 2)
+        E = np.zeros(B.shape)
+        for i, name in enumerate(names):
+            columns = region == i
+            E[:, columns] = B_to_E(conductivity_model.models[name], B[:, columns], time_vector, sign[columns])
+    else:
+        E = B_to_E(conductivity_model, B, time_vector, sign)
+
+    if out is not None:
+        out.data[...] = E.reshape(lattice_shape + (2,))
+        return out
+    E_field = FieldCube(E.reshape(lattice_shape + (2,)), B_field.time, B_field.longitude, B_field.latitude, ['Ex', 'Ey'])
                    
     return E_field
 
-def ElectricFieldCalculator(resistivity_data:pd.DataFrame, storm_data:pd.DataFrame, min_longitude:float, max_longitude:float, min_latitude:float, max_latitude:float, log_queue:object) -> pd.DataFrame:
+def calculate_e_field_block(conductivity_model:pd.DataFrame, B_field:FieldCube, E_field:FieldCube, longitude_window:slice, latitude_window:slice):
+    """ This function calculates the electric field for one block of locations in a worker process.
+        @param: conductivity_model: dataframe of the 1-D Earth conductivity, or a ConductivityMap
+        @param: B_field: shared memory FieldCube of the magnetic field of the whole lattice
+        @param: E_field: shared memory FieldCube of the electric field of the whole lattice, the block is written into it
+        @param: longitude_window: slice of the longitudes in the block
+        @param: latitude_window: slice of the latitudes in the block
+    """
+    calculate_e_field(conductivity_model, B_field.location_slice(longitude_window, latitude_window),
+                      out=E_field.location_slice(longitude_window, latitude_window))
+    B_field.release()
+    E_field.release()
+
+def calculate_e_field_blocks(conductivity_model:pd.DataFrame, B_field:FieldCube, processes:int, executor:ProcessPoolExecutor = None, out:FieldCube = None) -> FieldCube:
+    """ This function splits the lattice of calculate_e_field into blocks of locations and calculates them on a process pool.
+        The fields are handed to the workers in shared memory so neither the magnetic nor the electric field is pickled.
+        The parameters are the same as calculate_e_field
+        return: E_field: FieldCube with the Ex and Ey electric field on the same lattice, out when it is given
+    """
+    longitudes = B_field.longitude.size
+    latitudes = B_field.latitude.size
+    # enough blocks to keep every worker busy, split along longitude first
+    longitude_blocks = max(1, min(longitudes, processes))
+    latitude_blocks = max(1, min(latitudes, -(-processes // longitude_blocks)))
+    longitude_windows = [slice(block[0], block[-1] + 1) for block in np.array_split(np.arange(longitudes), longitude_blocks)]
+    latitude_windows = [slice(block[0], block[-1] + 1) for block in np.array_split(np.arange(latitudes), latitude_blocks)]
+    windows = [(longitude_window, latitude_window) for longitude_window in longitude_windows for latitude_window in latitude_windows]
+
+    shared_B = B_field if B_field.shared_memory is not None else B_field.to_shared()
+    if out is not None and out.shared_memory is not None:
+        shared_E = out
+    else:
+        shared_E = FieldCube.shared(B_field.time, B_field.longitude, B_field.latitude, ['Ex', 'Ey'])
+    try:
+        arguments = ([conductivity_model] * len(windows), [shared_B] * len(windows), [shared_E] * len(windows),
+                     [window[0] for window in windows], [window[1] for window in windows])
+        if executor is not None:
+            list(executor.map(calculate_e_field_block, *arguments))
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                list(pool.map(calculate_e_field_block, *arguments))
+
+        if shared_E is out:
+            E_field = out
+        elif out is not None:
+            out.data[...] = shared_E.data
+            E_field = out
+        else:
+            E_field = FieldCube(shared_E.data.copy(), B_field.time, B_field.longitude, B_field.latitude, ['Ex', 'Ey'])
+    finally:
+        if shared_B is not B_field:
+            shared_B.release()
+        if shared_E is not out:
+            shared_E.release()
+    return E_field
+
+def shared_e_field(storm_data:pd.DataFrame, min_longitude:float, max_longitude:float, min_latitude:float, max_latitude:float, resolution_deg:float = None) -> FieldCube:
+    """ This function makes the shared memory FieldCube that ElectricFieldCalculator writes the electric field of a storm into.
+        The caller passes it as out and must call release once every stage that reads it is finished.
+        @param: storm_data: solar storm data from NOAA
+        @param: min_longitude: minimum longitude in degrees
+        @param: max_longitude: maximum longitude in degrees
+        @param: min_latitude: minimum latitude in degrees
+        @param: max_latitude: maximum latitude in degrees
+        @param: resolution_deg: largest spacing in degrees between the lattice points, None for the four corners only
+        return: zeroed FieldCube in shared memory with the components Ex and Ey
+    """
+    # the same time points and lattice as magnetic_field_predictor
+    time = storm_data["time"].to_numpy(copy=True)[1:]
+    longitude = MagneticFieldPredictor.lattice_vector(min_longitude, max_longitude, resolution_deg)
+    latitude = MagneticFieldPredictor.lattice_vector(min_latitude, max_latitude, resolution_deg)
+    return FieldCube.shared(time, longitude, latitude, ['Ex', 'Ey'])
+
+# number of minutes of magnetic field history the streaming electric field remembers
+STREAM_KERNEL_LENGTH = 1440
+# number of terms of the inverse Laplace transform used to build the streaming kernel
+TALBOT_TERMS = 20
+# time constants of the decaying exponentials that carry the response past the kernel, in kernel lengths
+STREAM_TAIL_TIME_CONSTANTS = 2.0**np.arange(-1, 12, 2)
+# the exponentials are fitted to the response from the end of the kernel to this many kernel lengths
+STREAM_TAIL_FIT_LENGTH = 2**10
+
+def ramp_response(conductivity_model:pd.DataFrame, t:np.array) -> np.array:
+    """ This function computes the electric field caused by a magnetic field that ramps up at 1 T/s from time 0.
+        It is the inverse Laplace transform of the earth response divided by s^2, evaluated with the fixed Talbot method.
+        @param: conductivity_model: dataframe of the 1-D layer Earth resistivity
+        @param: t: numpy array of times after the start of the ramp, all greater than zero (sec)
+        return: numpy array of the electric field at each time (V/m)
+
+        Documentation:  J. Abate and P. P. Valko, "Multi-precision Laplace transform inversion,"
+                        International Journal for Numerical Methods in Engineering, vol. 60, pp. 979-993, 2004.
+    """
+    t = np.asarray(t, dtype=float)[:, None]
+    theta = np.arange(1, TALBOT_TERMS) * np.pi / TALBOT_TERMS
+    r = 2 * TALBOT_TERMS / (5 * t)
+    # points along the Talbot contour and the derivative of the contour at each point
+    s = r * theta * (1 / np.tan(theta) + 1j)
+    ds = 1 + 1j * (theta + (theta / np.tan(theta) - 1) / np.tan(theta))
+    # k_f takes a frequency so the Laplace variable s is passed as s/(2*pi*j)
+    F = lambda s: k_f(conductivity_model, s / (2j * np.pi)) / s**2
+    total = 0.5 * np.real(np.exp(r * t) * F(r + 0j))[:, 0] + np.sum(np.real(np.exp(t * s) * F(s) * ds), axis=1)
+    return r[:, 0] / TALBOT_TERMS * total
+
+def causal_kernel(conductivity_model:pd.DataFrame, kernel_length:int, time_step:float) -> np.array:
+    """ This function builds a finite causal filter that turns magnetic field samples into electric field samples.
+        The magnetic field is taken to be linear between samples, so tap k is the second difference of the ramp response.
+        The last tap, kernel_length steps in the past, ends the filter so a constant magnetic field gives no electric
+        field. causal_tail carries the rest of the response.
+        @param: conductivity_model: dataframe of the 1-D layer Earth resistivity
+        @param: kernel_length: number of past samples the filter uses, it has kernel_length + 1 taps
+        @param: time_step: time between samples (sec)
+        return: numpy array of the taps in (V/km)/nT, tap k multiplies the sample k time steps in the past
+    """
+    ramp = np.zeros(kernel_length + 1)
+    ramp[1:] = ramp_response(conductivity_model, np.arange(1, kernel_length + 1) * time_step)
+    # response to the field rising by 1 T over the time step that ended k steps ago
+    step = np.diff(ramp) / time_step
+    kernel = np.append(np.diff(step, prepend=0), -step[-1])
+    # 10^-9 to go from nT to T and 1000 to get V/km
+    return kernel * 10**(-6)
+
+def causal_tail(conductivity_model:pd.DataFrame, kernel_length:int, time_step:float) -> tuple:
+    """ This function fits the response of causal_kernel's filter to changes of the magnetic field further in the past than
+        the filter reaches. The response to a step decays slowly, about as one over the square root of time over a
+        deep resistive earth, so cutting it off at a day leaves a large error at periods of hours.
+        It is fitted with decaying exponentials, which a stream carries forward with one recursive state each.
+        @param: conductivity_model: dataframe of the 1-D layer Earth resistivity
+        @param: kernel_length: number of past samples causal_kernel uses
+        @param: time_step: time between samples (sec)
+        return: weights: numpy array of the weight of every exponential in (V/km)/nT
+                ratios: numpy array of the ratio of every exponential from one time step to the next
+    """
+    # lags from the end of the kernel to the end of the fit, spaced evenly in log
+    lags = np.unique(np.round(np.geomspace(kernel_length, kernel_length * STREAM_TAIL_FIT_LENGTH, 400)))
+    step = (ramp_response(conductivity_model, (lags + 1) * time_step) - ramp_response(conductivity_model, lags * time_step)) / time_step
+    time_constants = kernel_length * STREAM_TAIL_TIME_CONSTANTS
+    # exponentials counted from the end of the kernel
+    basis = np.exp(-(lags[:, None] - kernel_length) / time_constants)
+    # positive weights keep the fit smooth, the relative error is fitted so the far tail counts as much as the start
+    scale = np.maximum(np.abs(step), 10**(-3) * np.abs(step[0]))
+    weights = optimize.nnls(basis / scale[:, None], step / scale)[0]
+    return weights * 10**(-6), np.exp(-1 / time_constants)
+
+class StreamingEField():
+    """ This class calculates the electric field from a magnetic field that arrives a few minutes at a time.
+        calculate_e_field transforms the whole storm again whenever a new minute arrives. This class convolves the new
+        samples with the causal_kernel of the earth instead and keeps the last kernel_length magnetic field samples of
+        every location as state. The older part of the response is carried by the decaying exponentials of causal_tail,
+        which only need one state each, so every update costs the same no matter how long the storm has been running.
+        The filter only uses past samples, so nothing wraps around. With the default day long kernel it is within 3% RMS
+        of B_to_E with padding below a tenth of the Nyquist frequency and within 0.5% below a fiftieth, where the two
+        only differ by the magnetic field being linear between samples. Electric_field_streaming_test_bench.py checks this.
+    """
+    def __init__(self, conductivity_model:pd.DataFrame, time_step:float = 60, kernel_length:int = STREAM_KERNEL_LENGTH):
+        """ @param: conductivity_model: dataframe of the 1-D Earth conductivity
+            @param: time_step: time between magnetic field samples (sec)
+            @param: kernel_length: number of past samples the kernel uses, the exponentials carry the response after it
+        """
+        self.kernel = causal_kernel(conductivity_model, kernel_length, time_step)
+        self.tail_weights, self.tail_ratios = causal_tail(conductivity_model, kernel_length, time_step)
+        self.time_step = time_step
+        # the last kernel_length samples of By and Bx at every location, oldest first, and the sample before them
+        self.history = None
+        self.departed = None
+        # state of every exponential at every column, the change of the samples that left the history summed with decay
+        self.tail_state = None
+        self.last_time = None
+
+    def update(self, B_field:FieldCube) -> FieldCube:
+        """ This method adds new magnetic field samples and returns the electric field at the same time points.
+            The first call takes the field before the first sample to be constant.
+            @param: B_field: FieldCube of the new magnetic field samples with the components Bx, By and Bz.
+                             Every call must use the same lattice and continue in time from the last call
+            return: FieldCube with the Ex and Ey electric field at the new time points
+        """
+        lattice_shape = B_field.shape[:3]
+        if B_field.time.size == 0:
+            return FieldCube.zeros(B_field.time, B_field.longitude, B_field.latitude, ['Ex', 'Ey'])
+        if self.last_time is not None and float(B_field.time[0]) <= self.last_time:
+            raise ValueError("The magnetic field samples must come after the samples of the last update")
+
+        # the same column layout as calculate_e_field, By then Bx for every location
+        B = B_field.data[..., [B_field.components.index('By'), B_field.components.index('Bx')]].reshape(lattice_shape[0], -1)
+        sign = np.tile([1, -1], lattice_shape[1] * lattice_shape[2])
+        if self.history is None:
+            self.history = np.repeat(B[:1], self.kernel.size - 1, axis=0)
+            self.departed = B[0].copy()
+            self.tail_state = np.zeros((self.tail_ratios.size, B.shape[1]))
+        elif self.history.shape[1] != B.shape[1]:
+            raise ValueError("The magnetic field lattice must be the same for every update")
+
+        samples = np.concatenate([self.history, B])
+        if B.shape[0] < 32:
+            # a handful of new minutes is cheaper as a direct dot product with the kernel
+            windows = sliding_window_view(samples, self.kernel.size, axis=0)
+            E = windows @ self.kernel[::-1]
+        else:
+            E = signal.oaconvolve(samples, self.kernel[:, None], mode='valid', axes=0)
+
+        # the samples leaving the history drive the exponentials, every output sees them with the state of its time point
+        change = np.diff(samples[:B.shape[0]], axis=0, prepend=self.departed[None, :])
+        for i, (weight, ratio) in enumerate(zip(self.tail_weights, self.tail_ratios)):
+            state = signal.lfilter([1], [1, -ratio], change, axis=0, zi=ratio * self.tail_state[i][None, :])[0]
+            E += weight * state
+            self.tail_state[i] = state[-1]
+        E = E * sign
+
+        self.departed = samples[B.shape[0] - 1].copy()
+        self.history = samples[B.shape[0]:].copy()
+        self.last_time = float(B_field.time[-1])
+        return FieldCube(E.reshape(lattice_shape + (2,)), B_field.time, B_field.longitude, B_field.latitude, ['Ex', 'Ey'])
+
+def ElectricFieldCalculator(resistivity_data:pd.DataFrame, storm_data:pd.DataFrame, min_longitude:float, max_longitude:float, min_latitude:float, max_latitude:float, log_queue:object, resolution_deg:float = None, processes:int = 1, emulator_stride:int = None, out:FieldCube = None, executor:ProcessPoolExecutor = None) -> FieldCube:
     """ This method is the parent function that should be called by the Application core.
-        @param: resistivity_data: dataframe of the 1-D Earth conductivity
+        @param: resistivity_data: dataframe of the 1-D Earth conductivity, or a ConductivityMap
         @param: solar_storm:        solar storm data from NOAA
         @param: min_longitude: minimum longitude in degrees
         @param: max_longitude: maximum longitude in degrees
         @param: min_latitude: minimum latitude in degrees
         @param: max_latitude: maximum latitude in degrees
         @param: log_queue: queue object to send log messages through
+        @param: resolution_deg: largest spacing in degrees between the lattice points the fields are calculated at.
+                                None calculates the fields at the four corners of the grid only
+        @param: processes: number of worker processes used to predict the magnetic field and calculate the electric field
+        @param: emulator_stride: quick look mode. When it is given the magnetic field model is only evaluated at every
+                                 emulator_stride-th time point and interpolated in between
+        @param: out: optional FieldCube from shared_e_field to write the electric field into. It is returned instead of a
+                     new FieldCube so the field is not copied back through a multiprocessing queue
+        @param: executor: optional ProcessPoolExecutor with processes workers to calculate both fields on instead of
+                          starting a pool for each
         The above five parameters form a grid where the electric field vector will be calculated for each time point
         
-        return: E_field: triple indexed pandas dataframe with electric field vector
+        return: E_field: FieldCube with the electric field vector
 
         Documentation:  D. H. Boteler, R. J. Pirjola and L. Marti, "Analytic Calculation of 
                         Geoelectric Fields Due to Geomagnetic Disturbances: A Test Case," 
@@ -197,7 +471,7 @@ def ElectricFieldCalculator(resistivity_data:pd.DataFrame, storm_data:pd.DataFra
     log_queue.put("Calcaulating magnetic field...\n")
     try:# FIXME: swap comments to inject real magnegic field data
         # B_field_data = insert_fake_Bfield.process_intermagnet(r"D:\GitHub\blueeye1_capstone\2003\stormdata20031030-17-24.csv")
-        B_field_data = MagneticFieldPredictor.magnetic_field_predictor(storm_data, min_longitude, max_longitude, min_latitude, max_latitude)
+        B_field_data = MagneticFieldPredictor.magnetic_field_predictor(storm_data, min_longitude, max_longitude, min_latitude, max_latitude, resolution_deg, processes, executor, emulator_stride)
     except Exception as e:
         e = str(e)
         log_queue.put('An Unexpected error occured when attempting to predict the magnetic field\n')
@@ -209,7 +483,7 @@ def ElectricFieldCalculator(resistivity_data:pd.DataFrame, storm_data:pd.DataFra
     print('\n')
     log_queue.put("Magnetic field calculation complete.\nCalculating electric field from predicted magnetic field...\n")
     try:
-        E_Field = calculate_e_field(resistivity_data, B_field_data)
+        E_Field = calculate_e_field(resistivity_data, B_field_data, processes, executor, out)
     except Exception as e:
         e = str(e)
         log_queue.put('An Unexpected error occured when attempting to calculate the electric field\n')
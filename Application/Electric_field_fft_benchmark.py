@@ -0,0 +1,57 @@
+import time
+import numpy as np
+import pandas as pd
+from scipy.fft import fft, ifft, fftfreq
+import ElectricFieldPredictor
+
+""" This code times ElectricFieldPredictor.B_to_E against a complex FFT at the length of the storm, the way B_to_E
+    transformed the field before it used a real FFT. B_to_E is timed with its default padding to a fast length at least
+    twice as long, and with padding=None at the length of the storm.
+    Storm windows cut from NOAA data are often an odd or prime number of minutes long, where the unpadded FFT is slow.
+    Every storm length converts the By and Bx series of a 20 by 15 lattice at once.
+"""
+
+conductivity_model = pd.read_csv('Finland_1D_model_old.csv')
+storm_lengths = [1440, 1441, 1447, 4327, 10007]
+columns = 2 * 20 * 15
+repeats = 3
+
+
+def unpadded_impedance(time:np.array) -> np.array:
+
+    freq = fftfreq(time.size, time[1] - time[0])
+    freq[0] = 0.000001
+    return ElectricFieldPredictor.k_f(conductivity_model, freq)
+
+
+def unpadded_B_to_E(B:np.array, impedance_vector:np.array) -> np.array:
+
+    return np.real(ifft(impedance_vector[:, None] * fft(B*10**(-9), axis=0), axis=0)) * 1000
+
+
+def best_time(function) -> float:
+
+    times = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+rng = np.random.default_rng(0)
+print("storm length (min), complex FFT time (s), B_to_E time (s), speedup, B_to_E unpadded time (s), speedup")
+for length in storm_lengths:
+    B = np.cumsum(rng.normal(size=(length, columns)), axis=0) * 10
+    time_vector = np.arange(length) * 60.0
+    sign = np.tile([1, -1], columns // 2)
+
+    # both methods are timed with the earth response already computed, like every run after the first
+    impedance_vector = unpadded_impedance(time_vector)
+    unpadded = best_time(lambda: unpadded_B_to_E(B, impedance_vector))
+    # fill the earth response cache before timing
+    ElectricFieldPredictor.B_to_E(conductivity_model, B, time_vector, sign)
+    ElectricFieldPredictor.B_to_E(conductivity_model, B, time_vector, sign, padding=None)
+    padded = best_time(lambda: ElectricFieldPredictor.B_to_E(conductivity_model, B, time_vector, sign))
+    real = best_time(lambda: ElectricFieldPredictor.B_to_E(conductivity_model, B, time_vector, sign, padding=None))
+    print(length, unpadded, padded, unpadded / padded, real, unpadded / real)
@@ -0,0 +1,85 @@
+import time
+import numpy as np
+import pandas as pd
+from scipy import signal
+from FieldCube import FieldCube
+import ElectricFieldPredictor
+
+""" This code checks ElectricFieldPredictor.StreamingEField on a synthetic two day storm on a 3 by 2 lattice.
+    The storm is fed as one block, one minute at a time and in uneven chunks with an empty update between every chunk,
+    and all three must give the same electric field. An empty update must give an empty electric field.
+    The accuracy is checked against B_to_E with padding, so the transform does not wrap the storm onto itself, on a two
+    week record with a six day storm in the middle. Both fields are low pass filtered to a tenth and a fiftieth of the
+    Nyquist frequency and compared over the storm and the days after.
+    The stream without the exponential tail past its day long kernel is shown for comparison.
+"""
+
+conductivity_model = pd.read_csv('Finland_1D_model_old.csv')
+storm_minutes = 2880
+longitude = np.array([-88.0, -84.0, -80.0])
+latitude = np.array([32.0, 35.0])
+
+rng = np.random.default_rng(0)
+# a random walk of the magnetic field, like the slow swings of a storm with fast fluctuations on top
+data = np.cumsum(rng.normal(size=(storm_minutes, longitude.size, latitude.size, 3)), axis=0) * 5
+B_field = FieldCube(data, np.arange(storm_minutes) * 60.0, longitude, latitude, ['Bx', 'By', 'Bz'])
+
+
+def stream(chunks:list, B_field:FieldCube = B_field, tail:bool = True) -> tuple:
+
+    streaming = ElectricFieldPredictor.StreamingEField(conductivity_model)
+    if not tail:
+        streaming.tail_weights = np.zeros_like(streaming.tail_weights)
+    start = time.perf_counter()
+    E = []
+    for chunk in chunks:
+        E_field = streaming.update(B_field.time_slice(chunk.start, chunk.stop))
+        assert E_field.time.size == chunk.stop - chunk.start, "The electric field has a different number of time points"
+        E.append(E_field.data)
+    return np.concatenate(E), time.perf_counter() - start
+
+
+edges = np.unique(np.concatenate([[0, storm_minutes], rng.integers(0, storm_minutes, size=40)]))
+uneven = []
+for start, stop in zip(edges[:-1], edges[1:]):
+    uneven += [slice(start, stop), slice(stop, stop)]
+
+block, block_time = stream([slice(0, storm_minutes)])
+minutes, minutes_time = stream([slice(minute, minute + 1) for minute in range(storm_minutes)])
+chunked, chunked_time = stream(uneven)
+empty, empty_time = stream([slice(0, 0)])
+
+print("feed, update time (s), max abs E (V/km), max abs difference from one block (V/km)")
+print("one block", block_time, np.abs(block).max(), 0.0)
+print("one minute at a time", minutes_time, np.abs(minutes).max(), np.abs(minutes - block).max())
+print("uneven chunks and empty updates", chunked_time, np.abs(chunked).max(), np.abs(chunked - block).max())
+print("empty update", empty_time, empty.shape)
+assert np.allclose(minutes, block, rtol=0, atol=1e-9 * np.abs(block).max())
+assert np.allclose(chunked, block, rtol=0, atol=1e-9 * np.abs(block).max())
+assert empty.shape == (0, longitude.size, latitude.size, 2)
+
+record_minutes = 14 * 1440
+storm = slice(4 * 1440, 10 * 1440)
+window = np.zeros(record_minutes)
+window[storm] = signal.windows.tukey(storm.stop - storm.start, 0.3)
+walk = np.cumsum(rng.normal(size=(record_minutes, longitude.size, latitude.size, 3)), axis=0) * 5
+# no mean, so the near zero frequency that B_to_E uses for the mean gives no field
+walk -= np.sum(window[:, None, None, None] * walk, axis=0) / np.sum(window)
+record = FieldCube(window[:, None, None, None] * walk, np.arange(record_minutes) * 60.0, longitude, latitude, ['Bx', 'By', 'Bz'])
+
+# the same columns as calculate_e_field, By then Bx for every location
+columns = record.data[..., [1, 0]].reshape(record_minutes, -1)
+sign = np.tile([1, -1], longitude.size * latitude.size)
+batch = ElectricFieldPredictor.B_to_E(conductivity_model, columns, record.time, sign, padding='edge').reshape(record.shape[:3] + (2,))
+streamed = stream([slice(0, record_minutes)], record)[0]
+kernel_only = stream([slice(0, record_minutes)], record, tail=False)[0]
+compared = slice(storm.start, record_minutes - 1440)
+
+print("low pass (fraction of Nyquist), RMS difference from B_to_E, without the tail")
+for cutoff, tolerance in ((0.1, 0.03), (0.02, 0.005)):
+    low_pass = signal.butter(8, cutoff, output='sos')
+    expected = signal.sosfiltfilt(low_pass, batch, axis=0)[compared]
+    difference = [np.sqrt(np.mean((signal.sosfiltfilt(low_pass, E, axis=0)[compared] - expected)**2) / np.mean(expected**2))
+                  for E in (streamed, kernel_only)]
+    print(cutoff, *difference)
+    assert difference[0] < tolerance, "The streaming field is further from B_to_E than documented"
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+
+class FieldCube():
+    """ This class holds a vector field sampled on a regular (time, longitude, latitude) lattice.
+        The samples are kept in one float array with the axes (time, longitude, latitude, component) so the field can be
+        handed between the magnetic field, electric field and GIC stages without building a pandas index.
+        time_slice, location_slice, location and component return views of the same memory, nothing is copied.
+        A FieldCube made by shared or to_shared keeps its samples in a multiprocessing shared memory block. It is pickled
+        as the name of the block, so other processes that receive it read and write the same samples without copying them.
+    """
+    def __init__(self, data:np.array, time:np.array, longitude:np.array, latitude:np.array, components:list):
+        """ @param: data: array of shape (time points, longitudes, latitudes, components)
+            @param: time: numpy array of the time of each sample (sec)
+            @param: longitude: numpy array of the lattice longitudes in increasing order (degrees)
+            @param: latitude: numpy array of the lattice latitudes in increasing order (degrees)
+            @param: components: names of the field components, such as ['Ex', 'Ey']
+        """
+        self.data = np.asarray(data, dtype=float)
+        self.time = np.asarray(time)
+        self.longitude = np.asarray(longitude, dtype=float)
+        self.latitude = np.asarray(latitude, dtype=float)
+        self.components = list(components)
+        # shared memory block holding data, and whether this process created it and has to free it
+        self.shared_memory = None
+        self.owner = False
+        shape = (self.time.size, self.longitude.size, self.latitude.size, len(self.components))
+        if self.data.shape != shape:
+            raise ValueError(f"FieldCube data has shape {self.data.shape} but its coordinates need {shape}")
+
+    @classmethod
+    def zeros(cls, time:np.array, longitude:np.array, latitude:np.array, components:list) -> 'FieldCube':
+        """ This method returns a zeroed FieldCube on the given lattice
+            @param: time: numpy array of the time of each sample (sec)
+            @param: longitude: numpy array of the lattice longitudes (degrees)
+            @param: latitude: numpy array of the lattice latitudes (degrees)
+            @param: components: names of the field components
+            return: FieldCube of zeros
+        """
+        shape = (np.size(time), np.size(longitude), np.size(latitude), len(components))
+        return cls(np.zeros(shape), time, longitude, latitude, components)
+
+    @classmethod
+    def shared(cls, time:np.array, longitude:np.array, latitude:np.array, components:list) -> 'FieldCube':
+        """ This method returns a zeroed FieldCube in shared memory. release must be called once every process is done with it
+            @param: time: numpy array of the time of each sample (sec)
+            @param: longitude: numpy array of the lattice longitudes (degrees)
+            @param: latitude: numpy array of the lattice latitudes (degrees)
+            @param: components: names of the field components
+            return: FieldCube of zeros that can be handed to other processes without copying
+        """
+        shape = (np.size(time), np.size(longitude), np.size(latitude), len(components))
+        block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * 8, 1))
+        cube = cls(np.ndarray(shape, dtype=float, buffer=block.buf), time, longitude, latitude, components)
+        cube.data[...] = 0
+        cube.shared_memory = block
+        cube.owner = True
+        return cube
+
+    def to_shared(self) -> 'FieldCube':
+        """ This method copies the field into shared memory
+            return: FieldCube in shared memory with the same values, release must be called when it is no longer needed
+        """
+        cube = FieldCube.shared(self.time, self.longitude, self.latitude, self.components)
+        cube.data[...] = self.data
+        return cube
+
+    def release(self):
+        """ This method stops using the shared memory of the field. The process that created it also frees it.
+            Views of the data taken before must not be used afterwards. Does nothing when the field is not shared
+        """
+        if self.shared_memory is None:
+            return
+        block = self.shared_memory
+        self.data = None
+        self.shared_memory = None
+        block.close()
+        if self.owner:
+            block.unlink()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        if self.shared_memory is not None:
+            # send the name of the block instead of the samples
+            del state['data']
+            state['shared_memory'] = self.shared_memory.name
+            state['owner'] = False
+        return state
+
+    def __setstate__(self, state:dict):
+        self.__dict__.update(state)
+        if isinstance(self.shared_memory, str):
+            block = shared_memory.SharedMemory(name=self.shared_memory)
+            shape = (self.time.size, self.longitude.size, self.latitude.size, len(self.components))
+            self.data = np.ndarray(shape, dtype=float, buffer=block.buf)
+            self.shared_memory = block
+
+    @classmethod
+    def from_dataframe(cls, frame:pd.DataFrame) -> 'FieldCube':
+        """ This method converts a dataframe indexed by time, longitude and latitude into a FieldCube.
+            Every (time, longitude, latitude) combination must be present once. Index levels may be strings.
+            @param: frame: triple indexed pandas dataframe with one column per field component
+            return: FieldCube with the same values
+        """
+        # sorted coordinates of each axis and the position of every row along it, so the rows do not have to be in order
+        coordinates = []
+        positions = []
+        for level in range(3):
+            values = frame.index.get_level_values(level).to_numpy(dtype=float)
+            coordinate, position = np.unique(values, return_inverse=True)
+            coordinates.append(coordinate)
+            positions.append(position)
+        shape = tuple(coordinate.size for coordinate in coordinates)
+        if frame.shape[0] != np.prod(shape):
+            raise ValueError("The dataframe must have a value at every time, longitude and latitude point")
+
+        data = np.zeros(shape + (frame.shape[1],))
+        data[tuple(positions)] = frame.to_numpy(dtype=float)
+        time, longitude, latitude = coordinates
+        return cls(data, time, longitude, latitude, list(frame.columns))
+
+    @property
+    def shape(self) -> tuple:
+        return self.data.shape
+
+    def component(self, name:str) -> np.array:
+        """ This method returns one component of the field
+            @param: name: name of the component, such as 'Ex'
+            return: view of shape (time points, longitudes, latitudes)
+        """
+        return self.data[..., self.components.index(name)]
+
+    def location(self, longitude_index:int, latitude_index:int) -> np.array:
+        """ This method returns the time series of every component at one lattice point
+            @param: longitude_index: position of the point in the longitude vector
+            @param: latitude_index: position of the point in the latitude vector
+            return: view of shape (time points, components)
+        """
+        return self.data[:, longitude_index, latitude_index]
+
+    def time_slice(self, start:int, stop:int = None) -> 'FieldCube':
+        """ This method returns the field for a range of time points
+            @param: start: index of the first time point
+            @param: stop: index one past the last time point. None goes to the end
+            return: FieldCube that shares its data with this one
+        """
+        window = slice(start, stop)
+        return FieldCube(self.data[window], self.time[window], self.longitude, self.latitude, self.components)
+
+    def location_slice(self, longitude_window:slice, latitude_window:slice) -> 'FieldCube':
+        """ This method returns the field for a block of lattice points
+            @param: longitude_window: slice of the longitude vector
+            @param: latitude_window: slice of the latitude vector
+            return: FieldCube that shares its data with this one
+        """
+        return FieldCube(self.data[:, longitude_window, latitude_window], self.time,
+                         self.longitude[longitude_window], self.latitude[latitude_window], self.components)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """ This method returns the field as a pandas dataframe for display.
+            The index is time, longitude and latitude as strings, in that order.
+            return: triple indexed pandas dataframe with one column per component
+        """
+        index = [self.time.astype(str), self.longitude.astype(str), self.latitude.astype(str)]
+        index = pd.MultiIndex.from_product(index, names=["time", "longitude", "latitude"])
+        return pd.DataFrame(self.data.reshape(-1, len(self.components)), index=index, columns=self.components)
+
+    def __str__(self) -> str:
+        return str(self.to_dataframe())
@@ -7,7 +7,12 @@ from datetime import datetime
 import time
 from dateutil import parser
 from dateutil.tz import UTC
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from scipy.interpolate import RBFInterpolator
 import ppigrf
+from FieldCube import FieldCube
 start = time.time()
 
 """ 
@@ -216,21 +221,81 @@ def Wr6(t : np.array, N : np.array, V : np.array, B : np.array) -> float:
     Wr6 = Wr6 * (R6/normR)
     return Wr6
 
-def GPS_to_cartesian(longitude:float, latitude:float, elevation:float = 0) -> list:
+# fitting constants from [1] for W1 through W6, in the order (r, gamma, beta, lamb)
+W_FITTING_CONSTANTS = np.array([[0.383403, 0.916555, 0.846509, 0.394732],
+                                [0.648176, 0.898772, 0.180725, 0.550920],
+                                [0.318752E-01, 1.29123, 2.26596, 0.387365],
+                                [0.581168, 1.33199, 1.28211, 0.436819],
+                                [1.15070, 0.699074, 1.62290, 0.405553],
+                                [0.843004, 0.537116, 2.42297, 1.26131]])
+
+class WAccumulator():
+    """ This class computes the six W parameters of [1] as a running integral over the solar storm.
+        The Wt1 through Wr6 functions above re-sum the whole storm every time they are called. This class keeps the
+        exponentially decaying sums as state instead, so adding a new sample costs the same no matter how long the storm is.
+        After the nth call to update, values() returns the same W parameters as calling Wt1 through Wr6 on the first n samples.
+    """
+    def __init__(self):
+        self.r = W_FITTING_CONSTANTS[:, 0]
+        # decaying sums of every sample except the most recent one, which is held in pending_sk.
+        # The W functions leave the last sample out of the integral so it is only added once the next sample arrives
+        self.sums = np.zeros(6)
+        self.pending_sk = np.zeros(6)
+        self.first_time = None
+        self.last_time = None
+        self.count = 0
+
+    def update(self, t:float, N:float, V:float, B:float):
+        """ This method adds a new sample to the running integral
+            @param: t: time of the sample in minutes
+            @param: N: solar wind density at time t
+            @param: V: solar wind speed at time t
+            @param: B: magnitude of the southward component of the IMF at time t
+        """
+        lamb = W_FITTING_CONSTANTS[:, 3]
+        beta = W_FITTING_CONSTANTS[:, 2]
+        gamma = W_FITTING_CONSTANTS[:, 1]
+        self.update_sk(t, ((N/5.0)**lamb) * ((V/400.0)**beta) * ((1.16 * B/5.0)**gamma))
+
+    def update_sk(self, t:float, sk:np.array):
+        """ This method adds a new sample to the running integral when Sk has already been evaluated for it
+            @param: t: time of the sample in minutes
+            @param: sk: numpy array of the Sk subfunction for W1 through W6 at time t
+        """
+        if self.count == 0:
+            self.first_time = t
+        else:
+            # move the sums forward to the new time point and fold in the previous sample
+            self.sums = (self.sums + self.pending_sk) * np.exp((self.r/60) * (self.last_time - t))
+        self.pending_sk = sk
+        self.last_time = t
+        self.count += 1
+
+    def values(self) -> np.array:
+        """ This method returns W1 through W6 at the time of the most recent sample
+            return: numpy array of the six W parameters described in [1]
+        """
+        if self.count == 0:
+            return np.zeros(6)
+        resolution = (self.last_time - self.first_time) / self.count
+        if resolution == 0:
+            resolution = 1
+        normR = 60 / resolution
+        return self.sums * (self.r/normR)
+
+def GPS_to_cartesian(longitude:np.array, latitude:np.array, elevation:np.array = 0) -> list:
     """ Converts gps coordiantes to geocentric cartesian coordinates in earth radii
-        elevations assumed to be in feet
+        elevations assumed to be in feet. The parameters may be scalars or numpy arrays of points
         @param: longitude: longitude expressed in degrees with East being positive
         @param: latitude: latitude in degree with North Being positive
         @param: elevation: altitude above sea level (feet)
         return: x, y, z: the geo cartesian coordinates
     """
     Re  = 2.093e+7 # feet
-    rho = 1 + elevation/Re
+    rho = 1 + np.asarray(elevation)/Re
 
-    if latitude >= 0:
-        phi = np.pi/2 - np.deg2rad(latitude)
-    else:
-        phi = -np.deg2rad(latitude) + np.pi/2
+    # polar angle measured from the north pole
+    phi = np.pi/2 - np.deg2rad(latitude)
     theta = np.deg2rad(longitude)
     
     x = rho * np.sin(phi) * np.cos(theta)
@@ -238,65 +303,63 @@ def GPS_to_cartesian(longitude:float, latitude:float, elevation:float = 0) -> li
     z = rho * np.cos(phi)
     return x, y, z
 
-def cartesian_to_GPS(x:float, y:float, z:float) -> list:
+def cartesian_to_GPS(x:np.array, y:np.array, z:np.array) -> list:
     """ Converts geocentric cartesian coordinates to gps coordinates
-        This function calls the west and south direction negative
+        This function calls the west and south direction negative. The parameters may be scalars or numpy arrays of points
         @param: x, y, z: the geo cartesian coordinates
-        return: longitude, latitude: units are degrees and North and East are positive
+        return: longitude, latitude: units are radians and North and East are positive
     """
-
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    z = np.asarray(z, dtype=float)
     rho = np.sqrt(x**2 + y**2 + z**2)
 
-    # Use the sign of the individual parameters to determine what the value should be.
-    if rho == 0:
-        phi = 0
-    else:
-        # use cartesian to polar transform equation
-        phi = np.arccos(z/rho)
-        # subtract form pi/2 to correct for the fact that the equator is 0 degrees
-        phi = np.pi/2 - phi
-    # handle the special case when the cartesian to polar transform would have division by 0
-    if x == 0:
-        if y < 0:
-            theta = -np.pi / 2
-        elif y == 0:
-            theta = 0
-        else:
-            theta = np.pi / 2
-    # use cartesian to polar transform
-    else:
-        theta = np.arctan(y/x)
-        # correct for sign
-        if x < 0:
-            if y < 0:
-                theta = theta - np.pi
-            else:
-                theta = theta + np.pi
-            
+    # the latitude is measured from the equator. A point at the center of the earth gets 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        phi = np.where(rho == 0, 0.0, np.arcsin(z / np.where(rho == 0, 1.0, rho)))
+    # arctan2 handles the signs of x and y and the case when x is 0
+    theta = np.arctan2(y, x)
+
     longitude = theta
     latitude = phi
     return longitude, latitude
 
-def geo_to_enu(x:float, y:float, z:float, longitude:float, latitude:float):
-    """ This function is a coordinate transform from geocentric coordinates to enu coordinates
+def enu_rotation(longitude:np.array, latitude:np.array) -> np.array:
+    """ This function returns the rotation matrix from geocentric coordinates to enu coordinates at a location
+        @param: longitude: longitude in degrees, a scalar or numpy array of locations
+        @param: latitude: latitude in degrees, a scalar or numpy array of locations
+        return: T_matrix: numpy array of shape (..., 3, 3) whose rows are the e, n and u directions in geocentric coordinates
+        documentation: https://gssc.esa.int/navipedia/index.php/Transformations_between_ECEF_and_ENU_coordinates
+    """
+    lamb = np.deg2rad(longitude)
+    phi = np.deg2rad(latitude)
+    T = [[-np.sin(lamb),                np.cos(lamb),                         np.zeros_like(lamb)],
+         [-np.cos(lamb) * np.sin(phi), -np.sin(lamb) * np.sin(phi), np.cos(phi)],
+         [ -np.cos(lamb) * np.cos(phi),  -np.sin(lamb) * np.cos(phi), -np.sin(phi)]]
+    # stack the rows so the location axes come first
+    T_matrix = np.stack([np.stack(np.broadcast_arrays(*row), axis=-1) for row in T], axis=-2)
+    return T_matrix
+
+def geo_to_enu(x:np.array, y:np.array, z:np.array, longitude:np.array, latitude:np.array, T_matrix:np.array = None):
+    """ This function is a coordinate transform from geocentric coordinates to enu coordinates.
+        The parameters may be scalars or numpy arrays of points
         @param: x, x coordinate in geocentric coordinates
         @param: y, y coordinate in geocentric coordinates
         @param: z, z coordinate in geocentric coordinates
         @param: longitude: longitude in degrees
         @param: latitude: latitude in degrees
+        @param: T_matrix: optional rotation matrices from enu_rotation for these locations so they are not built again
         return: e, n, u: coordinates in enu
         documentation: https://gssc.esa.int/navipedia/index.php/Transformations_between_ECEF_and_ENU_coordinates
     """ 
-    lamb = np.deg2rad(longitude)
-    phi = np.deg2rad(latitude)
-    T = [[-np.sin(lamb),                np.cos(lamb),                         0],
-         [-np.cos(lamb) * np.sin(phi), -np.sin(lamb) * np.sin(phi), np.cos(phi)],
-         [ -np.cos(lamb) * np.cos(phi),  -np.sin(lamb) * np.cos(phi), -np.sin(phi)]]
-    T_matrix = np.array(T)
+    if T_matrix is None:
+        T_matrix = enu_rotation(longitude, latitude)
     
-    Bgeo = np.array([x, y, z])
+    Bgeo = np.stack(np.broadcast_arrays(x, y, z), axis=-1)
     
-    e, n, u = np.matmul(T_matrix, Bgeo)
+    enu = np.matmul(T_matrix, Bgeo[..., np.newaxis])[..., 0]
+    # [()] turns the results of a single point back into scalars
+    e, n, u = enu[..., 0][()], enu[..., 1][()], enu[..., 2][()]
     return e, n, u
 
 def calculateSouthBField(Bxgsm: np.array, Bygsm: np.array, Bzgsm:np.array) -> np.array:
@@ -316,8 +379,62 @@ def calculateSouthBField(Bxgsm: np.array, Bygsm: np.array, Bzgsm:np.array) -> np
             Bsouth[i] = abs(Bgeo[2])
     return Bsouth
 
-
-def calculateBField(t: np.array, N: np.array, V: np.array, Bxgsm: np.array, Bygsm: np.array, Bzgsm: np.array, Vxgsm:float, Vygsm:float, Vzgsm:float, longitudeCBF: float, latitudeCBF: float, dst: float) -> list:
+class SolarWindDrivers():
+    """ This class holds the solar wind quantities the field model needs, prepared once for a whole solar storm.
+        The southward IMF, dynamic pressure and Sk subfunctions do not depend on the location where the magnetic field
+        is evaluated, so they are computed here once per storm and shared by every location and time step.
+        The southward IMF of each sample is found with the geopack state of that sample's own time point.
+    """
+    def __init__(self, storm_data:pd.DataFrame):
+        """ @param: storm_data: pandas dataframe of solar storm data with the columns time (sec), density, speed,
+                                Bx, By, Bz, Vx, Vy, Vz in gsm coordinates and dst
+        """
+        self.time = storm_data["time"].to_numpy(dtype=float, copy=True)
+        self.time_minutes = self.time / 60
+        self.N = storm_data["density"].to_numpy(dtype=float, copy=True)
+        self.V = storm_data["speed"].to_numpy(dtype=float, copy=True)
+        self.Bxgsm = storm_data["Bx"].to_numpy(dtype=float, copy=True)
+        self.Bygsm = storm_data["By"].to_numpy(dtype=float, copy=True)
+        self.Bzgsm = storm_data["Bz"].to_numpy(dtype=float, copy=True)
+        self.Vxgsm = storm_data["Vx"].to_numpy(dtype=float, copy=True)
+        self.Vygsm = storm_data["Vy"].to_numpy(dtype=float, copy=True)
+        self.Vzgsm = storm_data["Vz"].to_numpy(dtype=float, copy=True)
+        self.dst = storm_data["dst"].to_numpy(dtype=float, copy=True)
+
+        self.Bs = np.zeros(self.time.size)
+        for i in range(self.time.size):
+            # same geopack state calculateBField sets up for this time point
+            gpack.recalc(self.time_minutes[i])
+            Vxgse, Vygse, Vzgse = gpack.gsmgse(self.Vxgsm[i], self.Vygsm[i], self.Vzgsm[i], 1)
+            gpack.recalc(self.time_minutes[i], Vxgse, Vygse, Vzgse)
+            self.Bs[i] = calculateSouthBField(self.Bxgsm[i:i+1], self.Bygsm[i:i+1], self.Bzgsm[i:i+1])[0]
+
+        self.Pdyn = Pdyn(self.N, self.V)
+        # one row per W parameter, one column per time point
+        self.Sk = Sk(self.N[np.newaxis, :], self.V[np.newaxis, :], self.Bs[np.newaxis, :],
+                     W_FITTING_CONSTANTS[:, 3:4], W_FITTING_CONSTANTS[:, 2:3], W_FITTING_CONSTANTS[:, 1:2])
+
+# prepared solar wind drivers of recent storms keyed by a checksum of the storm data
+solar_wind_drivers_cache = {}
+SOLAR_WIND_DRIVERS_CACHE_SIZE = 4
+
+def get_solar_wind_drivers(storm_data:pd.DataFrame) -> SolarWindDrivers:
+    """ This function returns the SolarWindDrivers of a solar storm, reusing them if the same storm was prepared before
+        @param: storm_data: pandas dataframe of solar storm data
+        return: SolarWindDrivers for storm_data
+    """
+    columns = ["time", "density", "speed", "Bx", "By", "Bz", "Vx", "Vy", "Vz", "dst"]
+    storm_bytes = storm_data[columns].to_numpy(dtype=float).tobytes()
+    checksum = hashlib.sha256(storm_bytes).hexdigest()
+    if checksum not in solar_wind_drivers_cache:
+        if len(solar_wind_drivers_cache) >= SOLAR_WIND_DRIVERS_CACHE_SIZE:
+            # drop the oldest storm
+            solar_wind_drivers_cache.pop(next(iter(solar_wind_drivers_cache)))
+        solar_wind_drivers_cache[checksum] = SolarWindDrivers(storm_data)
+    return solar_wind_drivers_cache[checksum]
+
+
+def calculateBField(t: np.array, N: np.array, V: np.array, Bxgsm: np.array, Bygsm: np.array, Bzgsm: np.array, Vxgsm:float, Vygsm:float, Vzgsm:float, longitudeCBF: float, latitudeCBF: float, dst: float, W: np.array = None) -> list:
     """ This function calculates and returns the magnetic field vector at a given time point which is the last time point in the t array
         
         @param: t: numpy array of time points where the first value is at the beginning of a solar storm
@@ -332,13 +449,16 @@ def calculateBField(t: np.array, N: np.array, V: np.array, Bxgsm: np.array, Bygs
         @param: longitudeCBF: float of the longitude where the B field is being evaluated
         @param: latitudeCBF: float of the latitude where the B field is being evaluated
         @param: dst: most recent dst index in nT
+        @param: W: optional array of W1 through W6 at the last time point, such as the values of a WAccumulator.
+                   When this is given the W parameters are not integrated over t again.
         return: Bxgeo, Bygeo, Bzgeo predicted magnetic field vector
     """
     gpack.recalc(t[-1])
     Vxgse, Vygse, Vzgse = gpack.gsmgse(Vxgsm, Vygsm, Vzgsm, 1) 
     psi = gpack.recalc(t[-1], Vxgse, Vygse, Vzgse)
     
-    B = calculateSouthBField(Bxgsm, Bygsm, Bzgsm)
+    if W is None:
+        B = calculateSouthBField(Bxgsm, Bygsm, Bzgsm)
     
     # update current time to be the last time in the series
     
@@ -347,12 +467,15 @@ def calculateBField(t: np.array, N: np.array, V: np.array, Bxgsm: np.array, Bygs
     # convert geo cartesian coordinates to gsm cartesian coordinates
     xgsm, ygsm, zgsm = gpack.geogsm(x, y, z, 1)
     
-    W1 = Wt1(t, N, V, B)
-    W2 = Wt2(t, N, V, B)
-    W3 = Ws3(t, N, V, B)
-    W4 = Wp4(t, N, V, B)
-    W5 = Wr5(t, N, V, B)
-    W6 = Wr6(t, N, V, B)
+    if W is None:
+        W1 = Wt1(t, N, V, B)
+        W2 = Wt2(t, N, V, B)
+        W3 = Ws3(t, N, V, B)
+        W4 = Wp4(t, N, V, B)
+        W5 = Wr5(t, N, V, B)
+        W6 = Wr6(t, N, V, B)
+    else:
+        W1, W2, W3, W4, W5, W6 = W
     
     speed = V[-1]
     pdyn = Pdyn(N[-1], speed)
@@ -374,7 +497,250 @@ def calculateBField(t: np.array, N: np.array, V: np.array, Bxgsm: np.array, Bygs
 
 
 
-def magnetic_field_predictor(storm_data:pd.DataFrame, min_longitude:float, max_longitude: float, min_latitude:float, max_latitude:float) -> pd.DataFrame:
+def lattice_vector(minimum:float, maximum:float, resolution_deg:float = None) -> np.array:
+    """ This function returns evenly spaced coordinates from minimum to maximum, both included
+        @param: minimum: smallest coordinate in degrees
+        @param: maximum: largest coordinate in degrees
+        @param: resolution_deg: largest allowed spacing between coordinates in degrees.
+                                When it is None only minimum and maximum are returned
+        return: numpy array of coordinates in degrees
+    """
+    if resolution_deg is None:
+        return np.array([minimum, maximum])
+    if resolution_deg <= 0:
+        raise ValueError("resolution_deg must be positive")
+    points = max(2, int(np.ceil((maximum - minimum) / resolution_deg - 1e-9)) + 1)
+    return np.linspace(minimum, maximum, points)
+
+class GeopackTimestep():
+    """ This class holds the geopack state of one time point that every location evaluated at that time shares.
+        calculateBField sets up the same state again for every location, this class sets it up once per time point:
+        the dipole tilt, the rotation from geocentric to gsm coordinates, the stations in gsm coordinates and the dipole field at the stations.
+    """
+    def __init__(self, t:float, Vxgsm:float, Vygsm:float, Vzgsm:float, x:np.array, y:np.array, z:np.array):
+        """ @param: t: time point in minutes
+            @param: Vxgsm: x component of the solar wind in gsm coordinates
+            @param: Vygsm: y component of the solar wind in gsm coordinates
+            @param: Vzgsm: z component of the solar wind in gsm coordinates
+            @param: x, y, z: numpy arrays of the station positions in geocentric cartesian coordinates (earth radii)
+        """
+        gpack.recalc(t)
+        Vxgse, Vygse, Vzgse = gpack.gsmgse(Vxgsm, Vygsm, Vzgsm, 1)
+        self.psi = gpack.recalc(t, Vxgse, Vygse, Vzgse)
+        # rows are the gsm axes expressed in geocentric coordinates, so the transpose rotates gsm back to geocentric
+        self.geo_to_gsm = np.array(gpack.geogsm(np.array([1.0, 0.0, 0.0]), np.array([0.0, 1.0, 0.0]), np.array([0.0, 0.0, 1.0]), 1))
+        self.xgsm, self.ygsm, self.zgsm = gpack.geogsm(x, y, z, 1)
+        # dipole field at every station in gsm coordinates, shape (locations, 3)
+        self.dipole = np.array(gpack.dip(self.xgsm, self.ygsm, self.zgsm)).T
+
+    def t04_inputs(self, parmod:list) -> np.array:
+        """ This method returns everything t04.t04 needs at each station for this time point
+            @param: parmod: list of Pdyn, dst, By, Bz and W1 through W6
+            return: numpy array of shape (locations, 14) with the ten parmod values, the dipole tilt and the station xgsm, ygsm, zgsm
+        """
+        inputs = np.zeros((self.xgsm.size, 14))
+        inputs[:, :10] = parmod
+        inputs[:, 10] = self.psi
+        inputs[:, 11] = self.xgsm
+        inputs[:, 12] = self.ygsm
+        inputs[:, 13] = self.zgsm
+        return inputs
+
+class T04Emulator():
+    """ This class is a response surface of the t04 external field for quick look runs.
+        It is built from exact t04 evaluations at a set of model states, one table per location, and interpolates
+        between them with a thin plate spline. The states are the inputs of GeopackTimestep.t04_inputs, so the dipole tilt
+        and the station position in gsm coordinates are part of the table. The dipole field is cheap and is still calculated exactly.
+        States outside the range of the table are not extrapolated, covers reports them so they can be evaluated exactly.
+        magnetic_field_predictor keeps the table of every lattice on disk with save_response_table, so a later run only
+        evaluates the states of its storm that the table does not cover yet.
+    """
+    # Pdyn and W1 through W6 span orders of magnitude during a storm so they are interpolated on a log scale
+    LOG_INPUTS = [0, 4, 5, 6, 7, 8, 9]
+
+    def __init__(self, inputs:np.array, responses:np.array):
+        """ @param: inputs: numpy array of shape (states, locations, 14) from GeopackTimestep.t04_inputs
+            @param: responses: numpy array of shape (states, locations, 3) with the t04 field in gsm coordinates (nT)
+        """
+        if inputs.shape[0] <= inputs.shape[2]:
+            raise ValueError("The T04 emulator needs more than 14 model states")
+        self.minimum = inputs.min(axis=0)
+        self.maximum = inputs.max(axis=0)
+        self.keep = []
+        self.mean = []
+        self.scale = []
+        self.models = []
+        for j in range(inputs.shape[1]):
+            features = self.features(inputs[:, j])
+            # inputs that never change, such as By in some storms, carry no information
+            keep = features.std(axis=0) > 0
+            mean = features[:, keep].mean(axis=0)
+            scale = features[:, keep].std(axis=0)
+            self.keep.append(keep)
+            self.mean.append(mean)
+            self.scale.append(scale)
+            self.models.append(RBFInterpolator((features[:, keep] - mean) / scale, responses[:, j], kernel='thin_plate_spline', degree=1))
+
+    def features(self, inputs:np.array) -> np.array:
+        """ This method scales the model inputs for interpolation
+            @param: inputs: numpy array of shape (..., 14) from GeopackTimestep.t04_inputs
+            return: numpy array of the same shape
+        """
+        features = np.array(inputs, dtype=float)
+        features[..., self.LOG_INPUTS] = np.log1p(np.abs(features[..., self.LOG_INPUTS]))
+        return features
+
+    def covers(self, inputs:np.array) -> np.array:
+        """ This method checks which model states lie inside the range of the table.
+            The station position is left out because it only follows the rotation of the earth
+            @param: inputs: numpy array of shape (locations, 14) or (states, locations, 14) from GeopackTimestep.t04_inputs
+            return: boolean numpy array of shape (locations,) or (states, locations)
+        """
+        inside = (inputs >= self.minimum) & (inputs <= self.maximum)
+        return inside[..., :11].all(axis=-1)
+
+    def predict(self, inputs:np.array) -> np.array:
+        """ This method interpolates the t04 field at new model states
+            @param: inputs: numpy array of shape (locations, 14) or (states, locations, 14) from GeopackTimestep.t04_inputs
+            return: numpy array of shape (locations, 3) or (states, locations, 3) with the t04 field in gsm coordinates (nT)
+        """
+        features = self.features(inputs)
+        B = np.zeros(features.shape[:-1] + (3,))
+        for j in range(len(self.models)):
+            states = features[..., j, :][..., self.keep[j]]
+            B[..., j, :] = self.models[j](((states - self.mean[j]) / self.scale[j]).reshape(-1, states.shape[-1])).reshape(states.shape[:-1] + (3,))
+        return B
+
+# directory of the T04Emulator tables, one file per lattice
+EMULATOR_TABLE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "T04 emulator tables")
+# largest number of model states kept in a table, the oldest are dropped first. Fitting the emulator grows with its cube
+EMULATOR_TABLE_SIZE = 1000
+# emulators fitted in this process, keyed by the lattice key and the checksum of the states in its table
+t04_emulator_cache = {}
+
+def lattice_key(longitudes:np.array, latitudes:np.array) -> str:
+    """ This function finds the key of the emulator table of a set of locations
+        @param: longitudes: numpy array of the longitude of each location in degrees
+        @param: latitudes: numpy array of the latitude of each location in degrees
+        return: sha256 checksum of the locations, their shape and type
+    """
+    longitudes = np.ascontiguousarray(longitudes, dtype=float)
+    latitudes = np.ascontiguousarray(latitudes, dtype=float)
+    header = str((longitudes.shape, latitudes.shape, longitudes.dtype.str)).encode()
+    return hashlib.sha256(header + longitudes.tobytes() + latitudes.tobytes()).hexdigest()
+
+def load_response_table(key:str, locations:int) -> tuple:
+    """ This function reads the emulator table of a lattice from EMULATOR_TABLE_DIRECTORY
+        @param: key: lattice_key of the locations
+        @param: locations: number of locations
+        return: inputs, responses: numpy arrays of shape (states, locations, 14) and (states, locations, 3), with no
+                states when the lattice has no table yet
+    """
+    path = os.path.join(EMULATOR_TABLE_DIRECTORY, key + ".npz")
+    if not os.path.exists(path):
+        return np.zeros((0, locations, 14)), np.zeros((0, locations, 3))
+    with np.load(path) as table:
+        return table["inputs"], table["responses"]
+
+def save_response_table(key:str, inputs:np.array, responses:np.array):
+    """ This function writes the emulator table of a lattice to EMULATOR_TABLE_DIRECTORY.
+        The file is replaced in one step, so a run that reads it at the same time sees the old or the new table
+        @param: key: lattice_key of the locations
+        @param: inputs: numpy array of shape (states, locations, 14) from GeopackTimestep.t04_inputs
+        @param: responses: numpy array of shape (states, locations, 3) with the t04 field in gsm coordinates (nT)
+    """
+    os.makedirs(EMULATOR_TABLE_DIRECTORY, exist_ok=True)
+    path = os.path.join(EMULATOR_TABLE_DIRECTORY, key + ".npz")
+    partial = path + "." + str(os.getpid()) + ".tmp"
+    with open(partial, "wb") as file:
+        np.savez(file, inputs=inputs, responses=responses)
+    os.replace(partial, path)
+
+def get_t04_emulator(key:str, inputs:np.array, responses:np.array) -> T04Emulator:
+    """ This function returns the T04Emulator of a table, fitting it only when the table changed since the last call
+        @param: key: lattice_key of the locations
+        @param: inputs: numpy array of shape (states, locations, 14) of the table
+        @param: responses: numpy array of shape (states, locations, 3) of the table
+        return: T04Emulator of the table
+    """
+    cache_key = (key, hashlib.sha256(np.ascontiguousarray(inputs).tobytes()).hexdigest())
+    if cache_key not in t04_emulator_cache:
+        # only the newest table of a lattice is kept
+        for old_key in [old_key for old_key in t04_emulator_cache if old_key[0] == key]:
+            t04_emulator_cache.pop(old_key)
+        t04_emulator_cache[cache_key] = T04Emulator(inputs, responses)
+    return t04_emulator_cache[cache_key]
+
+def t04_model_inputs(shard:tuple) -> np.array:
+    """ This function finds the t04 inputs of a block of time points at a block of locations without evaluating t04
+        @param: shard: tuple in the same form calculate_field_shard takes
+        return: numpy array of shape (time points, locations, 14) from GeopackTimestep.t04_inputs
+    """
+    time_minutes, N, V, Bxgsm, Bygsm, Bzgsm, Vxgsm, Vygsm, Vzgsm, dst, W, longitudes, latitudes = shard
+    inputs = np.zeros((time_minutes.size, longitudes.size, 14))
+    x, y, z = GPS_to_cartesian(longitudes, latitudes, 5318)
+    for i in range(time_minutes.size):
+        timestep = GeopackTimestep(time_minutes[i], Vxgsm[i], Vygsm[i], Vzgsm[i], x, y, z)
+        inputs[i] = timestep.t04_inputs([Pdyn(N[i], V[i]), dst[i], Bygsm[i], Bzgsm[i]] + list(W[i]))
+    return inputs
+
+def t04_response_table(shard:tuple) -> tuple:
+    """ This function evaluates the exact t04 external field for a block of time points at a block of locations
+        @param: shard: tuple in the same form calculate_field_shard takes
+        return: inputs, responses: numpy arrays of shape (time points, locations, 14) and (time points, locations, 3)
+                that T04Emulator is built from
+    """
+    time_minutes, N, V, Bxgsm, Bygsm, Bzgsm, Vxgsm, Vygsm, Vzgsm, dst, W, longitudes, latitudes = shard
+    inputs = np.zeros((time_minutes.size, longitudes.size, 14))
+    responses = np.zeros((time_minutes.size, longitudes.size, 3))
+    x, y, z = GPS_to_cartesian(longitudes, latitudes, 5318)
+    for i in range(time_minutes.size):
+        timestep = GeopackTimestep(time_minutes[i], Vxgsm[i], Vygsm[i], Vzgsm[i], x, y, z)
+        parmod = [Pdyn(N[i], V[i]), dst[i], Bygsm[i], Bzgsm[i]] + list(W[i])
+        inputs[i] = timestep.t04_inputs(parmod)
+        for j in range(longitudes.size):
+            responses[i, j] = t04.t04(parmod, timestep.psi, timestep.xgsm[j], timestep.ygsm[j], timestep.zgsm[j])
+    return inputs, responses
+
+def calculate_field_shard(shard:tuple, emulator:T04Emulator = None) -> np.array:
+    """ This function calculates the magnetic field for a block of time points at a block of locations.
+        It is the unit of work magnetic_field_predictor hands to worker processes, so it only takes picklable arguments.
+        It gives the same field as calling calculateBField for each time point and location.
+        @param: shard: tuple of (time_minutes, N, V, Bxgsm, Bygsm, Bzgsm, Vxgsm, Vygsm, Vzgsm, dst, W, longitudes, latitudes).
+                The first ten entries are numpy arrays with one value per time point, where each value is the last sample
+                before that time point. W is a 2D numpy array with W1 through W6 for each time point.
+                longitudes and latitudes are numpy arrays with the coordinates of each location in degrees
+        @param: emulator: optional T04Emulator built for the same locations. When it is given the t04 field is interpolated
+                          from the emulator instead of evaluating the model, except for states outside the emulator's table
+        return: numpy array of shape (time points, locations, 3) with the north, east and up magnetic field (nT)
+    """
+    time_minutes, N, V, Bxgsm, Bygsm, Bzgsm, Vxgsm, Vygsm, Vzgsm, dst, W, longitudes, latitudes = shard
+    B = np.zeros((time_minutes.size, longitudes.size, 3))
+
+    # the stations do not move so their geocentric position and enu directions are found once
+    x, y, z = GPS_to_cartesian(longitudes, latitudes, 5318)
+    enu = enu_rotation(longitudes, latitudes)
+
+    for i in range(time_minutes.size):
+        timestep = GeopackTimestep(time_minutes[i], Vxgsm[i], Vygsm[i], Vzgsm[i], x, y, z)
+        # one rotation per location from gsm straight to enu
+        gsm_to_enu = np.matmul(enu, timestep.geo_to_gsm.T)
+        # W is already integrated to this time point so only the most recent sample is needed
+        parmod = [Pdyn(N[i], V[i]), dst[i], Bygsm[i], Bzgsm[i]] + list(W[i])
+        if emulator is not None:
+            inputs = timestep.t04_inputs(parmod)
+            B_external = emulator.predict(inputs)
+            covered = emulator.covers(inputs)
+        for j in range(longitudes.size):
+            if emulator is None or not covered[j]:
+                B_location = np.array(t04.t04(parmod, timestep.psi, timestep.xgsm[j], timestep.ygsm[j], timestep.zgsm[j]))
+            else:
+                B_location = B_external[j]
+            e, n, u = np.matmul(gsm_to_enu[j], B_location + timestep.dipole[j])
+            B[i, j] = n, e, u
+    return B
+
+def magnetic_field_predictor(storm_data:pd.DataFrame, min_longitude:float, max_longitude: float, min_latitude:float, max_latitude:float, resolution_deg:float = None, processes:int = 1, executor:ProcessPoolExecutor = None, emulator_stride:int = None) -> FieldCube:
     """ Take in strom data in a pandas dataframe each column will be a different data type. The rows will be time points
         @param: storm_data: Multiindex pandas dataframe. First index is a time point, 
         second is longitude, third is latitude. The columns are the solar storm data
@@ -382,79 +748,154 @@ def magnetic_field_predictor(storm_data:pd.DataFrame, min_longitude:float, max_l
         @param: max_longitude: maximum longitude in degrees
         @param: min_latitude: minimum latitude in degrees
         @param: max_latitude: maximum latitude in degrees
-        @param: granularity: the step size between GPS coordinates. This parameter has a strong effect on computation time.
+        @param: resolution_deg: the largest step size between GPS coordinates in degrees. This parameter has a strong effect on computation time.
+                                When it is None only the four corners of the grid are evaluated.
         The above five parameters form a grid where the magnetic field vector will be calculated for each time point
-        return: pandas dataframe with the total magnetic field vector (nT) at each time (sec) and location long, lat (degrees)
+        @param: processes: number of worker processes used to evaluate the field model. 1 evaluates it in this process
+        @param: executor: optional ProcessPoolExecutor to evaluate the field model on instead of starting a new one.
+                          processes should then be its number of workers
+        @param: emulator_stride: quick look mode. When it is given a T04Emulator fills in the field model from the table
+                                 of the lattice in EMULATOR_TABLE_DIRECTORY. Of every emulator_stride-th time point only
+                                 the states the table does not cover yet are evaluated exactly and added to the table, so
+                                 a storm update inside the range of earlier storms needs no exact evaluation. With worker
+                                 processes both the new states and the emulated field are evaluated on them
+        return: FieldCube with the total magnetic field vector (nT) at each time (sec) and location long, lat (degrees)
     """
-    longitude_vector = np.array([min_longitude, max_longitude])
-    latitude_vector = np.array([min_latitude, max_latitude])
-    time_array = storm_data["time"].to_numpy(copy=True)
-    
-    
-    particle_density = storm_data["density"].to_numpy(dtype=float, copy=True)
-    speed = storm_data["speed"].to_numpy(dtype=float, copy=True)
-    Bxgsm = storm_data["Bx"].to_numpy(dtype=float, copy=True)
-    Bygsm = storm_data["By"].to_numpy(dtype=float, copy=True)
-    Bzgsm = storm_data["Bz"].to_numpy(dtype=float, copy=True)
-    Vxgsm = storm_data["Vx"].to_numpy(dtype=float, copy=True)
-    Vygsm = storm_data["Vy"].to_numpy(dtype=float, copy=True)
-    Vzgsm = storm_data["Vz"].to_numpy(dtype=float, copy=True)
-    dst_array = storm_data['dst'].to_numpy(dtype=float, copy=True)
-    # build time, longitude, and latitude array for pandas multindex.
-    length = longitude_vector.size * latitude_vector.size * time_array.size
-    
-    # build index 
-    time_index_array = np.empty([1, length], dtype=object)[0]
-    longitude_index_array = np.empty([1, length], dtype=object)[0]
-    latitude_index_array = np.empty([1, length], dtype=object)[0]
-    time_point = 0
-    longitude_point = 0
-    
-    for i in range(length):
-        # time should be same value up until the length of the longitude vector
-        # reset longitude vector to 0 every time we reach the end of the latitude vector
-        if ((i) % (latitude_vector.size)) == 0:
-            if i != 0:
-                
-                longitude_point += 1
-        if ((i) % (longitude_vector.size * latitude_vector.size)) == 0:
-            if i != 0:
-                time_point += 1
-                longitude_point = 0
-        
-        time_index_array[i] = str(time_array[time_point])
-        
-        longitude_index_array[i] = str(longitude_vector[longitude_point])
-        # repeatedly copy the longitude and latitude points to the index array
-        latitude_index_array[i] = str(latitude_vector[i % latitude_vector.size])
-    
+    if executor is None and processes > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            return magnetic_field_predictor(storm_data, min_longitude, max_longitude, min_latitude, max_latitude,
+                                            resolution_deg, processes, pool, emulator_stride)
 
-    index = [time_index_array, longitude_index_array, latitude_index_array]
+    longitude_vector = lattice_vector(min_longitude, max_longitude, resolution_deg)
+    latitude_vector = lattice_vector(min_latitude, max_latitude, resolution_deg)
+    time_array = storm_data["time"].to_numpy(copy=True)
     
-    index = pd.MultiIndex.from_arrays(index, names=["time", "longitude", "latitude"])
-    data_dict = {"Bx":np.zeros(length), "By": np.zeros(length), "Bz": np.zeros(length)}
-    data = pd.DataFrame(data_dict, index=index)
-    # data is a triple indexed pandas dataframe with magnetic field vectors zeroed
-    data.dropna(inplace=True)
-    
-
-    time_array_minutes = np.zeros(time_array.size)
-    for i in range(time_array.size):
-        time_array_minutes[i] = time_array[i] / 60
+    # the southward IMF and the W subfunctions are prepared once for the whole storm
+    drivers = get_solar_wind_drivers(storm_data)
+    particle_density = drivers.N
+    speed = drivers.V
+    Bxgsm = drivers.Bxgsm
+    Bygsm = drivers.Bygsm
+    Bzgsm = drivers.Bzgsm
+    Vxgsm = drivers.Vxgsm
+    Vygsm = drivers.Vygsm
+    Vzgsm = drivers.Vzgsm
+    dst_array = drivers.dst
+    time_array_minutes = drivers.time_minutes
     
+    # the W parameters only depend on the solar wind so they are integrated once per time point for every location
+    w_accumulator = WAccumulator()
+    W = np.zeros((time_array_minutes.size - 1, 6))
     for t in range(1, time_array_minutes.size):
-        dst = dst_array[t-1]
-        
-        for long in range(longitude_vector.size):
-            for lat in range(latitude_vector.size):
-                # The W functions integrate to the current time point so the array should stop with the current time
-                
-                Bx, By, Bz = calculateBField(time_array_minutes[:t], particle_density[:t], speed[:t], Bxgsm[:t], Bygsm[:t], Bzgsm[:t], Vxgsm[t-1], Vygsm[t-1], Vzgsm[t-1], longitude_vector[long], latitude_vector[lat], dst)
-                
-                data.loc[(str(time_array[t]), str(longitude_vector[long]), str(latitude_vector[lat])), 'Bx'] = Bx
-                data.loc[(str(time_array[t]), str(longitude_vector[long]), str(latitude_vector[lat])), 'By'] = By
-                data.loc[(str(time_array[t]), str(longitude_vector[long]), str(latitude_vector[lat])), 'Bz'] = Bz
-                
-    data = data.loc[(data!=0).any(axis=1)]
-    return data
-
+        # fold the newest sample into the W integrals
+        w_accumulator.update_sk(time_array_minutes[t-1], drivers.Sk[:, t-1])
+        W[t-1] = w_accumulator.values()
+
+    # every location in lattice order, longitude major
+    longitude_points, latitude_points = np.meshgrid(longitude_vector, latitude_vector, indexing='ij')
+    longitude_points = longitude_points.ravel()
+    latitude_points = latitude_points.ravel()
+
+    # the field at time point t is calculated from the sample before it
+    samples = [time_array_minutes, particle_density, speed, Bxgsm, Bygsm, Bzgsm, Vxgsm, Vygsm, Vzgsm, dst_array]
+    samples = [sample[:-1] for sample in samples] + [W]
+
+    if emulator_stride is not None:
+        key = lattice_key(longitude_points, latitude_points)
+        inputs, responses = load_response_table(key, longitude_points.size)
+        # the last time point is always a candidate so the newest samples are not extrapolated
+        design = np.unique(np.append(np.arange(0, samples[0].size, emulator_stride), samples[0].size - 1))
+        design = [sample[design] for sample in samples]
+        if inputs.shape[0] > inputs.shape[2]:
+            # only the states outside the range of the table are evaluated exactly
+            new_states = ~get_t04_emulator(key, inputs, responses).covers(
+                t04_model_inputs(tuple(design) + (longitude_points, latitude_points))).all(axis=1)
+            design = [sample[new_states] for sample in design]
+        if design[0].size:
+            if executor is not None:
+                new_inputs, new_responses = evaluate_response_table(design, longitude_points, latitude_points, executor, processes)
+            else:
+                new_inputs, new_responses = t04_response_table(tuple(design) + (longitude_points, latitude_points))
+            inputs = np.concatenate([inputs, new_inputs])[-EMULATOR_TABLE_SIZE:]
+            responses = np.concatenate([responses, new_responses])[-EMULATOR_TABLE_SIZE:]
+            save_response_table(key, inputs, responses)
+        emulator = get_t04_emulator(key, inputs, responses)
+        if executor is not None:
+            B = evaluate_field_shards(samples, longitude_points, latitude_points, executor, processes, emulator)
+        else:
+            B = calculate_field_shard(tuple(samples) + (longitude_points, latitude_points), emulator)
+    elif executor is not None:
+        B = evaluate_field_shards(samples, longitude_points, latitude_points, executor, processes)
+    else:
+        B = calculate_field_shard(tuple(samples) + (longitude_points, latitude_points))
+
+    # the first time point has no prior samples so the field starts at the second one
+    B = B.reshape(time_array.size - 1, longitude_vector.size, latitude_vector.size, 3)
+    return FieldCube(B, time_array[1:], longitude_vector, latitude_vector, ["Bx", "By", "Bz"])
+
+def field_shards(samples:list, longitudes:np.array, latitudes:np.array, workers:int, split_locations:bool = True) -> tuple:
+    """ This function splits the (time, location) work of magnetic_field_predictor into shards for a process pool.
+        @param: samples: list of the per time point arrays passed to calculate_field_shard
+        @param: longitudes: numpy array of the longitude of each location in degrees
+        @param: latitudes: numpy array of the latitude of each location in degrees
+        @param: workers: number of worker processes the shards are evaluated on
+        @param: split_locations: False keeps every location in each shard and only splits the time points
+        return: time_slices, location_slices: lists of the time point and location indices of the shards
+                shards: list of the shard tuples calculate_field_shard takes, in time major order
+    """
+    time_points = samples[0].size
+    # split locations only when there are not enough time points to keep every worker busy
+    location_blocks = max(1, min(longitudes.size, -(-4 * workers // max(time_points, 1)))) if split_locations else 1
+    time_blocks = max(1, min(time_points, -(-4 * workers // location_blocks)))
+    time_slices = np.array_split(np.arange(time_points), time_blocks)
+    location_slices = np.array_split(np.arange(longitudes.size), location_blocks)
+
+    shards = []
+    for time_slice in time_slices:
+        for location_slice in location_slices:
+            shard = [sample[time_slice] for sample in samples]
+            shards.append(tuple(shard) + (longitudes[location_slice], latitudes[location_slice]))
+    return time_slices, location_slices, shards
+
+def evaluate_field_shards(samples:list, longitudes:np.array, latitudes:np.array, executor:ProcessPoolExecutor, workers:int, emulator:T04Emulator = None) -> np.array:
+    """ This function evaluates calculate_field_shard for the shards of field_shards on a process pool.
+        Results are put back together in the original order no matter which worker finishes first.
+        @param: samples: list of the per time point arrays passed to calculate_field_shard
+        @param: longitudes: numpy array of the longitude of each location in degrees
+        @param: latitudes: numpy array of the latitude of each location in degrees
+        @param: executor: ProcessPoolExecutor to evaluate the shards on
+        @param: workers: number of worker processes in executor
+        @param: emulator: optional T04Emulator built for the same locations, handed to every shard
+        return: numpy array of shape (time points, locations, 3) with the north, east and up magnetic field (nT)
+    """
+    # the emulator has a model for every location so its shards keep all of them
+    time_slices, location_slices, shards = field_shards(samples, longitudes, latitudes, workers, emulator is None)
+
+    B = np.zeros((samples[0].size, longitudes.size, 3))
+    # map returns results in the order the shards were submitted
+    results = executor.map(calculate_field_shard, shards, [emulator] * len(shards))
+    for time_slice in time_slices:
+        for location_slice in location_slices:
+            B[time_slice[0]:time_slice[-1] + 1, location_slice[0]:location_slice[-1] + 1] = next(results)
+    return B
+
+def evaluate_response_table(samples:list, longitudes:np.array, latitudes:np.array, executor:ProcessPoolExecutor, workers:int) -> tuple:
+    """ This function evaluates t04_response_table for the shards of field_shards on a process pool.
+        @param: samples: list of the per time point arrays of the table's time points, as passed to calculate_field_shard
+        @param: longitudes: numpy array of the longitude of each location in degrees
+        @param: latitudes: numpy array of the latitude of each location in degrees
+        @param: executor: ProcessPoolExecutor to evaluate the shards on
+        @param: workers: number of worker processes in executor
+        return: inputs, responses: numpy arrays of shape (time points, locations, 14) and (time points, locations, 3)
+                that T04Emulator is built from
+    """
+    time_slices, location_slices, shards = field_shards(samples, longitudes, latitudes, workers)
+
+    inputs = np.zeros((samples[0].size, longitudes.size, 14))
+    responses = np.zeros((samples[0].size, longitudes.size, 3))
+    results = executor.map(t04_response_table, shards)
+    for time_slice in time_slices:
+        for location_slice in location_slices:
+            window = (slice(time_slice[0], time_slice[-1] + 1), slice(location_slice[0], location_slice[-1] + 1))
+            inputs[window], responses[window] = next(results)
+    return inputs, responses
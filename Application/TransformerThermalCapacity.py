@@ -80,8 +80,9 @@ def hs_temp_rise_calculation(Iss, Tss, tau, GIC_data):
     # for example, the interpolation function will be able to find the steady state temperature for an input of 8A
 
     for i in range(np.shape(GIC_data)[0]):
-        Current[i] = GIC_data[i][1]
+        Current[i] = abs(GIC_data[i][1])
         # using a for loop to fill the empty array with the current values in the GIC_data array
+        # the heating does not depend on the direction of the dc current, so its magnitude is used
     x = np.interp(Current, Iss, Tss)
     # creating a new array that interpolates the currents with the steady state current and steady state temp
     y = np.zeros((np.shape(GIC_data)[0], 2))
@@ -303,6 +304,53 @@ def transformer_thermal_capacity(branch_data:dict) -> dict:
 
     return branch_data
 
+# steady state dc currents of the EPRI models (A), tie bar design 2 time constant (min) and structural temperature limit (K),
+# the same values as transformer_thermal_capacity_t
+EPRI_ISS = np.array([0, 10, 20, 40, 50, 100, 200])
+TIE_BAR_TAU = 8
+TEMPERATURE_LIMIT = 473.15
+
+def tie_bar_models(types:list) -> tuple:
+    """ This function finds the design 2 tie bar model of every transformer, the same model transformer_thermal_capacity_t
+        picks for its type
+        @param: types: list of the transformer types, such as 'gsu' or 'auto'
+        return: (steady state temperatures, top oil temperatures): numpy arrays of shape (transformers, 7) (K) and
+                (transformers,) (K)
+    """
+    design_2 = csv_to_array("EPRI Tie Bar Design 2 SS Values.csv")
+    top_oil = csv_to_array("Transformer Top Oil Temp.csv")
+    models = np.array([10 if str(kind).lower() == 'auto' else 23 for kind in types], dtype=int)
+    return design_2[models, 1:8].astype(np.float32).astype(float), top_oil[models, 1].astype(float) + 273.15
+
+def overheat_times(time:np.array, gics:np.array, steady_state:np.array, top_oil:np.array) -> np.array:
+    """ This function runs the heat up of hs_temp_rise_calculation for many transformers at once and finds when each
+        one reaches the temperature limit, like transformer_thermal_capacity_t. Only the time loop is left, every step
+        updates all the transformers.
+        @param: time: numpy array of the time points (min)
+        @param: gics: numpy array of shape (..., transformers, time points) with the gics (A). The heating does not depend
+                      on the direction of the gic, so either sign can be given, like hs_temp_rise_calculation
+        @param: steady_state: numpy array of shape (transformers, 7) with the steady state temperatures of tie_bar_models
+        @param: top_oil: numpy array of shape (transformers,) with the top oil temperatures of tie_bar_models
+        return: numpy array of shape (..., transformers) with the time the limit is reached, nan when it is not
+    """
+    # steady state temperature of every sample, the interpolation of np.interp done for every transformer at once
+    current = np.clip(np.abs(gics), EPRI_ISS[0], EPRI_ISS[-1])
+    segment = np.clip(np.searchsorted(EPRI_ISS, current, side='right') - 1, 0, EPRI_ISS.size - 2)
+    fraction = (current - EPRI_ISS[segment]) / (EPRI_ISS[segment + 1] - EPRI_ISS[segment])
+    transformer = np.arange(steady_state.shape[0])[:, None]
+    low = steady_state[transformer, segment]
+    x = low + fraction * (steady_state[transformer, segment + 1] - low)
+
+    y = np.zeros(gics.shape[:-1])
+    reached = np.full(gics.shape[:-1], np.nan)
+    reached[top_oil + y >= TEMPERATURE_LIMIT] = time[0]
+    for i in range(1, time.size):
+        alpha = 2 * TIE_BAR_TAU / (time[i] - time[i - 1])
+        y = (x[..., i - 1] + x[..., i]) / (1 + alpha) - (1 - alpha) / (1 + alpha) * y
+        hot = (y + top_oil >= TEMPERATURE_LIMIT) & np.isnan(reached)
+        reached[hot] = time[i]
+    return reached
+
 if __name__ == '__main__':
     gic_time = csv_to_array("TTC GIC Data.csv")
     gic_array = np.zeros(gic_time.shape[0])
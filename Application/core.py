@@ -8,13 +8,24 @@ import pandas as pd
 import numpy as np
 from time import sleep
 from multiprocessing import Process, Queue
+from multiprocessing import Event as ProcessEvent
+from concurrent.futures import ProcessPoolExecutor
 import hashlib
+import os
 from GUI import App
 from NOAASolarStormDataMiner import data_scraper, interpolate_data
-from ElectricFieldPredictor import ElectricFieldCalculator
+from ElectricFieldPredictor import ElectricFieldCalculator, shared_e_field
+from FieldCube import FieldCube
+from ConductivityMap import ConductivityMap
 from gic_solver import gic_computation
 from TransformerThermalCapacity import transformer_thermal_capacity
 
+# seconds execute_process waits for a cancelled child process to stop its worker processes and exit before terminating it
+CANCEL_TIMEOUT = 10
+
+# process pools of the child process of execute_process, stopped by watch_cancel when the child is cancelled
+child_executors = []
+
 class Core():
     # Variables for GUI subsystem
     app = None
@@ -22,6 +33,20 @@ class Core():
     requests_sem = None
     requests_queue = []
 
+    # Conductivity map file for the electric field, None uses the Finland model for the whole grid
+    conductivity_map_file = None
+    # Worker processes used to calculate the magnetic and electric fields, 1 calculates them in the simulation process.
+    # Set it to os.cpu_count() to use every core
+    electric_field_processes = 1
+    # Largest spacing in degrees between the lattice points of the magnetic and electric fields, None for the four
+    # corners of the grid only
+    field_resolution_deg = None
+    # Quick look mode, interpolate the magnetic field model from the table of the lattice kept on disk. Of every
+    # emulator_stride-th time point only the states the table does not cover yet are evaluated. None evaluates all
+    emulator_stride = None
+    # 'endpoints' or 'path', how the electric field is integrated along the transmission lines
+    line_integration = 'endpoints'
+
     # Variables for logging
     logging_thread = None
     logging_sem = None
@@ -520,35 +545,49 @@ class Core():
 
     def calculate_simulation(self, grid_name, progress_sem, terminate_event, storm_data):
         # Calculate E field values
-        resistivity_data = pd.read_csv('Finland_1D_model_old.csv')
+        if self.conductivity_map_file is not None:
+            resistivity_data = ConductivityMap.from_csv(self.conductivity_map_file)
+        else:
+            resistivity_data = pd.read_csv('Finland_1D_model_old.csv')
+        # the E field is written into shared memory by the E field process and read from it by the GIC process,
+        # so it is never copied back through a multiprocessing queue
+        shared_E_field = shared_e_field(storm_data, self.app.min_long, self.app.max_long, self.app.min_lat, self.app.max_lat,
+                                        self.field_resolution_deg)
         E_field = None
-        results = self.execute_process(wrap_ElectricFieldCalculator, {
-            "resistivity_data" : resistivity_data, "solar_storm" : storm_data,
-            "min_longitude" : self.app.min_long, "max_longitude" : self.app.max_long,
-            "min_latitude" : self.app.min_lat, "max_latitude" : self.app.max_lat
-        }, terminate_event, True)
+        try:
+            results = self.execute_process(wrap_ElectricFieldCalculator, {
+                "resistivity_data" : resistivity_data, "solar_storm" : storm_data,
+                "min_longitude" : self.app.min_long, "max_longitude" : self.app.max_long,
+                "min_latitude" : self.app.min_lat, "max_latitude" : self.app.max_lat,
+                "resolution_deg" : self.field_resolution_deg, "processes" : self.electric_field_processes,
+                "emulator_stride" : self.emulator_stride, "E_field" : shared_E_field
+            }, terminate_event, True)
 
-        # check for termination
-        if terminate_event.is_set():
-            return "Termination event set"
+            # check for termination
+            if terminate_event.is_set():
+                return "Termination event set"
 
-        # extract data and return error if any
-        E_field = results["retval"]
-        if isinstance(E_field, str):
-            self.log_to_file("Core", "ElectricFieldCalculator returned an error: " + E_field)
-            return "ElectricFieldCalculator returned an error: " + E_field
+            # extract data and return error if any
+            E_field = results["retval"]
+            if isinstance(E_field, str):
+                self.log_to_file("Core", "ElectricFieldCalculator returned an error: " + E_field)
+                return "ElectricFieldCalculator returned an error: " + E_field
 
-        print(E_field)
+            print(E_field)
 
-        # notify E field stage complete
-        progress_sem.release()
+            # notify E field stage complete
+            progress_sem.release()
 
-        # GIC Solver
-        gic_data = self.execute_process(wrap_gic_computation, {"substation_data" : self.app.substation_data, "bus_data" : self.app.bus_data, "branch_data" : self.app.branch_data,
-        "E_field" : E_field}, terminate_event)["retval"]
-        if isinstance(gic_data, str):
-            self.log_to_file("Core", "gic_computation returned an error: " + gic_data)
-            return "gic_computation returned an error: " + gic_data
+            # GIC Solver
+            gic_data = self.execute_process(wrap_gic_computation, {"substation_data" : self.app.substation_data, "bus_data" : self.app.bus_data, "branch_data" : self.app.branch_data,
+            "E_field" : shared_E_field, "integration" : self.line_integration}, terminate_event, True)["retval"]
+            if isinstance(gic_data, str):
+                self.log_to_file("Core", "gic_computation returned an error: " + gic_data)
+                return "gic_computation returned an error: " + gic_data
+        finally:
+            if isinstance(E_field, FieldCube):
+                E_field.release()
+            shared_E_field.release()
 
         if terminate_event.is_set():
             return "Termination event set"
@@ -655,6 +694,7 @@ class Core():
             raise "execute_process must only be called from the main thread"
 
         ret_queue = Queue()
+        cancel_event = ProcessEvent()
 
         # initialize multiprocess logging queue if function supports it
         if logging:
@@ -662,7 +702,7 @@ class Core():
             params["log_queue"] = logging_queue
 
         # start process
-        p = Process(target=mp_function_wrapper, args=(ret_queue, func, params))
+        p = Process(target=mp_function_wrapper, args=(ret_queue, func, params, cancel_event))
         p.start()
         self.log_to_file("Core", "Process " + func.__name__ + " started")
 
@@ -676,7 +716,16 @@ class Core():
 
             # terminate process and return if terminate_event is set
             if terminate_event.is_set():
-                p.terminate()
+                # the child stops its worker processes itself, a terminated process never gets to on Windows
+                cancel_event.set()
+                deadline = time() + CANCEL_TIMEOUT
+                while p.is_alive() and time() < deadline:
+                    # a child that is exiting waits for its return value to be taken off the queue
+                    while not ret_queue.empty():
+                        ret_queue.get_nowait()
+                    p.join(0.1)
+                if p.is_alive():
+                    p.terminate()
                 p.join()
                 self.log_to_file("Core", "Process " + func.__name__ + " manually terminated")
                 return None
@@ -684,6 +733,11 @@ class Core():
         # return process result
         retval = ret_queue.get()
         p.join()
+        # pass on the log messages sent just before the function returned
+        if logging:
+            log_queue = params["log_queue"]
+            while not log_queue.empty():
+                self.log_to_file(func.__name__, log_queue.get_nowait())
         return retval
 
 ######################################
@@ -712,27 +766,57 @@ def wrap_ElectricFieldCalculator(params):
     min_latitude = params["min_latitude"]
     max_latitude = params["max_latitude"]
     log_queue = params["log_queue"]
-    return ElectricFieldCalculator(resistivity_data, solar_storm, min_longitude, max_longitude, min_latitude, max_latitude, log_queue)
+    resolution_deg = params["resolution_deg"]
+    emulator_stride = params["emulator_stride"]
+    processes = params["processes"]
+    E_field = params["E_field"]
+    if processes <= 1:
+        return ElectricFieldCalculator(resistivity_data, solar_storm, min_longitude, max_longitude, min_latitude, max_latitude, log_queue, resolution_deg, processes, emulator_stride, E_field)
+    # one pool for both fields, kept in child_executors so a cancel can stop it
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        child_executors.append(executor)
+        try:
+            return ElectricFieldCalculator(resistivity_data, solar_storm, min_longitude, max_longitude, min_latitude, max_latitude, log_queue, resolution_deg, processes, emulator_stride, E_field, executor)
+        finally:
+            child_executors.remove(executor)
 
 def wrap_gic_computation(params):
     substation_data = params["substation_data"]
     bus_data = params["bus_data"]
     branch_data = params["branch_data"]
     E_field = params["E_field"]
-    return gic_computation(substation_data, bus_data, branch_data, E_field)
+    integration = params.get("integration", "endpoints")
+    log_queue = params.get("log_queue")
+    return gic_computation(substation_data, bus_data, branch_data, E_field, integration, log_queue)
 
-def mp_function_wrapper(ret_queue, func, params):
+def mp_function_wrapper(ret_queue, func, params, cancel_event):
     """ This method is a helper for execute_process and wraps functions for being called in a separate process
         @param: ret_queue: A multiprocessing queue to send the function's return value or exception string down
         @param: func: The function being wrapped
         @param: params: The function's parameter(s) as a single argument
+        @param: cancel_event: A multiprocessing event execute_process sets to cancel the function
     """
+    Thread(target=watch_cancel, args=(cancel_event,), daemon=True).start()
     try:
         retval = func(params)
         ret_queue.put({"success": True, "retval" : retval})
     except Exception as e:
         ret_queue.put({"success": False, "retval" : str(e)})
 
+def watch_cancel(cancel_event):
+    """ This method waits in a thread of the processes started by execute_process until they are cancelled, then shuts
+        down the process pools in child_executors and terminates their workers. The function being run gets an error
+        from its pool, so it returns through its finally blocks and the shared memory it made is released
+        @param: cancel_event: The multiprocessing event execute_process sets to cancel the process
+    """
+    cancel_event.wait()
+    for executor in list(child_executors):
+        # taken before the shutdown, which lets go of them
+        workers = list((executor._processes or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for worker in workers:
+            worker.terminate()
+
 def local_to_utc(time_val):
         local_timezone = datetime.datetime.now().astimezone().tzinfo
         return time_val.replace(tzinfo=local_timezone).astimezone(timezone.utc)
@@ -0,0 +1,110 @@
+import sys
+import os
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import MagneticFieldPredictor
+
+""" This code measures the error of the T04Emulator quick look mode against the exact T04 model on a storm record that
+    was not used to build its table.
+    The table of the corners of a grid is built by magnetic_field_predictor from every STRIDE-th time point of the June
+    2015 storm in 2015_storm_test_data.csv, without the six hours of SampleData/2015Storm.csv. The 2015 storm is then
+    run again with the table from disk.
+    The emulator of that table is checked against the exact model on SampleData/2015Storm.csv, a separate one minute
+    record of those six hours, at the states the table covers. Last, that record is run through the predictor as a storm
+    update, which only evaluates exactly and adds the states the table does not cover.
+    The tables are written to a temporary directory.
+"""
+
+STRIDE = 4
+repository = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+corners = (-105, -104, 40, 41)
+
+
+def rho(array1:np.array, array2:np.array):
+
+    return np.corrcoef(array1, array2)[0][1]
+
+
+def timed(function) -> tuple:
+
+    start = time.time()
+    result = function()
+    return result, time.time() - start
+
+
+def ground_field(external:np.array, shard:tuple) -> np.array:
+
+    # the dipole and the rotation to enu of every time point, the same as calculate_field_shard
+    time_minutes, N, V, Bxgsm, Bygsm, Bzgsm, Vxgsm, Vygsm, Vzgsm, dst, W, longitudes, latitudes = shard
+    x, y, z = MagneticFieldPredictor.GPS_to_cartesian(longitudes, latitudes, 5318)
+    enu = MagneticFieldPredictor.enu_rotation(longitudes, latitudes)
+    B = np.zeros(external.shape)
+    for i in range(time_minutes.size):
+        timestep = MagneticFieldPredictor.GeopackTimestep(time_minutes[i], Vxgsm[i], Vygsm[i], Vzgsm[i], x, y, z)
+        B[i] = np.einsum('lij,lj->li', np.matmul(enu, timestep.geo_to_gsm.T), external[i] + timestep.dipole)
+    return B
+
+
+def storm_samples(storm_data:pd.DataFrame, longitudes:np.array, latitudes:np.array) -> tuple:
+
+    # the same samples magnetic_field_predictor evaluates, the field at a time point comes from the sample before it
+    drivers = MagneticFieldPredictor.get_solar_wind_drivers(storm_data)
+    accumulator = MagneticFieldPredictor.WAccumulator()
+    W = np.zeros((drivers.time_minutes.size - 1, 6))
+    for t in range(1, drivers.time_minutes.size):
+        accumulator.update_sk(drivers.time_minutes[t-1], drivers.Sk[:, t-1])
+        W[t-1] = accumulator.values()
+    samples = [drivers.time_minutes, drivers.N, drivers.V, drivers.Bxgsm, drivers.Bygsm, drivers.Bzgsm, drivers.Vxgsm,
+               drivers.Vygsm, drivers.Vzgsm, drivers.dst]
+    return tuple(sample[:-1] for sample in samples) + (W, longitudes, latitudes)
+
+
+MagneticFieldPredictor.EMULATOR_TABLE_DIRECTORY = tempfile.mkdtemp()
+test_storm = pd.read_csv(os.path.join(repository, "SampleData", "2015Storm.csv"))
+table_storm = pd.read_csv(os.path.join(repository, "2015_storm_test_data.csv"))
+held_out = (table_storm['time'] >= test_storm['time'].min()) & (table_storm['time'] <= test_storm['time'].max())
+table_storm = table_storm[~held_out].reset_index(drop=True)
+
+exact_table, exact_table_time = timed(lambda: MagneticFieldPredictor.magnetic_field_predictor(table_storm, *corners))
+built_table, build_time = timed(lambda: MagneticFieldPredictor.magnetic_field_predictor(table_storm, *corners, emulator_stride=STRIDE))
+longitudes, latitudes = [points.ravel() for points in np.meshgrid(built_table.longitude, built_table.latitude, indexing='ij')]
+key = MagneticFieldPredictor.lattice_key(longitudes, latitudes)
+table_inputs, table_responses = MagneticFieldPredictor.load_response_table(key, longitudes.size)
+# a new process has to fit the emulator from the table on disk again
+MagneticFieldPredictor.t04_emulator_cache.clear()
+rerun_table, rerun_time = timed(lambda: MagneticFieldPredictor.magnetic_field_predictor(table_storm, *corners, emulator_stride=STRIDE))
+assert MagneticFieldPredictor.load_response_table(key, longitudes.size)[0].shape == table_inputs.shape, \
+    "The second run of the same storm added states to the table"
+
+print("table storm time points: ", exact_table.time.size, " table states: ", table_inputs.shape[0], " locations: ", longitudes.size)
+print("exact model time (s): ", exact_table_time, " first quick look time (s): ", build_time,
+      " quick look time with the table on disk (s): ", rerun_time)
+print("table storm in sample RMS error (nT): ", np.sqrt(np.mean((rerun_table.data - exact_table.data)**2)))
+
+# out of sample: the emulator of the table against the exact model on the held out record
+shard = storm_samples(test_storm, longitudes, latitudes)
+test_inputs, exact_external = MagneticFieldPredictor.t04_response_table(shard)
+emulator = MagneticFieldPredictor.get_t04_emulator(key, table_inputs, table_responses)
+covered = emulator.covers(test_inputs)
+emulated_external = np.where(covered[..., None], emulator.predict(test_inputs), exact_external)
+exact_enu = ground_field(exact_external, shard)
+emulated_enu = ground_field(emulated_external, shard)
+
+print("held out record time points: ", shard[0].size, " covered by the table: ", covered.mean() * 100, "%")
+error = (emulated_enu - exact_enu)[covered]
+for k, name in enumerate(['East', 'North', 'Up']):
+    rms = np.sqrt(np.mean(error[:, k]**2))
+    print(name, " out of sample RMS error at the covered states (nT): ", rms, " max error (nT): ", np.abs(error[:, k]).max(),
+          " std of the exact field (nT): ", exact_enu[covered][:, k].std(),
+          " correlation coefficient: ", rho(exact_enu[covered][:, k], emulated_enu[covered][:, k]))
+
+# the held out record as a storm update: only the states outside the table are evaluated exactly
+exact_test, exact_test_time = timed(lambda: MagneticFieldPredictor.magnetic_field_predictor(test_storm, *corners))
+update_test, update_time = timed(lambda: MagneticFieldPredictor.magnetic_field_predictor(test_storm, *corners, emulator_stride=STRIDE))
+added = MagneticFieldPredictor.load_response_table(key, longitudes.size)[0].shape[0] - table_inputs.shape[0]
+print("held out record exact model time (s): ", exact_test_time, " quick look time (s): ", update_time, " states added: ", added,
+      " RMS error (nT): ", np.sqrt(np.mean((update_test.data - exact_test.data)**2)))
@@ -0,0 +1,48 @@
+import time
+import numpy as np
+import gic_solver
+from grid_topology_benchmark import synthetic_grid
+
+""" This code checks gic_solver.GICContingencies.place_blocking_devices on the 20 bus grid and a synthetic 500 bus grid
+    from grid_topology_benchmark. The objective of every step is checked against solving the placement with
+    GICContingencies.solve, and the first step against scoring every candidate that way, which is also timed.
+"""
+
+devices = 5
+time_points = 360
+
+
+def solved_objective(contingencies:gic_solver.GICContingencies, voltages:np.ndarray, blocking:list, objective:str) -> float:
+
+    gics = np.abs(contingencies.solve(voltages, blocking=blocking)[len(contingencies.topology.lines):])
+    return gics.max() if objective == 'peak' else gics.sum()
+
+
+rng = np.random.default_rng(0)
+grids = {"20 bus": (gic_solver.substation_data_20, gic_solver.bus_data_20, gic_solver.branch_data_20),
+         "500 bus": synthetic_grid(500, rng)}
+
+print("grid, objective, candidates, placement time (s), max relative difference of the steps, "
+      "first step scoring by solve time (s), same first device")
+for grid, (substation_data, bus_data, branch_data) in grids.items():
+    contingencies = gic_solver.GICContingencies(substation_data, bus_data, branch_data)
+    voltages = rng.normal(size=(len(contingencies.topology.lines), time_points)) * 100
+    candidates = [branch for branch, data in branch_data.items()
+                  if data["has_trans"] and data["type"] == "gsu" and not data["GIC_BD"] and
+                  (data["trans_w1"] is None) != (data["trans_w2"] is None)]
+    for objective in ('peak', 'sum'):
+        start = time.perf_counter()
+        placement = contingencies.place_blocking_devices(voltages, devices, objective)
+        placement_time = time.perf_counter() - start
+
+        placed = list(placement["blocking device"][1:])
+        expected = [solved_objective(contingencies, voltages, placed[:step], objective) for step in range(len(placement))]
+        values = placement.iloc[:, 1].to_numpy()
+        difference = np.max(np.abs(values - expected) / np.array(expected))
+
+        start = time.perf_counter()
+        scores = [solved_objective(contingencies, voltages, [branch], objective) for branch in candidates]
+        scoring_time = time.perf_counter() - start
+        print(grid, objective, len(candidates), placement_time, difference, scoring_time,
+              candidates[int(np.argmin(scores))] == placed[0])
+    print(placement)
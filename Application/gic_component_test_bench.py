@@ -0,0 +1,68 @@
+import numpy as np
+from FieldCube import FieldCube
+import gic_solver
+
+""" This code checks that gic_solver.ConductanceSolver solves a grid made of several separate networks: the 20 bus grid,
+    the 6 bus grid as an island with its own bus and substation numbers, and a floating section of three lines in a
+    loop whose only transformer has delta windings on both sides, so it has no path to ground.
+    The grid and the island are checked against solving them on their own. The floating section is checked against
+    the least squares solution of its singular conductance matrix, which gives the same voltage differences.
+"""
+
+longitude = np.linspace(-88, -80, 9)
+latitude = np.linspace(32, 35, 7)
+time_points = 60
+island_offset = 100
+
+
+def floating_section() -> tuple:
+
+    substation_data = {201: {"lat": 32.5, "long": -83.0, "ground_r": 0.2},
+                       202: {"lat": 33.2, "long": -82.1, "ground_r": 0.2},
+                       203: {"lat": 32.4, "long": -81.3, "ground_r": 0.2}}
+    bus_data = {201: {"sub_num": 201}, 202: {"sub_num": 202}, 203: {"sub_num": 203}, 204: {"sub_num": 201}}
+    branch_data = {(201, 202, 1): {"has_trans": False, "resistance": 2.5, "type": None, "trans_w1": None, "trans_w2": None, "GIC_BD": False},
+                   (202, 203, 1): {"has_trans": False, "resistance": 3.0, "type": None, "trans_w1": None, "trans_w2": None, "GIC_BD": False},
+                   (203, 201, 1): {"has_trans": False, "resistance": 2.0, "type": None, "trans_w1": None, "trans_w2": None, "GIC_BD": False},
+                   (201, 204, 1): {"has_trans": True, "resistance": None, "type": "gsu", "trans_w1": 0.5, "trans_w2": 0.5, "GIC_BD": False}}
+    return substation_data, bus_data, branch_data
+
+
+def least_squares_gics(substation_data:dict, bus_data:dict, branch_data:dict, E_field:FieldCube) -> dict:
+
+    topology = gic_solver.GridTopology.from_grid(substation_data, bus_data, branch_data)
+    line_length = gic_solver.generate_line_length(gic_solver.list_line_data(substation_data, bus_data, branch_data))
+    currents = (3 / topology.line_resistance)[:, None] * gic_solver.input_voltages(line_length, E_field)
+    voltages = np.linalg.lstsq(topology.conductance_matrix().toarray(), topology.incidence() @ currents, rcond=None)[0]
+    gics = topology.voltage_coefficients @ voltages + topology.current_coefficients @ currents
+    return dict(zip(topology.names, gics))
+
+
+rng = np.random.default_rng(0)
+E_field = FieldCube(rng.normal(size=(time_points, longitude.size, latitude.size, 2)), np.arange(time_points) * 60.0,
+                    longitude, latitude, ['Ex', 'Ey'])
+
+island = ({sub + island_offset: data for sub, data in gic_solver.substation_data_6.items()},
+          {bus + island_offset: {"sub_num": data["sub_num"] + island_offset} for bus, data in gic_solver.bus_data_6.items()},
+          {(branch[0] + island_offset, branch[1] + island_offset, branch[2]): data for branch, data in gic_solver.branch_data_6.items()})
+parts = {"20 bus": (gic_solver.substation_data_20, gic_solver.bus_data_20, gic_solver.branch_data_20),
+         "6 bus island": island,
+         "floating section": floating_section()}
+grid = tuple({key: value for part in parts.values() for key, value in part[i].items()} for i in range(3))
+
+topology = gic_solver.GridTopology.from_grid(*grid)
+solver = gic_solver.ConductanceSolver(topology.conductance_matrix())
+print(solver)
+combined = gic_solver.gic_computation(*grid, E_field)
+
+print("part, max abs GIC (A), max abs difference (A)")
+for part, data in parts.items():
+    if part == "floating section":
+        expected = least_squares_gics(*data, E_field)
+    else:
+        gic_solver.gic_operator_cache.clear()
+        expected = gic_solver.gic_computation(*data, E_field)
+    names = [name for name in expected if name != 'time']
+    scale = max(np.abs(expected[name]).max() for name in names)
+    difference = max(np.abs(combined[name] - expected[name]).max() for name in names)
+    print(part, scale, difference)
@@ -0,0 +1,111 @@
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+import gic_solver
+from TransformerThermalCapacity import tie_bar_models, overheat_times
+
+""" This module runs an N-1 sweep of a grid for one storm: the gics of every single branch outage, the worst transformer
+    gic and the first transformer to reach the tie bar temperature limit of each one, ranked.
+    The cases are solved with gic_solver.GICContingencies on one factorization of the base grid. With more than one
+    process the outages are split into chunks on a process pool. Where processes can be forked the workers share the
+    factorized engine, the line input voltages and the transformer models of this process read only. Elsewhere every
+    worker gets a copy once when it starts instead of with every chunk, and factorizes the grid again.
+"""
+
+# contingency engine and storm of the sweep in this process, set by start_sweep_worker
+sweep_state = {}
+
+# largest number of outages evaluated together, their transformer gics are held at once
+SWEEP_CHUNK = 64
+
+REPORT_COLUMNS = ["outage", "worst transformer", "max transformer GIC (A)", "first to overheat", "time to overheat (min)"]
+
+
+def start_sweep_worker(contingencies: gic_solver.GICContingencies, voltages: np.ndarray, minutes: np.array):
+    """ This function keeps what every case of the sweep needs in this process
+        @param: contingencies: GICContingencies of the base grid
+        @param: voltages: numpy array of shape (lines, time points) with the input voltages of the lines (V)
+        @param: minutes: numpy array of the time points (min)
+    """
+    branch_data = contingencies.branch_data
+    transformers = [branch for branch, data in branch_data.items() if data["has_trans"]]
+    sweep_state["contingencies"] = contingencies
+    sweep_state["voltages"] = voltages
+    sweep_state["minutes"] = minutes
+    sweep_state["transformers"] = transformers
+    sweep_state["rows"] = np.array([contingencies.branch_row(branch) for branch in transformers], dtype=np.int64)
+    sweep_state["models"] = tie_bar_models([branch_data[branch]["type"] for branch in transformers])
+
+
+def sweep_outages(outages: list) -> list:
+    """ This function evaluates a chunk of single branch outages with the state of start_sweep_worker
+        @param: outages: list of the tuples of the branches taken out one at a time
+        return: list of one report row per outage, in the order of REPORT_COLUMNS
+    """
+    contingencies = sweep_state["contingencies"]
+    transformers = sweep_state["transformers"]
+    minutes = sweep_state["minutes"]
+
+    # transformer gic magnitudes of every case for the report, the thermal model takes the magnitude itself
+    gics = np.empty((len(outages), len(transformers), minutes.size))
+    for case, branch in enumerate(outages):
+        gics[case] = np.abs(contingencies.solve(sweep_state["voltages"], [branch])[sweep_state["rows"]])
+    # the heat up of every transformer of the chunk is run together
+    reached = overheat_times(minutes, gics, *sweep_state["models"]) - minutes[0]
+
+    rows = []
+    for case, branch in enumerate(outages):
+        peak = gics[case].max(axis=1)
+        worst = int(np.argmax(peak))
+        if np.isnan(reached[case]).all():
+            rows.append([branch, str(transformers[worst]), peak[worst], None, np.nan])
+        else:
+            first = int(np.nanargmin(reached[case]))
+            rows.append([branch, str(transformers[worst]), peak[worst], str(transformers[first]), reached[case, first]])
+    return rows
+
+
+def n1_sweep(substation_data: dict, bus_data: dict, branch_data: dict, voltages: np.ndarray, time: np.array,
+             processes: int = 1) -> pd.DataFrame:
+    """ This function takes every branch of the grid out of service one at a time and ranks the outages by how soon a
+        transformer overheats and then by the worst transformer gic
+        @param: substation_data: dictionary that contains latitudes and longitudes of substations in grid
+        @param: bus_data: dictionary that correlates bus numbers with substation numbers
+        @param: branch_data: dictionary that holds grid information pertaining to transmission lines
+        and transformers.
+        @param: voltages: numpy array of shape (lines, time points) with the input voltages of the lines in the order
+                of list_line_data (V), such as gic_solver.input_voltages gives
+        @param: time: numpy array of the time points (sec)
+        @param: processes: number of worker processes. 1 runs the sweep in this process
+        return: dataframe with the columns of REPORT_COLUMNS and one row per outage, ranked from 1
+    """
+    contingencies = gic_solver.GICContingencies(substation_data, bus_data, branch_data)
+    voltages = np.asarray(voltages, dtype=float)
+    minutes = np.asarray(time, dtype=float) / 60
+    outages = list(branch_data)
+
+    # a few chunks per worker so a slow chunk does not hold up the sweep
+    chunk_count = max(4 * processes, -(-len(outages) // SWEEP_CHUNK))
+    chunks = [[outages[i] for i in chunk] for chunk in np.array_split(np.arange(len(outages)), chunk_count) if chunk.size]
+    start_sweep_worker(contingencies, voltages, minutes)
+    try:
+        if processes > 1 and "fork" in multiprocessing.get_all_start_methods():
+            # forked workers inherit sweep_state with the factors of this process, nothing is pickled or factorized again
+            with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("fork")) as pool:
+                rows = [row for chunk_rows in pool.map(sweep_outages, chunks) for row in chunk_rows]
+        elif processes > 1:
+            with ProcessPoolExecutor(max_workers=processes, initializer=start_sweep_worker,
+                                     initargs=(contingencies, voltages, minutes)) as pool:
+                rows = [row for chunk_rows in pool.map(sweep_outages, chunks) for row in chunk_rows]
+        else:
+            rows = [row for chunk in chunks for row in sweep_outages(chunk)]
+    finally:
+        sweep_state.clear()
+
+    report = pd.DataFrame(rows, columns=REPORT_COLUMNS)
+    report = report.sort_values(["time to overheat (min)", "max transformer GIC (A)"], ascending=[True, False],
+                                na_position='last', kind='stable').reset_index(drop=True)
+    report.index = report.index + 1
+    report.index.name = "rank"
+    return report
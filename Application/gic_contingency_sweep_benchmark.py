@@ -0,0 +1,71 @@
+import time
+import numpy as np
+import pickle
+import gic_solver
+from TransformerThermalCapacity import tie_bar_models, overheat_times
+from gic_contingency_sweep import n1_sweep
+from grid_topology_benchmark import synthetic_grid
+
+""" This code times gic_contingency_sweep.n1_sweep on a synthetic 500 bus grid from grid_topology_benchmark, about the
+    size of ACTIVSg500, for a 6 hour storm at one sample per minute, and checks that the process pool gives the same
+    report as one process.
+    The storm is a random input voltage on every line that ramps up over the first hours. It is scaled to just below
+    the strength at which a transformer of the intact grid overheats, so only the outages that push more gic through
+    some transformer show up in the report as overheating.
+"""
+
+grid_size = 500
+storm_minutes = 360
+process_counts = [1, 2, 4]
+# fraction of the strength at which the intact grid overheats
+storm_margin = 0.98
+
+
+def intact_grid_overheats(contingencies: gic_solver.GICContingencies, voltages: np.ndarray, minutes: np.array) -> bool:
+
+    branch_data = contingencies.branch_data
+    transformers = [branch for branch, data in branch_data.items() if data["has_trans"]]
+    rows = [contingencies.branch_row(branch) for branch in transformers]
+    gics = np.abs(contingencies.solve(voltages)[rows])
+    models = tie_bar_models([branch_data[branch]["type"] for branch in transformers])
+    return bool(np.isfinite(overheat_times(minutes, gics[None], *models)).any())
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    substation_data, bus_data, branch_data = synthetic_grid(grid_size, rng)
+    lines = [branch for branch, data in branch_data.items() if not data["has_trans"]]
+    time_points = np.arange(storm_minutes) * 60.0
+    ramp = np.minimum(1, np.arange(storm_minutes) / 120)
+    voltages = rng.normal(size=(len(lines), 1)) * 150 * ramp + rng.normal(size=(len(lines), storm_minutes)) * 20
+
+    # bisect the storm strength at which the first transformer of the intact grid overheats
+    contingencies = gic_solver.GICContingencies(substation_data, bus_data, branch_data)
+    low, high = 0.0, 1.0
+    while not intact_grid_overheats(contingencies, voltages * high, time_points / 60):
+        low, high = high, high * 2
+    for _ in range(30):
+        middle = (low + high) / 2
+        if intact_grid_overheats(contingencies, voltages * middle, time_points / 60):
+            high = middle
+        else:
+            low = middle
+    voltages = voltages * low * storm_margin
+    print("storm scale: ", low * storm_margin, " contingency engine a worker would otherwise unpickle and factorize (MB): ",
+          len(pickle.dumps(contingencies)) / 1e6)
+
+    print("buses, branches, processes, sweep time (s), time per outage (s), outages that overheat, same report as 1 process")
+    single = None
+    for processes in process_counts:
+        start = time.perf_counter()
+        report = n1_sweep(substation_data, bus_data, branch_data, voltages, time_points, processes)
+        sweep_time = time.perf_counter() - start
+        if single is None:
+            single = report
+        same = report.equals(single)
+        overheating = int(report["time to overheat (min)"].notna().sum())
+        print(grid_size, len(branch_data), processes, sweep_time, sweep_time / len(report), overheating, same)
+        assert 0 < overheating < len(report), "The storm should overheat a transformer in only some of the outages"
+        assert same, "The process pool gave a different report"
+
+    print(single.head(10))
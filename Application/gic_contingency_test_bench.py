@@ -0,0 +1,89 @@
+import time
+import numpy as np
+import gic_solver
+from grid_topology_benchmark import synthetic_grid
+
+""" This code checks gic_solver.GICContingencies against building and factorizing every case from scratch.
+    The cases are single line outages, single transformer outages, blocking devices switched in gsu neutrals, series
+    capacitors switched on lines and a few cases with several changes at once, on the 20 bus grid and on a synthetic
+    2000 bus grid from grid_topology_benchmark.
+    The 20 bus grid is also checked with a section of three lines in a loop tied to it by one line, whose only
+    transformer has delta windings on both sides. Taking the tie line out leaves the section floating.
+"""
+
+cases_per_kind = 20
+time_points = 60
+
+
+def radial_island(substation_data:dict, bus_data:dict, branch_data:dict) -> tuple:
+
+    island_substations = {201: {"lat": 34.0, "long": -85.5, "ground_r": 0.2},
+                          202: {"lat": 34.6, "long": -85.1, "ground_r": 0.2},
+                          203: {"lat": 33.7, "long": -84.9, "ground_r": 0.2}}
+    island_buses = {201: {"sub_num": 201}, 202: {"sub_num": 202}, 203: {"sub_num": 203}, 204: {"sub_num": 201}}
+    line = lambda resistance: {"has_trans": False, "resistance": resistance, "type": None, "trans_w1": None, "trans_w2": None, "GIC_BD": False}
+    island_branches = {(2, 201, 1): line(3.2), (201, 202, 1): line(2.5), (202, 203, 1): line(3.0), (203, 201, 1): line(2.0),
+                       (201, 204, 1): {"has_trans": True, "resistance": None, "type": "gsu", "trans_w1": 0.5, "trans_w2": 0.5, "GIC_BD": False}}
+    return {**substation_data, **island_substations}, {**bus_data, **island_buses}, {**branch_data, **island_branches}
+
+
+def rebuilt_gics(substation_data:dict, bus_data:dict, branch_data:dict, voltages:dict, outages:list, blocking:list) -> dict:
+
+    case = {branch: dict(data) for branch, data in branch_data.items() if branch not in outages}
+    for branch in blocking:
+        case[branch]["GIC_BD"] = not case[branch]["GIC_BD"]
+    topology = gic_solver.GridTopology.from_grid(substation_data, bus_data, case)
+    solver = gic_solver.ConductanceSolver(topology.conductance_matrix())
+    currents = (3 / topology.line_resistance)[:, None] * np.array([voltages[line] for line in topology.lines])
+    gics = topology.voltage_coefficients @ solver.solve(topology.incidence() @ currents) + topology.current_coefficients @ currents
+    return dict(zip(topology.names, gics))
+
+
+rng = np.random.default_rng(0)
+grids = {"20 bus": (gic_solver.substation_data_20, gic_solver.bus_data_20, gic_solver.branch_data_20),
+         "20 bus with a radial island": radial_island(gic_solver.substation_data_20, gic_solver.bus_data_20, gic_solver.branch_data_20),
+         "2000 bus": synthetic_grid(2000, rng)}
+# outages that leave the section floating, as a whole or split by a line of its loop
+island_cases = [([(2, 201, 1)], []), ([(2, 201, 1), (201, 202, 1)], []), ([(2, 201, 1)], [(202, 203, 1)])]
+
+print("grid, cases, factorization time (s), mean time per case (s), mean rebuild time per case (s), max abs GIC (A), "
+      "max abs difference (A)")
+for grid, (substation_data, bus_data, branch_data) in grids.items():
+    start = time.perf_counter()
+    contingencies = gic_solver.GICContingencies(substation_data, bus_data, branch_data)
+    factorization_time = time.perf_counter() - start
+
+    lines = contingencies.topology.lines
+    voltages = rng.normal(size=(len(lines), time_points)) * 100
+    line_voltages = dict(zip(lines, voltages))
+    transformers = [branch for branch, data in branch_data.items() if data["has_trans"]]
+    gsus = [branch for branch in transformers if branch_data[branch]["type"] == "gsu"]
+    pick = lambda branches, count: [branches[i] for i in rng.choice(len(branches), size=min(count, len(branches)), replace=False)]
+    cases = [([line], []) for line in pick(lines, cases_per_kind)]
+    cases += [([transformer], []) for transformer in pick(transformers, cases_per_kind)]
+    cases += [([], [gsu]) for gsu in pick(gsus, cases_per_kind)]
+    cases += [([], [line]) for line in pick(lines, cases_per_kind)]
+    cases += [(pick(lines, 3) + pick(transformers, 2), pick(gsus, 2)) for i in range(cases_per_kind)]
+    if (2, 201, 1) in branch_data:
+        cases += island_cases
+
+    case_time = 0
+    rebuild_time = 0
+    scale = 0
+    difference = 0
+    for outages, blocking in cases:
+        # a blocking device is not switched on a branch that is out
+        blocking = [branch for branch in blocking if branch not in outages]
+        start = time.perf_counter()
+        gics = contingencies.solve(voltages, outages, blocking)
+        case_time += time.perf_counter() - start
+        start = time.perf_counter()
+        expected = rebuilt_gics(substation_data, bus_data, branch_data, line_voltages, outages, blocking)
+        rebuild_time += time.perf_counter() - start
+
+        for row, name in enumerate(contingencies.names):
+            value = expected.get(name, np.zeros(time_points))
+            scale = max(scale, np.abs(value).max())
+            difference = max(difference, np.abs(gics[row] - value).max())
+
+    print(grid, len(cases), factorization_time, case_time / len(cases), rebuild_time / len(cases), scale, difference)
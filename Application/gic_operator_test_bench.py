@@ -0,0 +1,136 @@
+import time
+import numpy as np
+import pandas as pd
+from FieldCube import FieldCube
+import gic_solver
+import baseline_gic_solver as baseline
+
+""" This code checks the compiled GICOperator of gic_solver.gic_computation against baseline_gic_solver, the frozen
+    copy of gic_solver before the rewrite, which solves the hardcoded 20 bus grid step by step with a dense inverse of
+    the conductance matrix. The baseline reads the field from a pandas dataframe on the four corners of a lattice that
+    covers the grid, so on the 20 bus grid every field is uniform over the lattice: a 1 V/km northward field, a 1 V/km
+    eastward field and a random field in time.
+    The baseline skips a first time point of 0, so the time starts at one minute.
+    The baseline fails on the 6 bus grid, so it is checked against an independent dense nodal solve instead, the
+    Lehtinen-Pirjola method with a node for every substation ground: the line input voltages are Norton current
+    sources, the nodal equations are solved with numpy.linalg.solve and the gics are the currents per phase of every
+    line, gsu neutral and auto. The auto gic is the series voltage over trans_w1 + trans_w2 plus the common winding
+    current, like the dictionary pipeline reports it. Its fields are a random field on a 9 by 7 lattice and the
+    uniform fields.
+"""
+
+longitude = np.array([-88.0, -80.0])
+latitude = np.array([32.0, 35.0])
+time_points = 60
+
+
+def dense_nodal_gics(substation_data:dict, bus_data:dict, branch_data:dict, E_field:FieldCube) -> dict:
+
+    line_length = gic_solver.generate_line_length(gic_solver.list_line_data(substation_data, bus_data, branch_data))
+    line_voltages = dict(zip([line['tuple'] for line in line_length], gic_solver.input_voltages(line_length, E_field)))
+
+    # (node, node, resistance) of every element, the three phases are in parallel so a phase resistance is divided by 3
+    elements = [(('sub', sub), 'ground', data['ground_r']) for sub, data in substation_data.items()]
+    for (W1_side, W2_side, circuit), data in branch_data.items():
+        sub = ('sub', bus_data[W1_side]['sub_num'])
+        if not data['has_trans']:
+            elements.append((W1_side, W2_side, data['resistance'] / 3))
+        elif data['type'] == 'gsu':
+            elements.append((W1_side if data['trans_w2'] is None else W2_side, sub, (data['trans_w1'] or data['trans_w2']) / 3))
+        elif data['type'] == 'auto':
+            elements += [(W1_side, W2_side, data['trans_w1'] / 3), (W2_side, sub, data['trans_w2'] / 3)]
+        else:
+            raise ValueError("The dense nodal solve only has lines, gsus and autos")
+    node = {}
+    for a, b, resistance in elements:
+        for key in (a, b):
+            if key != 'ground':
+                node.setdefault(key, len(node))
+
+    conductance = np.zeros((len(node), len(node)))
+    for a, b, resistance in elements:
+        conductance[node[a], node[a]] += 1 / resistance
+        if b != 'ground':
+            conductance[node[b], node[b]] += 1 / resistance
+            conductance[node[a], node[b]] -= 1 / resistance
+            conductance[node[b], node[a]] -= 1 / resistance
+    # the input voltage of a line is a Norton current source from its from bus to its to bus
+    sources = np.zeros((len(node), E_field.time.size))
+    for (W1_side, W2_side, circuit), voltage in line_voltages.items():
+        sources[node[W1_side]] -= voltage / (branch_data[(W1_side, W2_side, circuit)]['resistance'] / 3)
+        sources[node[W2_side]] += voltage / (branch_data[(W1_side, W2_side, circuit)]['resistance'] / 3)
+    solved = np.linalg.solve(conductance, sources)
+    V = lambda key: solved[node[key]]
+
+    # currents per phase
+    gics = {'time': E_field.time}
+    for (W1_side, W2_side, circuit), data in branch_data.items():
+        sub = ('sub', bus_data[W1_side]['sub_num'])
+        if not data['has_trans']:
+            gics[(W1_side, W2_side, circuit)] = (V(W1_side) - V(W2_side) + line_voltages[(W1_side, W2_side, circuit)]) / data['resistance']
+        elif data['type'] == 'gsu':
+            bus = W1_side if data['trans_w2'] is None else W2_side
+            gics[str((W1_side, W2_side, circuit))] = (V(bus) - V(sub)) / (data['trans_w1'] or data['trans_w2'])
+        else:
+            gics[str((W1_side, W2_side, circuit))] = ((V(W1_side) - V(W2_side)) / (data['trans_w1'] + data['trans_w2']) +
+                                                      (V(W2_side) - V(sub)) / data['trans_w2'])
+    return gics
+
+
+def baseline_frame(E_field:FieldCube) -> pd.DataFrame:
+
+    index = pd.MultiIndex.from_product([E_field.time, E_field.longitude, E_field.latitude], names=['time', 'lon', 'lat'])
+    return pd.DataFrame(E_field.data.reshape(-1, len(E_field.components)), index=index, columns=E_field.components)
+
+
+rng = np.random.default_rng(0)
+fields = {"north": np.broadcast_to([0.0, 1.0], (time_points, 1, 1, 2)),
+          "east": np.broadcast_to([1.0, 0.0], (time_points, 1, 1, 2)),
+          "random": rng.normal(size=(time_points, 1, 1, 2))}
+substation_data, bus_data, branch_data = gic_solver.substation_data_20, gic_solver.bus_data_20, gic_solver.branch_data_20
+
+print("field, baseline time (s), compiled time (s), max abs GIC (A), max abs difference (A)")
+for field, data in fields.items():
+    E_field = FieldCube(np.array(np.broadcast_to(data, (time_points, longitude.size, latitude.size, 2))),
+                        np.arange(1, time_points + 1) * 60.0, longitude, latitude, ['Ex', 'Ey'])
+
+    start = time.perf_counter()
+    expected = baseline.gic_computation(substation_data, bus_data, branch_data, baseline_frame(E_field))
+    baseline_time = time.perf_counter() - start
+
+    # the first field also compiles the operator
+    start = time.perf_counter()
+    compiled = gic_solver.gic_computation(substation_data, bus_data, branch_data, E_field)
+    compiled_time = time.perf_counter() - start
+
+    assert set(compiled) == set(expected), "The compiled operator has different gic names"
+    names = [name for name in expected if name != 'time']
+    scale = max(np.abs(expected[name]).max() for name in names)
+    difference = max(np.abs(compiled[name] - np.array(expected[name])).max() for name in names)
+    print(field, baseline_time, compiled_time, scale, difference)
+    assert difference < 1e-9 * scale, "The compiled operator does not match the baseline"
+
+substation_data, bus_data, branch_data = gic_solver.substation_data_6, gic_solver.bus_data_6, gic_solver.branch_data_6
+lattice_longitude = np.linspace(-88, -80, 9)
+lattice_latitude = np.linspace(32, 35, 7)
+fields["random"] = rng.normal(size=(time_points, lattice_longitude.size, lattice_latitude.size, 2))
+
+print("6 bus field, dense nodal time (s), compiled time (s), max abs GIC (A), max abs difference (A)")
+for field, data in fields.items():
+    E_field = FieldCube(np.array(np.broadcast_to(data, (time_points, lattice_longitude.size, lattice_latitude.size, 2))),
+                        np.arange(time_points) * 60.0, lattice_longitude, lattice_latitude, ['Ex', 'Ey'])
+
+    start = time.perf_counter()
+    expected = dense_nodal_gics(substation_data, bus_data, branch_data, E_field)
+    dense_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled = gic_solver.gic_computation(substation_data, bus_data, branch_data, E_field)
+    compiled_time = time.perf_counter() - start
+
+    assert set(compiled) == set(expected), "The compiled operator has different gic names"
+    names = [name for name in expected if name != 'time']
+    scale = max(np.abs(expected[name]).max() for name in names)
+    difference = max(np.abs(compiled[name] - expected[name]).max() for name in names)
+    print(field, dense_time, compiled_time, scale, difference)
+    assert difference < 1e-9 * scale, "The compiled operator does not match the dense nodal solve"
@@ -0,0 +1,49 @@
+import time
+import numpy as np
+from FieldCube import FieldCube
+import gic_solver
+
+""" This code checks gic_solver.uniform_field_screening against calling gic_computation with a uniform field at every
+    azimuth, on the hardcoded 6 bus and 20 bus grids with both line integrations.
+    With 'path' the lines are split where they cross the lattice, and the screening lattice is coarser than the one used
+    here, so the two differ by the small error of following the great circle in straight pieces.
+"""
+
+grids = {"6 bus": (gic_solver.substation_data_6, gic_solver.bus_data_6, gic_solver.branch_data_6),
+         "20 bus": (gic_solver.substation_data_20, gic_solver.bus_data_20, gic_solver.branch_data_20)}
+longitude = np.linspace(-88, -80, 9)
+latitude = np.linspace(32, 35, 7)
+azimuths = np.arange(360)
+magnitudes = [1.0, 8.0]
+
+print("grid, integration, gic_computation per azimuth time (s), screening time (s), max abs GIC at 1 V/km (A), "
+      "max abs difference (A), same worst azimuths")
+for grid, (substation_data, bus_data, branch_data) in grids.items():
+    for integration in ('endpoints', 'path'):
+        gic_solver.gic_operator_cache.clear()
+        gic_solver.line_operator_cache.clear()
+
+        start = time.perf_counter()
+        peak = {}
+        for azimuth in azimuths:
+            field = [np.sin(np.radians(azimuth)), np.cos(np.radians(azimuth))]
+            E_field = FieldCube(np.broadcast_to(field, (1, longitude.size, latitude.size, 2)), np.zeros(1), longitude,
+                                latitude, ['Ex', 'Ey'])
+            gics = gic_solver.gic_computation(substation_data, bus_data, branch_data, E_field, integration)
+            peak[azimuth] = {name: abs(value[0]) for name, value in gics.items() if isinstance(name, str) and name != 'time'}
+        stepwise_time = time.perf_counter() - start
+
+        gic_solver.gic_operator_cache.clear()
+        gic_solver.line_operator_cache.clear()
+        start = time.perf_counter()
+        screening = gic_solver.uniform_field_screening(substation_data, bus_data, branch_data, magnitudes, azimuths, integration)
+        screening_time = time.perf_counter() - start
+
+        expected = np.array([[peak[azimuth][name] for azimuth in azimuths] for name in screening.index])
+        difference = np.abs(expected.max(axis=1) - screening["GIC at 1.0 V/km (A)"].to_numpy()).max()
+        difference = max(difference, np.abs(expected.max(axis=1) * 8 - screening["GIC at 8.0 V/km (A)"].to_numpy()).max())
+        # rounding can pick a different azimuth where two give the same gic
+        worst = azimuths[np.argmax(expected, axis=1)]
+        same = bool(np.all((worst == screening["worst azimuth (deg)"].to_numpy())
+                           | np.isclose(expected.max(axis=1), expected[np.arange(worst.size), screening["worst azimuth (deg)"].to_numpy()])))
+        print(grid, integration, stepwise_time, screening_time, expected.max(), difference, same)
@@ -1,72 +1,233 @@
 import math
+import time
+import hashlib
 import numpy as np
 import pandas as pd
-from scipy.interpolate import RegularGridInterpolator
+from scipy import sparse
+from scipy.sparse.linalg import splu
+from concurrent.futures import ThreadPoolExecutor
+from FieldCube import FieldCube
 # import make3DPandas # for testing only
 
 
-def get_line_Efield(df_3D: pd.DataFrame, from_coords: list, to_coords: list) -> pd.DataFrame:
-    """ This function takes in a multi index pandas dataframe indexed by time, longitude and latitude.
+def bilinear_weights(longitude: np.array, latitude: np.array, points: np.array) -> sparse.csr_matrix:
+    """ This function finds the weights of the bilinear interpolation of a field on a longitude, latitude lattice.
+        Multiplying the weights with the field at every lattice point, in the FieldCube order with longitude major,
+        gives the interpolated field at each point.
+        @param: longitude: numpy array of the lattice longitudes in increasing order (degrees)
+        @param: latitude: numpy array of the lattice latitudes in increasing order (degrees)
+        @param: points: array of shape (points, 2) with the longitude and latitude of each point (degrees)
+        return: weights: sparse matrix of shape (points, longitudes * latitudes)
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    rows = np.arange(points.shape[0])
+    axes = []
+    for axis, coordinate in ((np.asarray(longitude, dtype=float), points[:, 0]), (np.asarray(latitude, dtype=float), points[:, 1])):
+        if np.any(coordinate < axis[0]) or np.any(coordinate > axis[-1]):
+            raise ValueError("A transmission line end is outside of the electric field lattice")
+        if axis.size == 1:
+            # a single row of the lattice, the field does not change along this axis
+            lower = np.zeros(coordinate.size, dtype=int)
+            fraction = np.zeros(coordinate.size)
+        else:
+            lower = np.clip(np.searchsorted(axis, coordinate, side='right') - 1, 0, axis.size - 2)
+            fraction = (coordinate - axis[lower]) / (axis[lower + 1] - axis[lower])
+        axes.append((lower, fraction, min(1, axis.size - 1)))
+
+    (lon_lower, lon_fraction, lon_step), (lat_lower, lat_fraction, lat_step) = axes
+    data = []
+    columns = []
+    # the four corners of the lattice cell around each point
+    for lon_offset, lon_weight in ((0, 1 - lon_fraction), (lon_step, lon_fraction)):
+        for lat_offset, lat_weight in ((0, 1 - lat_fraction), (lat_step, lat_fraction)):
+            columns.append((lon_lower + lon_offset) * np.size(latitude) + lat_lower + lat_offset)
+            data.append(lon_weight * lat_weight)
+    # repeated corners of a single row lattice are summed
+    return sparse.csr_matrix((np.concatenate(data), (np.tile(rows, 4), np.concatenate(columns))),
+                             shape=(points.shape[0], np.size(longitude) * np.size(latitude)))
+
+
+def line_field_operator(E_field: FieldCube, line_length: list) -> sparse.csr_matrix:
+    """ This function builds the matrix that gives the uniform field of every transmission line from the field on the
+        lattice. The field of a line is the average of the field interpolated at its from and to ends.
+        It only depends on the lattice and the line ends, so it is built once and used for every time point.
+        @param: E_field: FieldCube that has the lattice of the electric field
+        @param: line_length: list of dictionaries with the from_coords and to_coords of every line
+        return: operator: sparse matrix of shape (lines, longitudes * latitudes)
+    """
+    from_points = [line["from_coords"] for line in line_length]
+    to_points = [line["to_coords"] for line in line_length]
+    from_weights = bilinear_weights(E_field.longitude, E_field.latitude, from_points)
+    to_weights = bilinear_weights(E_field.longitude, E_field.latitude, to_points)
+    return ((from_weights + to_weights) * 0.5).tocsr()
+
+
+def line_fields(E_field: FieldCube, operator: sparse.csr_matrix) -> tuple:
+    """ This function applies a line field operator to every time point of the electric field at once
+        @param: E_field: FieldCube with the components Ex and Ey
+        @param: operator: sparse matrix of shape (lines, longitudes * latitudes) from line_field_operator
+        return: Ex, Ey: numpy arrays of shape (lines, time points) with the field of every line
+    """
+    lattice = E_field.data.reshape(E_field.time.size, -1, len(E_field.components))
+    Ex = operator @ lattice[:, :, E_field.components.index('Ex')].T
+    Ey = operator @ lattice[:, :, E_field.components.index('Ey')].T
+    return np.asarray(Ex), np.asarray(Ey)
+
+
+# line voltage operators of recent runs keyed by a checksum of the lattice, the line ends and the integration method
+line_operator_cache = {}
+LINE_OPERATOR_CACHE_SIZE = 8
+# number of samples along each line used to find where it crosses the lattice
+PATH_SAMPLES = 64
+# Gauss-Legendre points and weights for integrating E.dl over each segment of a line, on [-1, 1]
+QUADRATURE_POINTS, QUADRATURE_WEIGHTS = np.polynomial.legendre.leggauss(2)
+
+
+def north_east_lengths(from_long: np.array, from_lat: np.array, to_long: np.array, to_lat: np.array) -> tuple:
+    """ This function finds the northward and eastward length of straight pieces of line with the formulas of
+        generate_line_length
+        @param: from_long, from_lat, to_long, to_lat: numpy arrays of the ends of each piece (degrees)
+        return: LN, LE: numpy arrays of the northward and eastward lengths (km)
+    """
+    phi = np.radians((from_lat + to_lat) / 2)
+    LN = (111.133 - (0.56 * np.cos(phi * 2))) * (to_lat - from_lat)
+    LE = (111.5065 - (0.1872 * np.cos(phi * 2))) * np.cos(phi) * (to_long - from_long)
+    return LN, LE
+
+
+def great_circle_points(from_coords: list, to_coords: list, fractions: np.array) -> tuple:
+    """ This function finds points along the great circle between two coordinates
+        @param: from_coords: the coordinates of the start in degrees (longitude, latitude)
+        @param: to_coords: the coordinates of the end in degrees (longitude, latitude)
+        @param: fractions: numpy array of the fraction of the arc from the start, between 0 and 1
+        return: longitude, latitude: numpy arrays of the points (degrees)
+    """
+    ends = []
+    for longitude, latitude in (from_coords, to_coords):
+        longitude, latitude = np.radians(float(longitude)), np.radians(float(latitude))
+        ends.append(np.array([np.cos(latitude) * np.cos(longitude), np.cos(latitude) * np.sin(longitude), np.sin(latitude)]))
+    start, end = ends
+    angle = np.arccos(np.clip(np.dot(start, end), -1, 1))
+    if angle < 1e-12:
+        # the ends are the same point
+        points = np.outer(np.ones(np.size(fractions)), start)
+    else:
+        points = (np.outer(np.sin((1 - fractions) * angle), start) + np.outer(np.sin(fractions * angle), end)) / np.sin(angle)
+    longitude = np.degrees(np.arctan2(points[:, 1], points[:, 0]))
+    latitude = np.degrees(np.arcsin(np.clip(points[:, 2], -1, 1)))
+    # keep the longitude on the same side of the date line as the start
+    longitude = float(from_coords[0]) + (longitude - float(from_coords[0]) + 180) % 360 - 180
+    return longitude, latitude
+
+
+def cell_crossings(longitude: np.array, latitude: np.array, from_coords: list, to_coords: list) -> np.array:
+    """ This function splits the great circle between two coordinates where it crosses a row or column of the lattice,
+        so the field is bilinear over every segment
+        @param: longitude: numpy array of the lattice longitudes (degrees)
+        @param: latitude: numpy array of the lattice latitudes (degrees)
+        @param: from_coords: the coordinates of the start in degrees (longitude, latitude)
+        @param: to_coords: the coordinates of the end in degrees (longitude, latitude)
+        return: numpy array of the increasing fractions of the arc that bound the segments, starting at 0 and ending at 1
+    """
+    fractions = np.linspace(0, 1, PATH_SAMPLES + 1)
+    path_long, path_lat = great_circle_points(from_coords, to_coords, fractions)
+    breaks = [fractions[[0, -1]]]
+    for path, axis in ((path_long, longitude), (path_lat, latitude)):
+        distance = path[:, None] - np.asarray(axis, dtype=float)[None, :]
+        # samples on either side of a lattice row, the crossing is found by linear interpolation between them
+        sample, row = np.nonzero(np.sign(distance[:-1]) * np.sign(distance[1:]) < 0)
+        step = distance[sample, row] / (distance[sample, row] - distance[sample + 1, row])
+        breaks.append(fractions[sample] + step * (fractions[sample + 1] - fractions[sample]))
+    return np.unique(np.concatenate(breaks))
+
+
+def line_voltage_operator(E_field: FieldCube, line_length: list, integration: str = 'endpoints') -> sparse.csr_matrix:
+    """ This function builds the matrix that gives the input voltage of every transmission line from the field on the
+        lattice. With 'endpoints' the voltage is the field averaged at the two ends of the line times its northward and
+        eastward lengths. With 'path' the line follows the great circle between its ends, is split into segments where
+        it crosses the lattice, and E.dl is integrated over each segment with Gauss-Legendre quadrature.
+        The matrix only depends on the lattice and the lines, so recently used matrices are kept and reused.
+        @param: E_field: FieldCube with the components Ex and Ey
+        @param: line_length: list of dictionaries with line data generated by generate_line_length
+        @param: integration: 'endpoints' or 'path'
+        return: operator: read only sparse matrix of shape (lines, longitudes * latitudes * components) in the order of
+                the FieldCube data of one time point
+    """
+    if integration not in ('endpoints', 'path'):
+        raise ValueError("integration must be 'endpoints' or 'path'")
+    coords = np.array([line["from_coords"] + line["to_coords"] for line in line_length], dtype=float)
+    arrays = [np.ascontiguousarray(array, dtype=float) for array in (E_field.longitude, E_field.latitude, coords)]
+    # the shapes tell where one array ends and the next begins, the same values split differently are another lattice
+    header = str(([array.shape for array in arrays], arrays[0].dtype.str, integration)).encode()
+    key_bytes = header + b"".join(array.tobytes() for array in arrays)
+    key = (hashlib.sha256(key_bytes).hexdigest(), tuple(E_field.components), integration)
+    if key in line_operator_cache:
+        # move the operator to the back of the cache as the most recently used
+        line_operator_cache[key] = line_operator_cache.pop(key)
+        return line_operator_cache[key]
+
+    if integration == 'endpoints':
+        weights = line_field_operator(E_field, line_length)
+        north = sparse.diags([line["LN"] for line in line_length]) @ weights
+        east = sparse.diags([line["LE"] for line in line_length]) @ weights
+    else:
+        # the ends must be on the lattice, the arc between them is allowed to bulge slightly past its edge
+        bilinear_weights(E_field.longitude, E_field.latitude, np.concatenate([coords[:, :2], coords[:, 2:]]))
+        rows, points, north_length, east_length = [], [], [], []
+        for i, line in enumerate(line_length):
+            breaks = cell_crossings(E_field.longitude, E_field.latitude, line["from_coords"], line["to_coords"])
+            path_long, path_lat = great_circle_points(line["from_coords"], line["to_coords"], breaks)
+            LN, LE = north_east_lengths(path_long[:-1], path_lat[:-1], path_long[1:], path_lat[1:])
+            middle = (breaks[:-1] + breaks[1:]) / 2
+            half_width = (breaks[1:] - breaks[:-1]) / 2
+            for node, weight in zip(QUADRATURE_POINTS, QUADRATURE_WEIGHTS):
+                # the quadrature weights sum to 2
+                node_long, node_lat = great_circle_points(line["from_coords"], line["to_coords"], middle + node * half_width)
+                points.append(np.column_stack([node_long, node_lat]))
+                north_length.append(LN * weight / 2)
+                east_length.append(LE * weight / 2)
+                rows.append(np.full(LN.size, i))
+        points = np.concatenate(points)
+        points[:, 0] = np.clip(points[:, 0], np.min(E_field.longitude), np.max(E_field.longitude))
+        points[:, 1] = np.clip(points[:, 1], np.min(E_field.latitude), np.max(E_field.latitude))
+        weights = bilinear_weights(E_field.longitude, E_field.latitude, points)
+        rows = np.concatenate(rows)
+        columns = np.arange(rows.size)
+        shape = (len(line_length), rows.size)
+        north = sparse.csr_matrix((np.concatenate(north_length), (rows, columns)), shape=shape) @ weights
+        east = sparse.csr_matrix((np.concatenate(east_length), (rows, columns)), shape=shape) @ weights
+
+    # spread the lattice columns over the components so the operator acts on the FieldCube data directly
+    components = len(E_field.components)
+    operator = sparse.csr_matrix((len(line_length), weights.shape[1] * components))
+    for component, length in (('Ex', east), ('Ey', north)):
+        length = length.tocoo()
+        operator = operator + sparse.csr_matrix((length.data, (length.row, length.col * components + E_field.components.index(component))),
+                                                shape=operator.shape)
+    operator = operator.tocsr()
+    operator.data.setflags(write=False)
+
+    if len(line_operator_cache) >= LINE_OPERATOR_CACHE_SIZE:
+        # drop the least recently used operator
+        line_operator_cache.pop(next(iter(line_operator_cache)))
+    line_operator_cache[key] = operator
+    return operator
+
+
+def get_line_Efield(E_field: FieldCube, from_coords: list, to_coords: list) -> pd.DataFrame:
+    """ This function takes in a FieldCube of the electric field on a longitude, latitude lattice.
         It also requires the from coordinates and to coordinates of a TL
-        @param: df_3d: the 3D pandas dataframe
+        @param: E_field: FieldCube with the components Ex and Ey
         @param: from_coords: the coordinates of the from bus in degrees (longitude, latitude)
         @param: to_coords: the coordinates of the to bus in degrees (longitude, latitude)
         return: line_dict: dataframe with the time series data of the e field data for a single line
     """
+    operator = line_field_operator(E_field, [{"from_coords": from_coords, "to_coords": to_coords}])
+    Ex, Ey = line_fields(E_field, operator)
 
-    index_list = df_3D.index
-
-    west_east = (df_3D.index[0][1], df_3D.index[2][1])
-    south_north = (df_3D.index[0][2], df_3D.index[1][2])
-
-    north_east = (south_north[1], west_east[1])
-    south_east = (south_north[0], west_east[1])
-
-    north_west = (south_north[1], west_east[0])
-    south_west = (south_north[0], west_east[0])
-
-    time_array = []
-    time = 0
-    for i in index_list:
-        if i[0] == time:
-            continue
-        time = i[0]
-        time_array.append(time)
-
-    time_array = np.array(time_array)
-
-    line_dict = {'time': time_array, 'Ex': np.zeros(time_array.size), 'Ey': np.zeros(time_array.size)}
-
-    for i, time in enumerate(time_array):
-        north_east_Efield = [df_3D.loc[(time, north_east[1], north_east[0]), 'Ex'],
-                             df_3D.loc[(time, north_east[1], north_east[0]), 'Ey']]
-        north_west_Efield = [df_3D.loc[(time, north_west[1], north_west[0]), 'Ex'],
-                             df_3D.loc[(time, north_west[1], north_west[0]), 'Ey']]
-
-        south_east_Efield = [df_3D.loc[(time, south_east[1], south_east[0]), 'Ex'],
-                             df_3D.loc[(time, south_east[1], south_east[0]), 'Ey']]
-        south_west_Efield = [df_3D.loc[(time, south_west[1], south_west[0]), 'Ex'],
-                             df_3D.loc[(time, south_west[1], south_west[0]), 'Ey']]
-
-        data_x = [[south_west_Efield[0], south_east_Efield[0]],
-                  [north_west_Efield[0], north_east_Efield[0]]]
-        data_y = [[south_west_Efield[1], south_east_Efield[1]],
-                  [north_west_Efield[1], north_east_Efield[1]]]
-
-        E_field_grid_x = RegularGridInterpolator((west_east, south_north), data_x)
-        E_field_grid_y = RegularGridInterpolator((west_east, south_north), data_y)
-
-        from_to_points = np.array([from_coords, to_coords])
-
-        from_to_Efield_x = E_field_grid_x(from_to_points)
-        from_to_Efield_y = E_field_grid_y(from_to_points)
-
-        norm_x = np.mean(from_to_Efield_x)
-
-        norm_y = np.mean(from_to_Efield_y)
-
-        line_dict["Ex"][i] = norm_x
-        line_dict["Ey"][i] = norm_y
+    line_dict = {'time': E_field.time,
+                 'Ex': Ex[0],
+                 'Ey': Ey[0]}
 
     return pd.DataFrame(line_dict)
 
@@ -254,33 +415,25 @@ def generate_line_length(line_data: list) -> list:
                 @param: line_data: a list of dictionaries that contains transmission line information
                 return: line_length: list of dictionaries containing transmission line lengths and other relevant data.
             """
+    # gathering the endpoints of every line into arrays so all the lengths are calculated at once
+    from_lat = np.array([info['from_lat'] for info in line_data], dtype=float)
+    to_lat = np.array([info['to_lat'] for info in line_data], dtype=float)
+    from_long = np.array([info['from_long'] for info in line_data], dtype=float)
+    to_long = np.array([info['to_long'] for info in line_data], dtype=float)
+    # LN is northward length and LE is eastward length, using formula from test case/study
+    LN, LE = north_east_lengths(from_long, from_lat, to_long, to_lat)
+
     # empty list to hold info
     line_length = []
-    for info in line_data:
-        # looping through the line data list used as input
-        phi = (info['from_lat'] + info['to_lat']) / 2
-        phi = math.radians(phi)
-        # switching from degrees to radians
-        delta_lat = info['to_lat'] - info['from_lat']
-        delta_long = info['to_long'] - info['from_long']
-        # calculating difference in longs and lats
-        line_num = info['line_number']
-        line_tuple = info['tuple']
-        resistance = info['resistance']
-        gic_bd = info['GIC_BD']
-        # pulling other relevant data
-        LN = (111.133 - (0.56 * math.cos(phi * 2))) * delta_lat
-        # LN is northward length, using formula from test case/study
-        LE = (111.5065 - (0.1872 * math.cos(phi * 2))) * math.cos(phi) * delta_long
-        # LE is eastward length
+    for i, info in enumerate(line_data):
         line_length.append({
             # appending data to empty list
-            "line_number": line_num,
-            "tuple": line_tuple,
-            "LN": LN,
-            "LE": LE,
-            "resistance": resistance,
-            "GIC_BD": gic_bd,
+            "line_number": info['line_number'],
+            "tuple": info['tuple'],
+            "LN": float(LN[i]),
+            "LE": float(LE[i]),
+            "resistance": info['resistance'],
+            "GIC_BD": info['GIC_BD'],
             "from_coords": [info['from_long'], info['from_lat']],
             "to_coords": [info['to_long'], info['to_lat']]
         })
@@ -288,36 +441,34 @@ def generate_line_length(line_data: list) -> list:
     return line_length
 
 
-def input_voltage_calculation(line_length: list, E_data_df: pd.DataFrame) -> pd.DataFrame:
+def input_voltages(line_length: list, E_field: FieldCube, integration: str = 'endpoints') -> np.array:
+    """ This function finds the input voltage of every line at every time point with one sparse matrix product
+        @param: line_length: list of dictionaries with line data
+        @param: E_field: FieldCube with the e field data from Electric Field Calculator
+        @param: integration: 'endpoints' averages the field at the ends of each line, 'path' integrates it along the line
+        return: numpy array of shape (lines, time points) with the input voltages (V)
+    """
+    operator = line_voltage_operator(E_field, line_length, integration)
+    return operator @ E_field.data.reshape(E_field.time.size, -1).T
+
+
+def input_voltage_calculation(line_length: list, E_field: FieldCube, integration: str = 'endpoints') -> pd.DataFrame:
     """ This method accepts the list of a dictionary with line data in it as well as the 3D pandas dataframe with the
         e field data in it. It returns the input voltages for all time and all lines
         @param: line_length: list of dictionaries with line data
-        @param: E_data_df: pandas dataframe with multindex e field data from Electric Field Calculator
+        @param: E_field: FieldCube with the e field data from Electric Field Calculator
+        @param: integration: 'endpoints' averages the field at the ends of each line, 'path' integrates it along the line
         return: IV_df pandas dataframe with input voltages.
     """
 
+    voltages = input_voltages(line_length, E_field, integration)
+
     IV_data = {}
     # empty dictionary to hold input voltage data
-    for line in line_length:
-        line_tuple = line['tuple']
-        LN = line['LN']
-        LE = line['LE']
-
-        from_coords = line["from_coords"]
-        to_coords = line["to_coords"]
-        # pulling coordinates from line_length list
-
-        E_line_data_df = get_line_Efield(E_data_df, from_coords, to_coords)
-        # generating E-field info for each line
-        # interpolating to create uniform field for the transmission line
-
-        line_Ex = E_line_data_df['Ex']
-        line_Ey = E_line_data_df['Ey']
-
-        # Calculate the value for the corresponding line
-        IV_data[line_tuple] = (LE * line_Ex) + (LN * line_Ey)
+    for i, line in enumerate(line_length):
+        IV_data[line['tuple']] = voltages[i]
     # add the time to the dataframe
-    IV_data["time"] = E_line_data_df["time"]
+    IV_data["time"] = E_field.time
     IV_df = pd.DataFrame(IV_data)
 
     return IV_df
@@ -677,318 +828,1000 @@ def parallel_resistance_calculator(parallel: list) -> float:
     return r_equiv
 
 
-def node_voltage_calculator(cond_mat: np.ndarray, ic_mat: np.ndarray) -> np.ndarray:
+def node_components(node_count: int, node_a: np.array, node_b: np.array) -> np.array:
+    """ This function finds the connected components of a network with a union-find pass over its edge list. Every pass
+        hooks the root of the larger end of each edge onto the smaller one, then compresses the parents until every node
+        points at its root. All the edges are handled at once, so it only takes a few passes.
+        @param: node_count: number of nodes
+        @param: node_a: numpy array of the first node of every edge
+        @param: node_b: numpy array of the second node of every edge
+        return: numpy array with the component number of every node, numbered in the order of their smallest node
+    """
+    parent = np.arange(node_count)
+    while True:
+        root_a = parent[node_a]
+        root_b = parent[node_b]
+        joined = root_a != root_b
+        if not np.any(joined):
+            break
+        # hooking onto the smaller root keeps every parent below its child, so no cycle is made
+        np.minimum.at(parent, np.maximum(root_a, root_b)[joined], np.minimum(root_a, root_b)[joined])
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+    return np.unique(parent, return_inverse=True)[1]
+
+
+# components with at least this many nodes are factorized and solved on threads when there are several of them
+PARALLEL_COMPONENT_NODES = 2000
+
+
+class ConductanceSolver():
+    """ This class factorizes the sparse nodal conductance matrix of a grid once so the nodal voltages of every time
+        point are found by forward and back substitution instead of a dense inverse.
+        The conductance matrix is symmetric, so the factorization uses a symmetric fill reducing ordering and keeps the
+        diagonal pivots, which makes it the Cholesky factorization scaled by the diagonal.
+        Every connected component of the network, such as an island, is factorized on its own. A component with no
+        path to ground, such as a section behind delta windings, has no unique voltages. Its first node is held at
+        0 V, which leaves the voltage differences and so the gics of its lines unchanged.
+    """
+    def __init__(self, conductance_matrix: sparse.spmatrix):
+        """ @param: conductance_matrix: sparse n x n conductance matrix of the grid (siemens)
+        """
+        self.matrix = sparse.csc_matrix(conductance_matrix)
+        start = time.perf_counter()
+        node_count = self.matrix.shape[0]
+        entries = self.matrix.tocoo()
+        edges = (entries.row != entries.col) & (entries.data != 0)
+        self.components = node_components(node_count, entries.row[edges], entries.col[edges])
+        component_count = self.components.max() + 1 if node_count else 0
+
+        # the rows of a node sum to its conductance to ground, a component whose rows sum to nothing is floating
+        ground = np.bincount(self.components, np.asarray(self.matrix.sum(axis=1)).ravel(), minlength=component_count)
+        scale = np.bincount(self.components, self.matrix.diagonal(), minlength=component_count)
+        self.grounded = ground > 1e-9 * scale
+        # components are numbered in the order of their first node
+        first_node = np.unique(self.components, return_index=True)[1]
+        self.pinned = first_node[~self.grounded].astype(np.int64)
+        self.factorize()
+        self.factorization_time = time.perf_counter() - start
+        # L and U both store the diagonal
+        self.factor_nonzeros = sum(factor.L.nnz + factor.U.nnz - nodes.size for nodes, factor in self.factors)
+        self.fill_in = self.factor_nonzeros - self.matrix.nnz
+
+    def factorize(self):
+        """ This method factorizes the matrix of every component, on threads when several components are large
+        """
+        matrix = self.matrix + sparse.csc_matrix((np.ones(self.pinned.size), (self.pinned, self.pinned)), shape=self.matrix.shape)
+        if self.components.size and self.components.max() == 0:
+            component_nodes = [np.arange(self.components.size)]
+        else:
+            order = np.argsort(self.components, kind='stable')
+            component_nodes = np.split(order, np.cumsum(np.bincount(self.components))[:-1])
+
+        def factorize_component(nodes: np.array):
+            block = matrix if nodes.size == matrix.shape[0] else matrix[nodes][:, nodes]
+            try:
+                return nodes, splu(sparse.csc_matrix(block), permc_spec='MMD_AT_PLUS_A', diag_pivot_thresh=0,
+                                   options={"SymmetricMode": True})
+            except RuntimeError as error:
+                # the same error the dense inverse raised for a grid with a node that has no path to ground
+                raise np.linalg.LinAlgError("The conductance matrix is singular: " + str(error))
+
+        self.parallel = sum(nodes.size >= PARALLEL_COMPONENT_NODES for nodes in component_nodes) > 1
+        if self.parallel:
+            # SuperLU releases the GIL, and its factors cannot be pickled to or from other processes
+            with ThreadPoolExecutor() as pool:
+                self.factors = list(pool.map(factorize_component, component_nodes))
+        else:
+            self.factors = [factorize_component(nodes) for nodes in component_nodes]
+
+    def solve(self, currents: np.ndarray) -> np.ndarray:
+        """ This method finds the nodal voltages for current injections
+            @param: currents: numpy array of shape (n,) or (n, k) with the current injected at each node
+            return: numpy array of the nodal voltages with the same shape as currents
+        """
+        currents = np.asarray(currents, dtype=float)
+        if len(self.factors) == 1:
+            return self.factors[0][1].solve(currents)
+
+        voltages = np.zeros(currents.shape)
+        def solve_component(component: tuple):
+            nodes, factor = component
+            voltages[nodes] = factor.solve(currents[nodes])
+
+        if self.parallel:
+            with ThreadPoolExecutor() as pool:
+                list(pool.map(solve_component, self.factors))
+        else:
+            for component in self.factors:
+                solve_component(component)
+        return voltages
+
+    def __getstate__(self) -> dict:
+        # the SuperLU factors cannot be pickled, they are factorized again from the matrix
+        state = self.__dict__.copy()
+        del state['factors']
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.factorize()
+
+    def __str__(self) -> str:
+        return "ConductanceSolver: " + str(self.matrix.shape[0]) + " nodes, " + str(self.matrix.nnz) + \
+            " nonzeros, " + str(len(self.factors)) + " components, " + str(self.pinned.size) + " without ground, fill-in " + \
+            str(self.fill_in) + " nonzeros, factorization time " + str(self.factorization_time) + " s"
+
+
+def node_voltage_calculator(cond_mat: ConductanceSolver, ic_mat: np.ndarray) -> np.ndarray:
     """ This function calculates the nodal voltage matrix. It uses the conduction and current vector matrices to calculate
                        this values
-                       @param: cond_mat: numpy array that contains the inverted conductance matrix data
+                       @param: cond_mat: ConductanceSolver with the factorized conductance matrix
                        @param: ic_mat: numpy array that contains the current vector data
                        return: node_volt_mat: a numpy array that contains the bus/nodal voltages
                    """
 
-    node_volt_mat = np.matmul(cond_mat, ic_mat)
-    # multiplying inverted conductance matrix with current vector
+    node_volt_mat = cond_mat.solve(ic_mat)
+    # solving the factorized conductance matrix with the current vector
 
     # returning array
     return node_volt_mat
 
 
-def ic_mat_generator_gic_df(nodal_index: dict, EC_df: pd.DataFrame,
-                            reverse_mapping: dict, cond_mat: np.ndarray, branch_data: dict) -> pd.DataFrame:
-    """ This method takes in the indexing information, the equivalent current time series data, the mapped elements of
-                    the grid, the conductance matrix, and the branch data in order to generate the current vector matrix.
-                    This matrix is then used as an input to the node_voltage_calculator function within this function,
-                    which is subsequently used as an input for the gic_value_calculator function within this function.
+def line_incidence(nodal_index: dict, reverse_mapping: dict) -> tuple:
+    """ This function finds the transmission lines of the grid and the matrix that turns their equivalent currents into
+                    the current injected at every node. The from bus of a line gets - and the to bus gets +.
                     @param: nodal_index: dictionary that contains information on index of nodes. Determines size of array
-                    @param: EC_df: Pandas DataFrame that holds the time series equivalent current for each transmission line
                     @param: reverse_mapping: dictionary that holds data regarding nodes which each grid element is connected to
-                    @param: cond_mat: numpy array that holds the conductance matrix data. This matrix is static
-                    @param: branch_data: dictionary that holds grid information pertaining to transmission lines
-                    and transformers.
-                    return: gic_df: a Pandas DataFrame that holds gic values for lines and transformers.
+                    return: tl_nodes: dictionary of the node pair of every transmission line to a list of the line data,
+                    lines: list of the line tuples in the order of the columns of the incidence matrix,
+                    incidence: sparse matrix of shape (nodes, lines)
                 """
-
-    branch_data_calc = branch_data
-    # creating a copy of the branch_data dictionary to avoid alterations to original
-    # used as an input to gic_value_calculator function called within this function
-    gic_data = {}
-    # empty dictionary to hold gic data, will be converted to a pandas DataFrame
-    ic_matrix = np.zeros((len(nodal_index), 1))
-    # creating an array of zeros of with size n x 1 where n is the number of nodes in given system
     tl_nodes = {}
-    # empty dictionary to hold transmission line dictionary held in reverse_mapping dictionary
+    lines = []
+    rows = []
+    columns = []
+    signs = []
     for keys, values in reverse_mapping.items():
-        # for loop to copy data from reverse mapping into tl_nodes
         for i in range(len(values)):
             if values[i][1] == "line":
-                # confirming that a line was found
-                try:
-                    tl_nodes[keys].append((values[i], None))
-                    # None is included for formatting when including the current value in next for loop
-                except KeyError:
-                    tl_nodes[keys] = [(values[i], None)]
-
-    for index, row in EC_df.iterrows():
-        # looping through equivalent current DataFrame
-        for key, value_list in tl_nodes.items():
-            updated_value_list = []
-            # a blank list to hold the updated information
-            # using this to avoid overwrites
-            for item in value_list:
-                toop = item[0][0]
-                if toop in row.index:
-                    column_value = row[toop]
-                    # grabbing the current value
-                    updated_item = (item[0], column_value)
-                    # variable that holds line data and current on line for that time
-                    updated_value_list.append(updated_item)
-                else:
-                    updated_value_list.append(item)
-            tl_nodes[key] = updated_value_list
-            # updating tl_nodes
-
-        for key, value in tl_nodes.items():
-            # loop must be done within looping through DataFrame
-            indexer = list(key)
-            for i in range(len(value)):
-                current = value[i][1]
-                # from bus gets -, to bus gets +
-                ic_matrix[indexer[0]] -= current
-                ic_matrix[indexer[1]] += current
-        bus_voltage = node_voltage_calculator(cond_mat, ic_matrix)
-        # calculating bus voltages
-        ic_matrix = np.zeros((len(nodal_index), 1))
-        # clearing ic_matrix
-        gics = gic_value_calculator(reverse_mapping, tl_nodes, bus_voltage, branch_data_calc)
-        # calculating gics
-
-        # logic below is used to fill in data in gic_data dictionary which is then converted to a DataFrame
-        if len(gic_data) == 0:
-            gic_data['time'] = [EC_df.loc[index][0]]
-            for marker, info in gics.items():
-                gic_data[marker] = [info]
-        elif len(gic_data) > 0:
-            gic_data['time'].append(EC_df.loc[index][0])
-            for marker, info in gics.items():
-                gic_data[marker].append(info)
-        ic_matrix = np.zeros((len(nodal_index), 1))
-        # clearing ic_matrix again
-    gic_df = pd.DataFrame(gic_data)
-    return gic_data
-
-
-def cond_mat_generator(nodal_index: dict, reverse_map: dict) -> np.ndarray:
-    """ This function generates the conductance matrix for the given grid, then inverts it for use in later calculation.
-                        It takes in the nodal index information to generate a nxn matrix where n is the number of nodes
-                        in the system. The reverse_map dictionary contains the resistance/conductance data and
-                        information regarding where each element in the grid is connected.
-                          @param: nodal_index: dictionary that holds data regarding the number of nodes in grid
-                          @param: reverse_map: dictionary that holds data regarding where each grid element is connected
-                          and total resistance of elements that share the same key.
-                          return: inv_cond_mat: a numpy array of the inverted conductance matrix for a grid. This matrix
-                          is static.
-                      """
-
-    conductance_matrix = np.zeros((len(nodal_index), len(nodal_index)))
-    # creating an nxn matrix filled with zeros
+                # confirming that a line was found, the nodes are ordered from bus then to bus
+                indexer = [nodal_index[values[i][0][0]], nodal_index[values[i][0][1]]]
+                tl_nodes.setdefault(tuple(indexer), []).append(values[i])
+                rows.extend([indexer[0], indexer[1]])
+                columns.extend([len(lines), len(lines)])
+                signs.extend([-1.0, 1.0])
+                lines.append(values[i][0])
+
+    incidence = sparse.csr_matrix((signs, (rows, columns)), shape=(len(nodal_index), len(lines)))
+    return tl_nodes, lines, incidence
+
+
+def gic_value_coefficients(reverse_map: dict, tl_nodes: dict, lines: list, branch_data: dict, nodes: int) -> tuple:
+    """ This function finds the gic of every line and transformer as a linear combination of the nodal voltages and the
+                    line equivalent currents, so the gics of every time point are found with two matrix products.
+                    A line carries a third of its equivalent current plus a third of its voltage difference over its
+                    resistance. A winding grounded alone through its substation carries a third of its node voltage over
+                    the total resistance, windings grounded together share the current through their parallel
+                    resistance in inverse proportion to their own resistance, and the series and common windings of autos and the windings
+                    of gys carry the voltage difference over them scaled by their share of the winding resistance.
+                    The windings of one transformer are added up.
+                    @param: reverse_map: dictionary that holds data regarding where each grid element is connected
+                    and total resistance of elements that share the same key.
+                    @param: tl_nodes: dictionary of the node pair of every transmission line to a list of the line data
+                    @param: lines: list of the line tuples in the order of the equivalent current columns
+                    @param: branch_data: dictionary containing data for transformers and transmission lines.
+                    @param: nodes: number of nodes in the grid
+                    return: names: list of the gic names, the transformers of the first mapped element, then the lines
+                    and then the other transformers in the order of the reverse map,
+                    voltage_coefficients: sparse matrix of shape (names, nodes),
+                    current_coefficients: sparse matrix of shape (names, lines)
+                """
+    # every gic is a list of (node, coefficient) and (line column, coefficient) terms that are summed
+    gic_terms = {}
+    line_column = {line: i for i, line in enumerate(lines)}
+
+    def node_terms(key_list: list, coefficient: float) -> list:
+        # coefficient times the voltage of one node, or the voltage difference of two nodes
+        if len(key_list) == 1:
+            return [("node", key_list[0], coefficient)]
+        return [("node", key_list[0], coefficient), ("node", key_list[1], -coefficient)]
+
+    def append_terms(name: str, terms: list):
+        # a transformer with several windings adds up its effective gics
+        try:
+            gic_terms[name][1].extend(terms)
+        except KeyError:
+            gic_terms[name] = (True, terms)
 
+    lines_done = False
     for key, values in reverse_map.items():
-        indexer = list(key)
-        if len(values) > 1:
-            # this if statement should always be true, might be able to remove
-            conductance = 0
-            # variable to hold conductance data
-            for i in range(len(values)):
-                if values[i][0] == "total resistance":
-                    conductance = 1 / values[i][1]
-                    # conductance is total_resistance^-1
-            if len(indexer) == 1:  # For keys with a single index, e.g., (1,)
-                conductance_matrix[indexer[0]][indexer[0]] += conductance
-                # adding conductance to matrix at correct index
-            elif len(indexer) == 2:  # For keys with two indices, e.g., (1, 2)
-                # adding conductance
-                conductance_matrix[indexer[0]][indexer[0]] += conductance
-                conductance_matrix[indexer[1]][indexer[1]] += conductance
-                # adding negative of conductance to diagonal elements
-                conductance_matrix[indexer[0]][indexer[1]] -= conductance
-                conductance_matrix[indexer[1]][indexer[0]] -= conductance
-
-    inv_cond_mat = np.linalg.inv(conductance_matrix)
-    return inv_cond_mat
-
-
-def gic_value_calculator(reverse_map: dict, tl_nodes: dict, nodal_volt_mat: np.ndarray, branch_data: dict) -> dict:
-    """ This function calculates the gics in transmission lines and transformer windings. It takes the mapped nodes from
-                            the reverse_map dictionary and the tl_nodes dictionaries to grab resistance/conductance values.
-                            The branch_data dictionary is similarly used for resistance values. The function then uses
-                            basic nodal analysis techniques using the nodal voltages in the nodal_volt_mat array and
-                            resistance/conductance values to calculate the current in a grid element.
-                              @param: reverse_map: dictionary that holds data regarding where each grid element is connected
-                              and total resistance of elements that share the same key.
-                              @param: tl_nodes: dictionary that holds transmission line data regarding connected nodes
-                              and resistance values.
-                              @param: nodal_volt_mat: numpy array with nodal voltages. Can be indexed using reverse_map
-                              and tl_nodes dictionaries
-                              @param: branch_data: dictionary containing data for transformers and transmission lines.
-                              Used to get resistance values transformers
-                              return: gic_data: dictionary that holds gic info for transmission lines and transformers
-                              in the grid. This dictionary is converted to a Pandas DataFrame in
-                              the ic_mat_generator_gic_df function when this function is called within it.
-                          """
-    gic_info = {}
-    gic_data = {}
-    # two dictionaries being used
-    # gic_info holds all the initial data
-    # gic_data gets a copy of this, but also the calculated value of effective gics for auto and gy transformers
-    for key, values in reverse_map.items():
-        gics = 0
         key_list = list(key)
         try:
             if reverse_map[key][0][1] != "line":
-                # disregarding keys with transmission lines in this loop
                 for j in range(len(values)):
                     # elements connected to 1 bus
                     if values[j][0] == "total resistance" and len(key_list) == 1:
-                        if len(values) == 2:
-                            # if len(values) == 2, only a sub connected
-                            pass
+                        if len(values) == 3 and reverse_map[key][0][1] == "auto common":
+                            # sub and an auto common winding, added to the series winding of the same auto
+                            append_terms(str(reverse_map[key][0][0]), node_terms(key_list, (1 / values[j][1]) / 3))
                         elif len(values) == 3:
-                            # sub and a transformer
-                            gics = float((1 / values[j][1]) * nodal_volt_mat[key_list[0]])
-                            # gics are (1 / total res value) * nodal voltage
-                            gic_info[str(reverse_map[key][0][0])] = (gics / 3)
-                            # creating key of the transformer's tuple
+                            # sub and a transformer, gics are (1 / total res value) * nodal voltage
+                            gic_terms[str(reverse_map[key][0][0])] = (False, node_terms(key_list, (1 / values[j][1]) / 3))
                         elif len(values) > 3:
-                            # case where multiple transformers and sub connected
-                            # could be gsu or auto common
-                            divided_voltage = float((values[j][2] / values[j][1]) * nodal_volt_mat[key_list[0]])
-                            # finding amount of voltage loss over transformers
+                            # case where multiple transformers and sub connected, voltage loss over transformers
+                            divided = values[j][2] / values[j][1]
                             for k in range(len(values)):
                                 try:
                                     if values[k][0] in branch_data:
-                                        # this check also weeds out substations
                                         if branch_data[values[k][0]]['type'] == "gsu":
                                             if branch_data[values[k][0]]['trans_w1'] is not None:
-                                                gics = (1 / branch_data[values[k][0]]['trans_w1']) * divided_voltage
-                                                gic_info[str(reverse_map[key][k][0])] = gics
+                                                gic_terms[str(reverse_map[key][k][0])] = (False, node_terms(key_list, (1 / branch_data[values[k][0]]['trans_w1']) * divided))
                                             elif branch_data[values[k][0]]['trans_w2'] is not None:
-                                                gics = (1 / branch_data[values[k][0]]['trans_w2']) * divided_voltage
-                                                gic_info[str(reverse_map[key][k][0])] = gics
+                                                gic_terms[str(reverse_map[key][k][0])] = (False, node_terms(key_list, (1 / branch_data[values[k][0]]['trans_w2']) * divided))
                                         elif branch_data[values[k][0]]['type'] == "auto":
-                                            gics = (1 / branch_data[values[k][0]]['trans_w2']) * divided_voltage
-                                            try:
-                                                gic_info[str(reverse_map[key][k][0])].append(gics)
-                                            except KeyError:
-                                                gic_info[str(reverse_map[key][k][0])] = [gics]
+                                            append_terms(str(reverse_map[key][k][0]), node_terms(key_list, (1 / branch_data[values[k][0]]['trans_w2']) * divided))
                                 except KeyError:
                                     pass
                     # elements connected to 2 buses
                     elif values[j][0] == "total resistance" and len(key_list) == 2:
-                        nodal_dif = float(nodal_volt_mat[key_list[0]] - nodal_volt_mat[key_list[1]])
                         for z in range(len(values)):
                             if reverse_map[key][z][1] == "auto series":
-                                gics = (1 / branch_data[values[z][0]]['trans_w1']) * nodal_dif
-                                # adjusting for effective gic
-                                gics = gics * (branch_data[values[z][0]]['trans_w1'] / (
-                                        branch_data[values[z][0]]['trans_w1'] + branch_data[values[z][0]][
-                                    'trans_w2']))
-                                try:
-                                    gic_info[str(reverse_map[key][z][0])].append(gics)
-                                except KeyError:
-                                    gic_info[str(reverse_map[key][z][0])] = [gics]
+                                w1, w2 = branch_data[values[z][0]]['trans_w1'], branch_data[values[z][0]]['trans_w2']
+                                append_terms(str(reverse_map[key][z][0]), node_terms(key_list, (1 / w1) * (w1 / (w1 + w2))))
                             elif reverse_map[key][z][1] == "auto common":
-                                gics = (1 / branch_data[values[z][0]]['trans_w2']) * nodal_dif
-                                # adjustment for effective gics
-                                gics = gics * (branch_data[values[z][0]]['trans_w2'] / (
-                                        branch_data[values[z][0]]['trans_w1'] + branch_data[values[z][0]]['trans_w2']))
-                                try:
-                                    gic_info[str(reverse_map[key][z][0])].append(gics)
-                                except KeyError:
-                                    gic_info[str(reverse_map[key][z][0])] = [gics]
+                                w1, w2 = branch_data[values[z][0]]['trans_w1'], branch_data[values[z][0]]['trans_w2']
+                                append_terms(str(reverse_map[key][z][0]), node_terms(key_list, (1 / w2) * (w2 / (w1 + w2))))
                             elif reverse_map[key][z][1] == "gy LV":
-                                gics = (1 / branch_data[values[z][0]]['trans_w2']) * nodal_dif
-                                # adjustment for effective gics
-                                gics = gics * (branch_data[values[z][0]]['trans_w2'] / branch_data[values[z][0]][
-                                    'trans_w1'])
-                                try:
-                                    gic_info[str(reverse_map[key][z][0])].append(gics)
-                                except KeyError:
-                                    gic_info[str(reverse_map[key][z][0])] = [gics]
+                                w1, w2 = branch_data[values[z][0]]['trans_w1'], branch_data[values[z][0]]['trans_w2']
+                                append_terms(str(reverse_map[key][z][0]), node_terms(key_list, (1 / w2) * (w2 / w1)))
                             elif reverse_map[key][z][1] == "gy HV":
-                                gics = (1 / branch_data[values[z][0]]['trans_w1']) * nodal_dif
-                                # no adjustment for effective gic needed for HV
-                                try:
-                                    gic_info[str(reverse_map[key][z][0])].append(gics)
-                                except KeyError:
-                                    gic_info[str(reverse_map[key][z][0])] = [gics]
+                                append_terms(str(reverse_map[key][z][0]), node_terms(key_list, 1 / branch_data[values[z][0]]['trans_w1']))
         except KeyError:
             pass
 
-        for keys, value in tl_nodes.items():
-            gics = 0
-            key_list2 = list(keys)
-            try:
-                if len(value) == 1:
-                    # print(float((value[0][1])))
-                    # print(float(1 / (value[0][0][2])))
-                    # print(nodal_volt_mat[key_list2[0]])
-                    # print(nodal_volt_mat[key_list2[1]])
-                    # print(float((nodal_volt_mat[key_list2[0]] - nodal_volt_mat[key_list2[1]])))
-                    # gics = float((value[0][1])) + float(
-                    #     ((value[0][0][2]) * (nodal_volt_mat[key_list2[0]] - nodal_volt_mat[key_list2[1]])))
-                    base_current = float((value[0][1]))
-                    admittance = float(1 / (value[0][0][2]))
-                    volt_dif = float(nodal_volt_mat[key_list2[0]] - nodal_volt_mat[key_list2[1]])
-                    gics = base_current + (admittance * volt_dif)
-                    # gics = equivalent current for line + (voltage difference * resistance^-1)
-                    gic_info[value[0][0][0]] = (gics / 3)
-                    # adjusted for phase
-                elif len(value) > 1:
-                    for p in range(len(value)):
-                        base_current = float((value[p][1]))
-                        admittance = float(1 / (value[p][0][2]))
-                        volt_dif = float(nodal_volt_mat[key_list2[0]] - nodal_volt_mat[key_list2[1]])
-                        gics = base_current + (admittance * volt_dif)
-                        gic_info[value[p][0][0]] = (gics / 3)
-            except IndexError:
-                pass
+        if not lines_done:
+            # the lines come after the transformers of the first mapped element
+            for keys, value in tl_nodes.items():
+                for line in value:
+                    # gics = equivalent current for line + (voltage difference * resistance^-1), adjusted for phase
+                    gic_terms[line[0]] = (False, node_terms(list(keys), (1 / line[2]) / 3) +
+                                          [("line", line_column[line[0]], 1 / 3)])
+            lines_done = True
+
+    names = list(gic_terms)
+    entries = {"node": ([], [], []), "line": ([], [], [])}
+    for row, name in enumerate(names):
+        for kind, column, coefficient in gic_terms[name][1]:
+            entries[kind][0].append(row)
+            entries[kind][1].append(column)
+            entries[kind][2].append(coefficient)
+    voltage_coefficients = sparse.csr_matrix((entries["node"][2], (entries["node"][0], entries["node"][1])), shape=(len(names), nodes))
+    current_coefficients = sparse.csr_matrix((entries["line"][2], (entries["line"][0], entries["line"][1])), shape=(len(names), len(lines)))
+    return names, voltage_coefficients, current_coefficients
 
-    for name, info in gic_info.items():
-        # copying over info from gic_info to gic_data
-        if isinstance(info, list):
-            # if there's a list, must calculate effective gic
-            # this is just an addition of the values
-            # quantity already altered in prior step to be ready for simple addition
-            gic_data[name] = sum(info)
-        else:
-            gic_data[name] = info
 
+def ic_mat_generator_gic_df(nodal_index: dict, EC_df: pd.DataFrame,
+                            reverse_mapping: dict, cond_mat: ConductanceSolver, branch_data: dict) -> dict:
+    """ This method takes in the indexing information, the equivalent current time series data, the mapped elements of
+                    the grid, the conductance matrix, and the branch data in order to generate the current vector matrix.
+                    The current vectors of every time point are the columns of one (nodes x time) matrix, made with the
+                    line incidence matrix and solved with the factorized conductance matrix in one call.
+                    The gics are then found from the nodal voltages and line currents with the coefficients of
+                    gic_value_coefficients.
+                    @param: nodal_index: dictionary that contains information on index of nodes. Determines size of array
+                    @param: EC_df: Pandas DataFrame that holds the time series equivalent current for each transmission line
+                    @param: reverse_mapping: dictionary that holds data regarding nodes which each grid element is connected to
+                    @param: cond_mat: ConductanceSolver with the factorized conductance matrix. This matrix is static
+                    @param: branch_data: dictionary that holds grid information pertaining to transmission lines
+                    and transformers.
+                    return: gic_data: dictionary of the time and the gic of every line and transformer, each a numpy
+                    array with one value per time point
+                """
+    tl_nodes, lines, incidence = line_incidence(nodal_index, reverse_mapping)
+    names, voltage_coefficients, current_coefficients = gic_value_coefficients(reverse_mapping, tl_nodes, lines,
+                                                                               branch_data, len(nodal_index))
+
+    # equivalent current of every line at every time point, shape (lines, time)
+    currents = EC_df[lines].to_numpy(dtype=float).T if lines else np.zeros((0, len(EC_df)))
+    ic_matrix = incidence @ currents
+    # from bus gets -, to bus gets +
+    bus_voltage = node_voltage_calculator(cond_mat, ic_matrix)
+    # calculating bus voltages for all time points at once
+    gics = voltage_coefficients @ bus_voltage + current_coefficients @ currents
+
+    gic_data = {'time': EC_df.iloc[:, 0].to_numpy()}
+    for row, name in enumerate(names):
+        gic_data[name] = gics[row]
     return gic_data
 
 
-def gic_computation(substation_data: dict, bus_data: dict, branch_data: dict, E_data_df: pd.DataFrame) -> pd.DataFrame:
-    """ This method takes in the grid data dictionaries and the E-field DataFrame, and outputs a Pandas DataFrame
-                the calculated GICs in the transmission lines and transformers for the inputted grid. This function
-                is essentially a singular function that executes all the previously defined functions in the order
-                necessary to ultimately calculate GIC values. Singular function is able to be called easier by
-                application core.
+def cond_mat_generator(nodal_index: dict, reverse_map: dict) -> ConductanceSolver:
+    """ This function generates the conductance matrix for the given grid, then factorizes it for use in later calculation.
+                        It takes in the nodal index information to generate a nxn matrix where n is the number of nodes
+                        in the system. The reverse_map dictionary contains the resistance/conductance data and
+                        information regarding where each element in the grid is connected.
+                          @param: nodal_index: dictionary that holds data regarding the number of nodes in grid
+                          @param: reverse_map: dictionary that holds data regarding where each grid element is connected
+                          and total resistance of elements that share the same key.
+                          return: cond_mat: ConductanceSolver with the factorized sparse conductance matrix of the grid.
+                          This matrix is static.
+                      """
+
+    rows = []
+    columns = []
+    conductances = []
+    # entries of the sparse nxn matrix, entries at the same index are summed
+
+    for key, values in reverse_map.items():
+        indexer = list(key)
+        if len(values) > 1:
+            # this if statement should always be true, might be able to remove
+            conductance = 0
+            # variable to hold conductance data
+            for i in range(len(values)):
+                if values[i][0] == "total resistance":
+                    conductance = 1 / values[i][1]
+                    # conductance is total_resistance^-1
+            if len(indexer) == 1:  # For keys with a single index, e.g., (1,)
+                rows.append(indexer[0])
+                columns.append(indexer[0])
+                conductances.append(conductance)
+                # adding conductance to matrix at correct index
+            elif len(indexer) == 2:  # For keys with two indices, e.g., (1, 2)
+                # adding conductance to diagonal elements
+                # adding negative of conductance to off diagonal elements
+                rows.extend([indexer[0], indexer[1], indexer[0], indexer[1]])
+                columns.extend([indexer[0], indexer[1], indexer[1], indexer[0]])
+                conductances.extend([conductance, conductance, -conductance, -conductance])
+
+    conductance_matrix = sparse.coo_matrix((conductances, (rows, columns)), shape=(len(nodal_index), len(nodal_index)))
+    return ConductanceSolver(conductance_matrix)
+
+
+class GridTopology():
+    """ This class holds the nodal model of a grid as integer node numbers and arrays of elements, built in one pass over
+        branch_data. The buses are nodes 0 to buses - 1 in increasing bus number and the neutral node between the
+        windings of every gy transformer comes after them.
+        The elements are the same as generate_nodes_and_network and reverse_map_nodes:
+        - a transmission line connects its from and to buses
+        - a gsu winding on the wye side, including a blocking device, is grounded at its bus through the substation
+        - an auto series winding connects its two buses and the common winding is grounded at the W2 bus through the
+          substation, or connects the W2 bus to the gy neutral when a gy is in parallel with the auto
+        - the gy HV and LV windings connect their buses to the gy neutral, which is grounded through the substation
+        The windings grounded at a bus are in parallel with each other and in series with the substation.
+        All resistances are corrected from 3 phase.
+    """
+    def __init__(self, node_count: int, edges: tuple, edge_rows: np.array, grounds: tuple, windings: tuple,
+                 substation_resistance: np.array, neutral_windings: tuple, neutral_commons: tuple, lines: list,
+                 line_nodes: tuple, line_resistance: np.array, names: list, voltage_coefficients: sparse.csr_matrix,
+                 current_coefficients: sparse.csr_matrix):
+        """ @param: node_count: number of nodes
+            @param: edges: (from node, to node, conductance) arrays of the elements between two nodes
+            @param: edge_rows: numpy array of the gic name row of the branch every element between two nodes belongs to
+            @param: grounds: (node, conductance) arrays of the connections from a node to ground
+            @param: windings: (node, resistance, gic name row) arrays of the windings grounded at a bus
+            @param: substation_resistance: numpy array of the substation resistance in series with the windings
+                    grounded at every node, 0 for the other nodes
+            @param: neutral_windings: (gy neutral node, gic name row) arrays of the gy transformers of every neutral
+            @param: neutral_commons: (element, coefficient, substation resistance) arrays of the auto common windings
+                    connected to a gy neutral, with the element number in edges. Without the gy they are grounded at
+                    their bus like a lone auto.
+            @param: lines: list of the line tuples in the order of branch_data
+            @param: line_nodes: (from node, to node) arrays of the lines
+            @param: line_resistance: numpy array of the resistance of the lines used for the equivalent currents
+            @param: names: list of the gic names, the lines and then the transformers in the order of branch_data
+            @param: voltage_coefficients: sparse matrix of shape (names, nodes), gic per nodal voltage
+            @param: current_coefficients: sparse matrix of shape (names, lines), gic per line equivalent current
+        """
+        self.node_count = node_count
+        self.edges = edges
+        self.edge_rows = edge_rows
+        self.grounds = grounds
+        self.windings = windings
+        self.substation_resistance = substation_resistance
+        self.neutral_windings = neutral_windings
+        self.neutral_commons = neutral_commons
+        self.lines = lines
+        self.line_nodes = line_nodes
+        self.line_resistance = line_resistance
+        self.names = names
+        self.voltage_coefficients = voltage_coefficients
+        self.current_coefficients = current_coefficients
+
+    @classmethod
+    def from_grid(cls, substation_data: dict, bus_data: dict, branch_data: dict) -> 'GridTopology':
+        """ This method builds the nodal model of a grid
+            @param: substation_data: dictionary that contains latitudes and longitudes of substations in grid
+            @param: bus_data: dictionary that correlates bus numbers with substation numbers
+            @param: branch_data: dictionary that holds grid information pertaining to transmission lines
+            and transformers.
+            return: GridTopology of the grid
+        """
+        lines = []
+        transformers = []
+        # lines: from bus, to bus, resistance, resistance of the equivalent current
+        line_from, line_to, line_r, line_r_ec = [], [], [], []
+        # elements between two nodes: bus, bus or gy neutral (-1 for a bus), resistance
+        edge_a, edge_b, edge_b_neutral, edge_r = [], [], [], []
+        # gic terms of the elements between two nodes: transformer, coefficient of the voltage difference
+        edge_row, edge_coefficient = [], []
+        # windings grounded at a bus: bus, resistance, substation, transformer
+        ground_bus, ground_r, ground_sub, ground_row = [], [], [], []
+        # auto common windings, placed once every gy is known: W1 bus, W2 bus, resistance, coefficient, transformer
+        common = []
+        neutrals = {}
+        neutral_sub = []
+        # gy transformers of every neutral and the auto common windings connected to it
+        neutral_gy = []
+        neutral_common = []
+
+        for element, data in branch_data.items():
+            W1_side, W2_side, circuit = element
+            if not data["has_trans"]:
+                lines.append(element)
+                line_from.append(W1_side)
+                line_to.append(W2_side)
+                line_r.append(data["resistance"] / 3)
+                # GIC_BD is a series capacitance, modeled as a doubled resistance like equivalent_current_calc
+                line_r_ec.append(data["resistance"] * 2 if data["GIC_BD"] else data["resistance"])
+                continue
+            row = len(transformers)
+            transformers.append(str(element))
+            sub_num = bus_data[W1_side]['sub_num']
+            if data["type"] == "gsu":
+                # the delta side has 'None' for resistance and no node
+                if data['trans_w2'] is None:
+                    bus, resistance = W1_side, data['trans_w1'] / 3
+                elif data['trans_w1'] is None:
+                    bus, resistance = W2_side, data['trans_w2'] / 3
+                else:
+                    continue
+                if data['GIC_BD']:
+                    # GIC blocking device in the neutral, modeled as extremely high resistance
+                    resistance += 1e6
+                ground_bus.append(bus)
+                ground_r.append(resistance)
+                ground_sub.append(sub_num)
+                ground_row.append(row)
+            elif data["type"] == "auto":
+                # W1 is series, W2 is common
+                edge_a.append(W1_side)
+                edge_b.append(W2_side)
+                edge_b_neutral.append(-1)
+                edge_r.append(data['trans_w1'] / 3)
+                edge_row.append(row)
+                edge_coefficient.append(1 / (data['trans_w1'] + data['trans_w2']))
+                common.append((W1_side, W2_side, data['trans_w2'] / 3, 1 / (data['trans_w1'] + data['trans_w2']), sub_num, row))
+            elif data["type"] == "gy":
+                # W1 is HV, W2 is LV, both connect to a neutral node grounded through the substation
+                if (W1_side, W2_side) not in neutrals:
+                    neutrals[(W1_side, W2_side)] = len(neutrals)
+                    neutral_sub.append(sub_num)
+                neutral_gy.append((neutrals[(W1_side, W2_side)], row))
+                for bus, resistance in ((W1_side, data['trans_w1'] / 3), (W2_side, data['trans_w2'] / 3)):
+                    edge_a.append(bus)
+                    edge_b.append(W2_side)
+                    edge_b_neutral.append(neutrals[(W1_side, W2_side)])
+                    edge_r.append(resistance)
+                    edge_row.append(row)
+                    edge_coefficient.append(1 / data['trans_w1'])
+
+        for W1_side, W2_side, resistance, coefficient, sub_num, row in common:
+            if (W1_side, W2_side) in neutrals:
+                # auto and gy in parallel, the common winding goes to the gy neutral
+                neutral_common.append((len(line_from) + len(edge_a), coefficient, substation_data[sub_num]['ground_r']))
+                edge_a.append(W2_side)
+                edge_b.append(W2_side)
+                edge_b_neutral.append(neutrals[(W1_side, W2_side)])
+                edge_r.append(resistance)
+                edge_row.append(row)
+                edge_coefficient.append(coefficient)
+            else:
+                ground_bus.append(W2_side)
+                ground_r.append(resistance)
+                ground_sub.append(sub_num)
+                ground_row.append(row)
+
+        # integer node numbers, buses first and then the gy neutrals
+        buses = np.unique(np.concatenate([np.asarray(bus_list, dtype=np.int64) for bus_list in
+                                          (line_from, line_to, edge_a, edge_b, ground_bus)]))
+        node_count = buses.size + len(neutrals)
+        line_from = np.searchsorted(buses, np.asarray(line_from, dtype=np.int64))
+        line_to = np.searchsorted(buses, np.asarray(line_to, dtype=np.int64))
+        edge_a = np.searchsorted(buses, np.asarray(edge_a, dtype=np.int64))
+        edge_b_neutral = np.asarray(edge_b_neutral, dtype=np.int64)
+        edge_b = np.where(edge_b_neutral >= 0, buses.size + edge_b_neutral,
+                          np.searchsorted(buses, np.asarray(edge_b, dtype=np.int64)))
+        edge_r = np.asarray(edge_r, dtype=float)
+        ground_node = np.searchsorted(buses, np.asarray(ground_bus, dtype=np.int64))
+        ground_r = np.asarray(ground_r, dtype=float)
+
+        # windings grounded at the same bus are in parallel and in series with the substation of the first one
+        grounded, first = np.unique(ground_node, return_index=True)
+        parallel_r = np.zeros(node_count)
+        parallel_r[grounded] = 1 / np.bincount(ground_node, 1 / ground_r, minlength=node_count)[grounded]
+        sub_r = np.zeros(node_count)
+        # a gy neutral takes the substation away from its LV bus
+        taken = {(W2_side, sub_num) for (W1_side, W2_side), sub_num in zip(neutrals, neutral_sub)}
+        for node, index in zip(grounded, first):
+            if (int(buses[node]), ground_sub[index]) not in taken:
+                sub_r[node] = substation_data[ground_sub[index]]['ground_r']
+        neutral_r = np.array([substation_data[sub_num]['ground_r'] for sub_num in neutral_sub], dtype=float)
+        ground_nodes = np.concatenate([grounded, buses.size + np.arange(len(neutrals))])
+        ground_conductance = np.concatenate([1 / (parallel_r[grounded] + sub_r[grounded]), 1 / neutral_r])
+
+        # gics of the lines: equivalent current + (voltage difference * resistance^-1), adjusted for phase
+        line_rows = np.arange(len(lines))
+        line_conductance = 1 / np.asarray(line_r, dtype=float)
+        # gics of the transformers: voltage difference over the element times its coefficient, and for grounded
+        # windings the voltage over the parallel windings divided by the 3 phase winding resistance
+        edge_row = len(lines) + np.asarray(edge_row, dtype=np.int64)
+        edge_coefficient = np.asarray(edge_coefficient, dtype=float)
+        ground_row = len(lines) + np.asarray(ground_row, dtype=np.int64)
+        ground_coefficient = parallel_r[ground_node] / (parallel_r[ground_node] + sub_r[ground_node]) / (3 * ground_r)
+        names = lines + transformers
+        voltage_coefficients = sparse.csr_matrix(
+            (np.concatenate([line_conductance / 3, -line_conductance / 3, edge_coefficient, -edge_coefficient, ground_coefficient]),
+             (np.concatenate([line_rows, line_rows, edge_row, edge_row, ground_row]),
+              np.concatenate([line_from, line_to, edge_a, edge_b, ground_node]))),
+            shape=(len(names), node_count))
+        current_coefficients = sparse.csr_matrix((np.full(len(lines), 1 / 3), (line_rows, line_rows)), shape=(len(names), len(lines)))
+
+        neutral_gy = np.array(neutral_gy, dtype=np.int64).reshape(-1, 2)
+        neutral_common = np.array(neutral_common, dtype=float).reshape(-1, 3)
+
+        return cls(node_count, (np.concatenate([line_from, edge_a]), np.concatenate([line_to, edge_b]),
+                                np.concatenate([line_conductance, 1 / edge_r])), np.concatenate([line_rows, edge_row]),
+                   (ground_nodes, ground_conductance), (ground_node, ground_r, ground_row), sub_r,
+                   (buses.size + neutral_gy[:, 0], len(lines) + neutral_gy[:, 1]),
+                   (neutral_common[:, 0].astype(np.int64), neutral_common[:, 1], neutral_common[:, 2]), lines,
+                   (line_from, line_to), np.asarray(line_r_ec, dtype=float), names, voltage_coefficients,
+                   current_coefficients)
+
+    def conductance_matrix(self) -> sparse.coo_matrix:
+        """ This method assembles the nodal conductance matrix
+            return: sparse matrix of shape (nodes, nodes), entries at the same index are summed
+        """
+        node_a, node_b, conductance = self.edges
+        ground_node, ground_conductance = self.grounds
+        rows = np.concatenate([node_a, node_b, node_a, node_b, ground_node])
+        columns = np.concatenate([node_a, node_b, node_b, node_a, ground_node])
+        values = np.concatenate([conductance, conductance, -conductance, -conductance, ground_conductance])
+        return sparse.coo_matrix((values, (rows, columns)), shape=(self.node_count, self.node_count))
+
+    def incidence(self) -> sparse.csr_matrix:
+        """ This method finds the matrix that turns the line equivalent currents into the current injected at every
+            node. The from bus of a line gets - and the to bus gets +.
+            return: sparse matrix of shape (nodes, lines)
+        """
+        line_from, line_to = self.line_nodes
+        columns = np.arange(len(self.lines))
+        return sparse.csr_matrix((np.concatenate([-np.ones(columns.size), np.ones(columns.size)]),
+                                  (np.concatenate([line_from, line_to]), np.concatenate([columns, columns]))),
+                                 shape=(self.node_count, len(self.lines)))
+
+
+# compiled gic operators of recent grids keyed by grid_checksum
+gic_operator_cache = {}
+GIC_OPERATOR_CACHE_SIZE = 4
+
+
+class GICOperator():
+    """ This class holds the transfer matrix from the input voltages of the transmission lines to the gics of the lines
+        and transformers of a grid. For a fixed grid every gic is a linear function of the line input voltages, so
+        the gics of a storm are one matrix product.
+    """
+    def __init__(self, names: list, lines: list, matrix: np.ndarray, checksum: str):
+        """ @param: names: list of the gic names in the order of the rows of the matrix
+            @param: lines: list of the line tuples in the order of the columns of the matrix
+            @param: matrix: numpy array of shape (names, lines), gic (A) per input voltage (V)
+            @param: checksum: grid_checksum of the grid the operator was compiled for
+        """
+        self.names = names
+        self.lines = lines
+        self.matrix = matrix
+        self.checksum = checksum
+
+    def apply(self, voltages: np.ndarray) -> np.ndarray:
+        """ This method finds the gics for the input voltages of the lines
+            @param: voltages: numpy array of shape (lines, time points) with the line input voltages (V)
+            return: numpy array of shape (names, time points) with the gics (A)
+        """
+        return self.matrix @ voltages
+
+
+def grid_checksum(substation_data: dict, bus_data: dict, branch_data: dict) -> str:
+    """ This function finds a checksum of the parts of the grid data that the gic operator depends on.
+        Coordinates are left out, they only change the input voltages, and so are the results core stores in branch_data.
+        @param: substation_data: dictionary that contains latitudes and longitudes of substations in grid
+        @param: bus_data: dictionary that correlates bus numbers with substation numbers
+        @param: branch_data: dictionary that holds grid information pertaining to transmission lines
+        and transformers.
+        return: sha256 hex digest
+    """
+    grid = ([(sub, data.get("ground_r")) for sub, data in substation_data.items()],
+            [(bus, data.get("sub_num")) for bus, data in bus_data.items()],
+            [(branch, [data.get(field) for field in ("has_trans", "resistance", "type", "trans_w1", "trans_w2", "GIC_BD")])
+             for branch, data in branch_data.items()])
+    return hashlib.sha256(repr(grid).encode()).hexdigest()
+
+
+def compile_gic_operator(substation_data: dict, bus_data: dict, branch_data: dict, log_queue: object = None) -> GICOperator:
+    """ This function runs the network steps of gic_computation once with the line input voltages left as unknowns and
+                returns the matrix that maps them to the gics, including the effective gic scaling of auto and gy
+                transformers. Operators of recently seen grids are reused.
                 @param: substation_data: dictionary that contains latitudes and longitudes of substations in grid
                 @param: bus_data: dictionary that correlates bus numbers with substation numbers
                 @param: branch_data: dictionary that holds grid information pertaining to transmission lines
                 and transformers.
-                @param: E_data_df: Pandas DataFrame that holds time series E-field data
-                return: gic_df: Pandas DataFrame that holds time series GIC values for lines and transformers
+                @param: log_queue: optional queue object the size, fill-in and time of the factorization are sent
+                through when the grid is factorized
+                return: GICOperator of the grid
             """
+    checksum = grid_checksum(substation_data, bus_data, branch_data)
+    if checksum in gic_operator_cache:
+        # move the operator to the back of the cache as the most recently used
+        gic_operator_cache[checksum] = gic_operator_cache.pop(checksum)
+        return gic_operator_cache[checksum]
+
+    topology = GridTopology.from_grid(substation_data, bus_data, branch_data)
+    cond_mat = ConductanceSolver(topology.conductance_matrix())
+    if log_queue is not None:
+        log_queue.put("Factorized the conductance matrix of the grid. " + str(cond_mat) + "\n")
+
+    # equivalent current of the lines per input voltage, the same as equivalent_current_calc
+    currents = sparse.diags(3 / topology.line_resistance)
+
+    # nodal voltages per input voltage, one solve with a right hand side for every line
+    bus_voltage = node_voltage_calculator(cond_mat, (topology.incidence() @ currents).toarray())
+    matrix = np.asarray(topology.voltage_coefficients @ bus_voltage + topology.current_coefficients @ currents)
+    matrix.setflags(write=False)
+    operator = GICOperator(topology.names, topology.lines, matrix, checksum)
+
+    if len(gic_operator_cache) >= GIC_OPERATOR_CACHE_SIZE:
+        # drop the least recently used operator
+        gic_operator_cache.pop(next(iter(gic_operator_cache)))
+    gic_operator_cache[checksum] = operator
+    return operator
+
+
+class GICContingencies():
+    """ This class finds the gics of a grid with branches out of service, or with blocking devices added or removed,
+        for many cases on one factorization of the grid. A case only changes a few entries of the conductance matrix,
+        so it is solved with the Sherman-Morrison-Woodbury formula: k extra substitutions for k changed entries and a
+        k x k system, instead of a new factorization.
+    """
+    def __init__(self, substation_data: dict, bus_data: dict, branch_data: dict):
+        """ @param: substation_data: dictionary that contains latitudes and longitudes of substations in grid
+            @param: bus_data: dictionary that correlates bus numbers with substation numbers
+            @param: branch_data: dictionary that holds grid information pertaining to transmission lines
+            and transformers. This is the base case.
+        """
+        self.branch_data = branch_data
+        self.topology = GridTopology.from_grid(substation_data, bus_data, branch_data)
+        self.solver = ConductanceSolver(self.topology.conductance_matrix())
+        self.names = self.topology.names
+        self.rows = {name: row for row, name in enumerate(self.names)}
+        self.incidence = self.topology.incidence()
+
+        node_count = self.topology.node_count
+        node_a, node_b, conductance = self.topology.edges
+        ground_nodes, ground_conductance = self.topology.grounds
+        self.ground_conductance = np.zeros(node_count)
+        self.ground_conductance[ground_nodes] = ground_conductance
+
+    def branch_row(self, branch: tuple) -> int:
+        """ This method finds the gic row of a branch
+            @param: branch: tuple of the branch in branch_data
+            return: row of the branch in names
+        """
+        if branch not in self.branch_data:
+            raise ValueError(f"The branch {branch} is not in the grid")
+        return self.rows[branch if not self.branch_data[branch]["has_trans"] else str(branch)]
+
+    def winding_coefficients(self, winding_node: np.array, winding_r: np.array, active: np.array, sub_r: np.array) -> np.array:
+        """ This method finds the gic of every grounded winding per voltage of its bus, like GridTopology.from_grid
+            @param: winding_node: numpy array of the bus of every winding
+            @param: winding_r: numpy array of the winding resistances
+            @param: active: boolean numpy array of the windings in service
+            @param: sub_r: numpy array of the substation resistance of every node
+            return: numpy array of the coefficients, 0 for the windings out of service
+        """
+        inverse = np.bincount(winding_node[active], 1 / winding_r[active], minlength=self.topology.node_count)
+        parallel_r = np.divide(1, inverse, out=np.zeros_like(inverse), where=inverse > 0)[winding_node]
+        return np.where(active, parallel_r / (parallel_r + sub_r[winding_node]) / (3 * winding_r), 0)
+
+    def solve(self, voltages: np.ndarray, outages: list = (), blocking: list = ()) -> np.ndarray:
+        """ This method finds the gics of one case
+            @param: voltages: numpy array of shape (lines, time points) with the input voltages of the lines in the order
+                    of topology.lines (V)
+            @param: outages: list of the tuples of the branches out of service
+            @param: blocking: list of the tuples of the branches whose GIC_BD is switched, a blocking device in the
+                    neutral of a gsu or a series capacitor on a line
+            return: numpy array of shape (names, time points) with the gics (A), 0 for the branches out of service
+        """
+        topology = self.topology
+        line_count = len(topology.lines)
+        node_count = topology.node_count
+        node_a, node_b, conductance = topology.edges
+        out_rows = np.array([self.branch_row(branch) for branch in outages], dtype=np.int64)
+
+        line_r = topology.line_resistance.copy()
+        base_node, base_r, base_row = topology.windings
+        winding_r = base_r.copy()
+        for branch in blocking:
+            row = self.branch_row(branch)
+            data = self.branch_data[branch]
+            if row < line_count:
+                # series capacitor, modeled as a doubled resistance like equivalent_current_calc
+                line_r[row] = data['resistance'] if data['GIC_BD'] else data['resistance'] * 2
+            elif data['type'] == "gsu":
+                winding_r[base_row == row] += -1e6 if data['GIC_BD'] else 1e6
+            else:
+                raise ValueError("Blocking devices are modeled on gsu transformers and transmission lines only")
+        active_lines = np.ones(line_count, dtype=bool)
+        active_lines[out_rows[out_rows < line_count]] = False
+        removed_edges = np.isin(topology.edge_rows, out_rows)
+
+        # auto common windings whose gy neutral has no gy left are grounded at their bus instead
+        neutral_node, neutral_row = topology.neutral_windings
+        common_edge, common_coefficient, common_sub_r = topology.neutral_commons
+        open_neutrals = np.setdiff1d(neutral_node, neutral_node[~np.isin(neutral_row, out_rows)])
+        moved = np.isin(node_b[common_edge], open_neutrals) & ~removed_edges[common_edge]
+        common_edge, common_coefficient, common_sub_r = common_edge[moved], common_coefficient[moved], common_sub_r[moved]
+        removed_edges[common_edge] = True
+        winding_node = np.concatenate([base_node, node_a[common_edge]])
+        winding_r = np.concatenate([winding_r, 1 / conductance[common_edge]])
+        winding_row = np.concatenate([base_row, topology.edge_rows[common_edge]])
+        active_windings = ~np.isin(winding_row, out_rows)
+        sub_r = topology.substation_resistance.copy()
+        new_bus = node_a[common_edge][sub_r[node_a[common_edge]] == 0]
+        sub_r[new_bus] = common_sub_r[sub_r[node_a[common_edge]] == 0]
+
+        # new ground conductance of the buses whose windings changed
+        changed = np.unique(np.concatenate([base_node[~active_windings[:base_node.size] | (winding_r[:base_node.size] != base_r)],
+                                            node_a[common_edge]]))
+        inverse = np.bincount(winding_node[active_windings], 1 / winding_r[active_windings], minlength=node_count)[changed]
+        new_ground = np.zeros(changed.size)
+        new_ground[inverse > 0] = 1 / (1 / inverse[inverse > 0] + sub_r[changed[inverse > 0]])
+        ground_delta = new_ground - self.ground_conductance[changed]
+
+        # a part of the grid the case leaves without a path to ground, such as a node with no elements left or an island
+        # behind delta windings, is held at 0 V at its first node by a unit conductance to ground, like ConductanceSolver
+        # holds the floating components of the base grid, whose first nodes count as grounded here
+        case_ground = self.ground_conductance.copy()
+        case_ground[changed] = new_ground
+        held = case_ground > 0
+        held[self.solver.pinned] = True
+        components = node_components(node_count, node_a[~removed_edges], node_b[~removed_edges])
+        grounded = np.bincount(components, held) > 0
+        # components are numbered in the order of their first node
+        first_node = np.unique(components, return_index=True)[1]
+        pinned = first_node[~grounded].astype(np.int64)
+        ground_nodes, ground_index = np.unique(np.concatenate([changed, pinned]), return_inverse=True)
+        ground_delta = np.bincount(ground_index, np.concatenate([ground_delta, np.ones(pinned.size)]))
+
+        # removed elements between two nodes, parallel elements are combined into one change
+        pairs, pair_index = np.unique(np.sort(np.column_stack([node_a[removed_edges], node_b[removed_edges]]), axis=1),
+                                      axis=0, return_inverse=True)
+        edge_delta = -np.bincount(pair_index.ravel(), conductance[removed_edges], minlength=pairs.shape[0])
+
+        # the change of the conductance matrix is update @ diag(delta) @ update.T
+        keep_ground = ground_delta != 0
+        keep_edge = edge_delta != 0
+        ground_nodes, pairs = ground_nodes[keep_ground], pairs[keep_edge]
+        delta = np.concatenate([ground_delta[keep_ground], edge_delta[keep_edge]])
+        columns = np.arange(delta.size)
+        update = sparse.csc_matrix((np.concatenate([np.ones(ground_nodes.size), np.ones(pairs.shape[0]), -np.ones(pairs.shape[0])]),
+                                    (np.concatenate([ground_nodes, pairs[:, 0], pairs[:, 1]]),
+                                     np.concatenate([columns[:ground_nodes.size], columns[ground_nodes.size:], columns[ground_nodes.size:]]))),
+                                   shape=(node_count, delta.size))
+
+        # equivalent currents of the lines in service and the nodal voltages of the base grid
+        currents = (3 / line_r * active_lines)[:, None] * np.asarray(voltages, dtype=float).reshape(line_count, -1)
+        bus_voltage = node_voltage_calculator(self.solver, self.incidence @ currents)
+        if delta.size:
+            solved_update = node_voltage_calculator(self.solver, update.toarray())
+            capacitance = np.diag(1 / delta) + update.T @ solved_update
+            try:
+                bus_voltage = bus_voltage - solved_update @ np.linalg.solve(capacitance, update.T @ bus_voltage)
+            except np.linalg.LinAlgError:
+                raise np.linalg.LinAlgError("The case leaves part of the grid without a path to ground")
+
+        # gic coefficients of the case: the grounded windings of the changed buses, the moved auto common windings
+        # and the branches out of service
+        base = np.concatenate([self.winding_coefficients(base_node, base_r, np.ones(base_row.size, dtype=bool),
+                                                         topology.substation_resistance), np.zeros(common_edge.size)])
+        new = self.winding_coefficients(winding_node, winding_r, active_windings, sub_r)
+        change = np.nonzero(new != base)[0]
+        rows = np.concatenate([winding_row[change], topology.edge_rows[common_edge], topology.edge_rows[common_edge]])
+        nodes = np.concatenate([winding_node[change], node_a[common_edge], node_b[common_edge]])
+        values = np.concatenate([new[change] - base[change], -common_coefficient, common_coefficient])
+        in_service = np.ones(len(self.names))
+        in_service[out_rows] = 0
+        voltage_coefficients = sparse.diags(in_service) @ (topology.voltage_coefficients + sparse.csr_matrix(
+            (values, (rows, nodes)), shape=topology.voltage_coefficients.shape))
+        current_coefficients = sparse.diags(in_service) @ topology.current_coefficients
+        return voltage_coefficients @ bus_voltage + current_coefficients @ currents
+
+    def place_blocking_devices(self, voltages: np.ndarray, count: int, objective: str = 'peak') -> pd.DataFrame:
+        """ This method picks neutral blocking devices for gsus one at a time, each time the one that lowers the
+            transformer gics of the storm the most. A device only changes the ground conductance of one node, so the
+            nodal voltages per unit current into every candidate node are found once, the devices already placed are
+            a low-rank update of them, and every candidate is scored with a rank one update and array math, without a
+            new factorization or solve.
+            @param: voltages: numpy array of shape (lines, time points) with the input voltages of the lines in the order
+                    of topology.lines (V)
+            @param: count: number of blocking devices to place
+            @param: objective: 'peak' for the largest transformer gic magnitude of the storm, 'sum' for the gic
+                    magnitudes of every transformer summed over the time points
+            return: dataframe indexed by step with the gsu that gets a blocking device and the objective after it (A),
+                    step 0 is the grid as it is
+        """
+        if objective not in ('peak', 'sum'):
+            raise ValueError("objective must be 'peak' or 'sum'")
+        score = (lambda gics: np.abs(gics).max()) if objective == 'peak' else (lambda gics: np.abs(gics).sum())
+        topology = self.topology
+        line_count = len(topology.lines)
+        node_count = topology.node_count
+        winding_node, base_r, winding_row = topology.windings
+        sub_r = topology.substation_resistance
+        every_winding = np.ones(winding_row.size, dtype=bool)
+
+        # grounded gsu windings without a blocking device
+        transformers = {str(branch): branch for branch, data in self.branch_data.items() if data["has_trans"]}
+        winding_branch = [transformers[self.names[row]] for row in winding_row]
+        remaining = [winding for winding, branch in enumerate(winding_branch)
+                     if self.branch_data[branch]["type"] == "gsu" and not self.branch_data[branch]["GIC_BD"]]
+        nodes = np.unique(winding_node[remaining])
+
+        # nodal voltages of the storm and per unit current into every candidate node on the base grid
+        currents = (3 / topology.line_resistance)[:, None] * np.asarray(voltages, dtype=float).reshape(line_count, -1)
+        base_voltage = node_voltage_calculator(self.solver, self.incidence @ currents)
+        unit = node_voltage_calculator(self.solver, sparse.csc_matrix(
+            (np.ones(nodes.size), (nodes, np.arange(nodes.size))), shape=(node_count, nodes.size)).toarray())
+        transformer_coefficients = topology.voltage_coefficients[line_count:]
+        base_coefficients = self.winding_coefficients(winding_node, base_r, every_winding, sub_r)
+
+        winding_r = base_r.copy()
+        placed = [None]
+        objectives = []
+        while True:
+            # ground conductance of the candidate nodes with the devices placed so far, and the nodal voltages and unit
+            # responses of that grid from the change of the nodes that differ from the base grid
+            inverse = np.bincount(winding_node, 1 / winding_r, minlength=node_count)
+            ground = 1 / (1 / inverse[nodes] + sub_r[nodes])
+            delta = ground - self.ground_conductance[nodes]
+            changed = np.nonzero(delta != 0)[0]
+            bus_voltage, response = base_voltage, unit
+            if changed.size:
+                capacitance = np.diag(1 / delta[changed]) + unit[nodes[changed]][:, changed]
+                correction = np.linalg.solve(capacitance, np.hstack([base_voltage[nodes[changed]], unit[nodes[changed]]]))
+                bus_voltage = base_voltage - unit[:, changed] @ correction[:, :base_voltage.shape[1]]
+                response = unit - unit[:, changed] @ correction[:, base_voltage.shape[1]:]
+            coefficients = self.winding_coefficients(winding_node, winding_r, every_winding, sub_r)
+            voltage_coefficients = transformer_coefficients + sparse.csr_matrix(
+                (coefficients - base_coefficients, (winding_row - line_count, winding_node)), shape=transformer_coefficients.shape)
+            gics = voltage_coefficients @ bus_voltage
+            objectives.append(score(gics))
+            if len(placed) > count or not remaining:
+                break
+
+            # transformer gics per unit current into every candidate node
+            unit_gics = voltage_coefficients @ response
+            best = None
+            for winding in remaining:
+                node = winding_node[winding]
+                column = np.searchsorted(nodes, node)
+                at_node = np.nonzero(winding_node == node)[0]
+                trial_r = winding_r[at_node] + 1e6 * (at_node == winding)
+                trial_ground = 1 / (1 / np.sum(1 / trial_r) + sub_r[node])
+                # rank one update of the nodal voltages for the new ground conductance of the node
+                scale = bus_voltage[node] / (1 / (trial_ground - ground[column]) + response[node, column])
+                trial = gics - np.outer(unit_gics[:, column], scale)
+                # the windings of the node take the coefficients of the new parallel resistance
+                node_voltage = bus_voltage[node] - response[node, column] * scale
+                trial_coefficients = self.winding_coefficients(winding_node[at_node], trial_r, np.ones(at_node.size, dtype=bool), sub_r)
+                trial[winding_row[at_node] - line_count] += (trial_coefficients - coefficients[at_node])[:, None] * node_voltage
+                trial_score = score(trial)
+                if best is None or trial_score < best[0]:
+                    best = (trial_score, winding)
+            winding_r[best[1]] += 1e6
+            remaining.remove(best[1])
+            placed.append(winding_branch[best[1]])
+
+        placement = pd.DataFrame({"blocking device": placed, f"{objective} transformer GIC (A)": objectives})
+        placement.index.name = "step"
+        return placement
+
+
+def gic_computation(substation_data: dict, bus_data: dict, branch_data: dict, E_field: FieldCube, integration: str = 'endpoints', log_queue: object = None) -> dict:
+    """ This method takes in the grid data dictionaries and the E-field FieldCube, and outputs the calculated GICs in
+                the transmission lines and transformers for the inputted grid. The network steps are compiled once per
+                grid into a GICOperator, so a storm is the input voltages of the lines and one matrix product.
+                Singular function is able to be called easier by application core.
+                @param: substation_data: dictionary that contains latitudes and longitudes of substations in grid
+                @param: bus_data: dictionary that correlates bus numbers with substation numbers
+                @param: branch_data: dictionary that holds grid information pertaining to transmission lines
+                and transformers.
+                @param: E_field: FieldCube that holds time series E-field data
+                @param: integration: 'endpoints' or 'path', how the field is integrated along the transmission lines
+                @param: log_queue: optional queue object to send log messages through, such as the statistics of the
+                factorization when the grid is not in gic_operator_cache
+                return: gic_data: dictionary of the time and the gic of every line and transformer, each a numpy
+                array with one value per time point
+            """
+    operator = compile_gic_operator(substation_data, bus_data, branch_data, log_queue)
     line_list = list_line_data(substation_data, bus_data, branch_data)
     line_length = generate_line_length(line_list)
-    IV_df = input_voltage_calculation(line_length, E_data_df)
-    EC_df = equivalent_current_calc(line_length, IV_df)
-    nodes = generate_nodes_and_network(branch_data, bus_data, substation_data)
-    nodal_index = nodal_indexer(nodes)
-    reverse_mapping = reverse_map_nodes(nodes, nodal_index, branch_data)
-    cond_mat = cond_mat_generator(nodal_index, reverse_mapping)
-    gic_df = ic_mat_generator_gic_df(nodal_index, EC_df, reverse_mapping, cond_mat, branch_data)
+    gics = operator.apply(input_voltages(line_length, E_field, integration))
+
+    gic_data = {'time': E_field.time}
+    for row, name in enumerate(operator.names):
+        gic_data[name] = gics[row]
+    return gic_data
+
+
+def uniform_field_response(substation_data: dict, bus_data: dict, branch_data: dict, integration: str = 'endpoints') -> tuple:
+    """ This function finds the gics of a grid for a uniform 1 V/km eastward field and a uniform 1 V/km northward
+                field. The gic network is linear, so the gics of a uniform field of any direction and magnitude are a
+                combination of these two.
+                @param: substation_data: dictionary that contains latitudes and longitudes of substations in grid
+                @param: bus_data: dictionary that correlates bus numbers with substation numbers
+                @param: branch_data: dictionary that holds grid information pertaining to transmission lines
+                and transformers.
+                @param: integration: 'endpoints' or 'path', how the field is integrated along the transmission lines
+                return: (names, east, north): list of the gic names and numpy arrays of the gic of each one per V/km of
+                eastward and of northward field (A)
+            """
+    operator = compile_gic_operator(substation_data, bus_data, branch_data)
+    line_length = generate_line_length(list_line_data(substation_data, bus_data, branch_data))
+
+    # the smallest lattice around the grid, with the eastward field at the first time point and the northward at the second
+    coords = np.array([line["from_coords"] + line["to_coords"] for line in line_length], dtype=float).reshape(-1, 2)
+    longitude = np.array([coords[:, 0].min() - 1, coords[:, 0].max() + 1])
+    latitude = np.array([coords[:, 1].min() - 1, coords[:, 1].max() + 1])
+    field = np.zeros((2, 2, 2, 2))
+    field[0, ..., 0] = 1
+    field[1, ..., 1] = 1
+    E_field = FieldCube(field, np.arange(2), longitude, latitude, ['Ex', 'Ey'])
+
+    gics = operator.apply(input_voltages(line_length, E_field, integration))
+    return operator.names, gics[:, 0], gics[:, 1]
+
+
+def uniform_field_screening(substation_data: dict, bus_data: dict, branch_data: dict, magnitudes: list = (1.0,),
+                            azimuths: np.array = np.arange(360), integration: str = 'endpoints') -> pd.DataFrame:
+    """ This function screens the transformers of a grid under uniform fields of every direction, like the NERC
+                benchmark screening. The two solves of uniform_field_response are done once and every direction and
+                magnitude is an array product of them.
+                @param: substation_data: dictionary that contains latitudes and longitudes of substations in grid
+                @param: bus_data: dictionary that correlates bus numbers with substation numbers
+                @param: branch_data: dictionary that holds grid information pertaining to transmission lines
+                and transformers.
+                @param: magnitudes: list of the field magnitudes (V/km)
+                @param: azimuths: numpy array of the field directions in degrees clockwise from north
+                @param: integration: 'endpoints' or 'path', how the field is integrated along the transmission lines
+                return: dataframe indexed by transformer with the worst azimuth (deg) and the gic magnitude at it for
+                every field magnitude (A). A direction and its opposite give the same magnitude, the first one is kept
+            """
+    names, east, north = uniform_field_response(substation_data, bus_data, branch_data, integration)
+    transformers = np.array([isinstance(name, str) for name in names])
+    angle = np.radians(np.asarray(azimuths, dtype=float))
+
+    # gic of every transformer per V/km at every azimuth, the magnitudes only scale it
+    gics = np.abs(np.outer(east[transformers], np.sin(angle)) + np.outer(north[transformers], np.cos(angle)))
+    worst = np.argmax(gics, axis=1)
+    peak = gics[np.arange(worst.size), worst]
 
-    return gic_df
+    screening = {"worst azimuth (deg)": np.asarray(azimuths)[worst]}
+    for magnitude in magnitudes:
+        screening[f"GIC at {magnitude} V/km (A)"] = peak * magnitude
+    return pd.DataFrame(screening, index=pd.Index([name for name in names if isinstance(name, str)], name="transformer"))
 
 
 if __name__ == '__main__':
@@ -1034,6 +1867,6 @@ if __name__ == '__main__':
     #     data.loc[i[0], "Ey"] = 1
     #
     #
-    # gic_df_20N = gic_computation(substation_data_20, bus_data_20, branch_data_20, data)
+    # gic_df_20N = gic_computation(substation_data_20, bus_data_20, branch_data_20, FieldCube.from_dataframe(data))
 
     # print(gic_df_20N)
\ No newline at end of file
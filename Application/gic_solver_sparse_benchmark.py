@@ -0,0 +1,54 @@
+import time
+import numpy as np
+import gic_solver
+import baseline_gic_solver as baseline
+
+""" This code times gic_solver.cond_mat_generator, which factorizes the sparse conductance matrix once, against the
+    dense inverse of cond_mat_generator in baseline_gic_solver, the frozen copy of gic_solver before the rewrite.
+    The grids are synthetic: buses are scattered on a plane, each bus is grounded through its substation and
+    connected by lines to its nearest neighbours, like the reverse map of a transmission network.
+    The dense inverse is skipped on the largest grid, it needs n x n memory.
+"""
+
+grid_sizes = [500, 2000, 5000]
+dense_limit = 2000
+neighbours = 3
+time_points = 100
+
+
+def synthetic_grid(size:int, rng:np.random.Generator) -> tuple:
+
+    position = rng.uniform(0, 100, size=(size, 2))
+    nodal_index = {bus: bus for bus in range(size)}
+    reverse_map = {}
+    for bus in range(size):
+        reverse_map[(bus,)] = [["sub", "sub", 0.2], ("total resistance", rng.uniform(0.1, 1.0))]
+        distance = np.hypot(*(position - position[bus]).T)
+        for other in np.argsort(distance)[1:neighbours + 1]:
+            key = (min(bus, int(other)), max(bus, int(other)))
+            reverse_map[key] = [[key, "line", 1.0], ("total resistance", distance[other] * 0.05 + 0.5, "parallel elements")]
+    return nodal_index, reverse_map
+
+
+rng = np.random.default_rng(0)
+print("buses, dense inverse and solve time (s), sparse factorization and solve time (s), factorization time (s), "
+      "conductance matrix nonzeros, fill-in nonzeros, max voltage difference")
+for size in grid_sizes:
+    nodal_index, reverse_map = synthetic_grid(size, rng)
+    currents = rng.normal(size=(size, time_points))
+
+    start = time.perf_counter()
+    solver = gic_solver.cond_mat_generator(nodal_index, reverse_map)
+    voltages = np.column_stack([gic_solver.node_voltage_calculator(solver, currents[:, i]) for i in range(time_points)])
+    sparse_time = time.perf_counter() - start
+
+    dense_time = None
+    difference = None
+    if size <= dense_limit:
+        start = time.perf_counter()
+        inverse = baseline.cond_mat_generator(nodal_index, reverse_map)
+        dense_voltages = np.column_stack([np.matmul(inverse, currents[:, i]) for i in range(time_points)])
+        dense_time = time.perf_counter() - start
+        difference = np.abs(dense_voltages - voltages).max()
+
+    print(size, dense_time, sparse_time, solver.factorization_time, solver.matrix.nnz, solver.fill_in, difference)
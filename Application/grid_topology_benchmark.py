@@ -0,0 +1,100 @@
+import time
+import numpy as np
+import gic_solver
+
+""" This code times gic_solver.GridTopology, which builds the nodal model of a grid on integer node numbers, against the
+    dictionary steps it replaces: generate_nodes_and_network, nodal_indexer, reverse_map_nodes and the conductance matrix
+    and gic coefficients made from the reverse map.
+    The grids are synthetic: every substation has a high voltage bus and a generator or low voltage bus, connected by a
+    gsu, an auto, a gy or an auto and a gy in parallel, and the high voltage buses are connected by lines to their
+    nearest neighbours. A few gsus have blocking devices and a few lines have series capacitors.
+    Both models are checked by the gics they give for random line input voltages.
+"""
+
+grid_sizes = [500, 2000, 5000, 10000]
+neighbours = 3
+repeats = 3
+
+
+def synthetic_grid(size:int, rng:np.random.Generator) -> tuple:
+
+    substations = size // 2
+    position = rng.uniform(0, 10, size=(substations, 2))
+    substation_data = {}
+    bus_data = {}
+    branch_data = {}
+    for sub in range(1, substations + 1):
+        high, low = 2 * sub - 1, 2 * sub
+        substation_data[sub] = {"lat": position[sub - 1, 1], "long": position[sub - 1, 0], "ground_r": rng.uniform(0.1, 0.5)}
+        bus_data[high] = {"sub_num": sub}
+        bus_data[low] = {"sub_num": sub}
+        kind = rng.choice(["gsu", "auto", "gy", "auto and gy"], p=[0.5, 0.2, 0.2, 0.1])
+        if kind == "gsu":
+            branch_data[(high, low, 1)] = {"has_trans": True, "resistance": None, "type": "gsu", "trans_w1": rng.uniform(0.1, 0.5),
+                                           "trans_w2": None, "GIC_BD": bool(rng.random() < 0.05)}
+        if kind in ("auto", "auto and gy"):
+            branch_data[(high, low, 2)] = {"has_trans": True, "resistance": None, "type": "auto", "trans_w1": rng.uniform(0.02, 0.1),
+                                           "trans_w2": rng.uniform(0.02, 0.1), "GIC_BD": False}
+        if kind in ("gy", "auto and gy"):
+            branch_data[(high, low, 3)] = {"has_trans": True, "resistance": None, "type": "gy", "trans_w1": rng.uniform(0.05, 0.2),
+                                           "trans_w2": rng.uniform(0.05, 0.2), "GIC_BD": False}
+    for sub in range(substations):
+        distance = np.hypot(*(position - position[sub]).T)
+        for other in np.argsort(distance)[1:neighbours + 1]:
+            if sub < other or sub not in np.argsort(np.hypot(*(position - position[other]).T))[1:neighbours + 1]:
+                branch_data[(2 * sub + 1, 2 * int(other) + 1, 1)] = {"has_trans": False, "resistance": distance[other] * 3 + 0.5,
+                                                                    "type": None, "trans_w1": None, "trans_w2": None,
+                                                                    "GIC_BD": bool(rng.random() < 0.02)}
+    return substation_data, bus_data, branch_data
+
+
+def dictionary_model(substation_data:dict, bus_data:dict, branch_data:dict) -> tuple:
+
+    nodes = gic_solver.generate_nodes_and_network(branch_data, bus_data, substation_data)
+    nodal_index = gic_solver.nodal_indexer(nodes)
+    reverse_mapping = gic_solver.reverse_map_nodes(nodes, nodal_index, branch_data)
+    cond_mat = gic_solver.cond_mat_generator(nodal_index, reverse_mapping)
+    tl_nodes, lines, incidence = gic_solver.line_incidence(nodal_index, reverse_mapping)
+    coefficients = gic_solver.gic_value_coefficients(reverse_mapping, tl_nodes, lines, branch_data, len(nodal_index))
+    return cond_mat, lines, incidence, coefficients
+
+
+def array_model(substation_data:dict, bus_data:dict, branch_data:dict) -> tuple:
+
+    topology = gic_solver.GridTopology.from_grid(substation_data, bus_data, branch_data)
+    return topology, topology.conductance_matrix(), topology.incidence()
+
+
+def best_time(function) -> float:
+
+    times = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+    print("buses, branches, nodes, dictionary model time (s), GridTopology time (s), speedup, max abs GIC (A), max abs difference (A)")
+    for size in grid_sizes:
+        substation_data, bus_data, branch_data = synthetic_grid(size, rng)
+        dictionary_time = best_time(lambda: dictionary_model(substation_data, bus_data, branch_data))
+        array_time = best_time(lambda: array_model(substation_data, bus_data, branch_data))
+
+        # gics of both models for the same equivalent line currents
+        cond_mat, lines, incidence, (names, voltage_coefficients, current_coefficients) = dictionary_model(substation_data, bus_data, branch_data)
+        topology, conductance_matrix, topology_incidence = array_model(substation_data, bus_data, branch_data)
+        currents = dict(zip(topology.lines, rng.normal(size=len(topology.lines)) * 100))
+        line_currents = np.array([currents[line] for line in lines])
+        expected = voltage_coefficients @ cond_mat.solve(incidence @ line_currents) + current_coefficients @ line_currents
+        line_currents = np.array([currents[line] for line in topology.lines])
+        solver = gic_solver.ConductanceSolver(conductance_matrix)
+        gics = topology.voltage_coefficients @ solver.solve(topology_incidence @ line_currents) + topology.current_coefficients @ line_currents
+        gics = dict(zip(topology.names, gics))
+        difference = max(abs(gics[name] - value) for name, value in zip(names, expected))
+
+        print(size, len(branch_data), topology.node_count, dictionary_time, array_time, dictionary_time / array_time,
+              np.abs(expected).max(), difference)
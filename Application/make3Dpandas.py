@@ -12,35 +12,10 @@ def get3D(min_longitude, max_longitude, min_latitude, max_latitude):
     # build time, longitude, and latitude array for pandas multindex.
     length = longitude_vector.size * latitude_vector.size * time_array.size
     
-    # build index 
-    time_index_array = np.empty([1, length], dtype=object)[0]
-    longitude_index_array = np.empty([1, length], dtype=object)[0]
-    latitude_index_array = np.empty([1, length], dtype=object)[0]
-    time_point = 0
-    longitude_point = 0
+    # build index. Time is the outer level, then longitude, then latitude
+    index = [time_array.astype(str), longitude_vector.astype(str), latitude_vector.astype(str)]
     
-    for i in range(length):
-        # time should be same value up until the length of the longitude vector
-        # reset longitude vector to 0 every time we reach the end of the latitude vector
-        if ((i) % (latitude_vector.size)) == 0:
-            if i != 0:
-                
-                longitude_point += 1
-        if ((i) % (longitude_vector.size * latitude_vector.size)) == 0:
-            if i != 0:
-                time_point += 1
-                longitude_point = 0
-        
-        time_index_array[i] = str(time_array[time_point])
-        
-        longitude_index_array[i] = str(longitude_vector[longitude_point])
-        # repeatedly copy the longitude and latitude points to the index array
-        latitude_index_array[i] = str(latitude_vector[i % latitude_vector.size])
-    
-
-    index = [time_index_array, longitude_index_array, latitude_index_array]
-    
-    index = pd.MultiIndex.from_arrays(index, names=["time", "longitude", "latitude"])
+    index = pd.MultiIndex.from_product(index, names=["time", "longitude", "latitude"])
     data_dict = {"Ex":np.zeros(length), "Ey": np.zeros(length)}
     data = pd.DataFrame(data_dict, index=index)
     return data